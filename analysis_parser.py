@@ -0,0 +1,154 @@
+import re
+
+# 分节标签：已知的分节名（市场影响、行业板块影响、相关个股、确信度、市场情绪、信息来源），
+# 可带 "对整体美股"、"主要相关" 之类的修饰和 "分析"、"判断" 后缀，如 "对整体美股市场的影响分析"；
+# 修饰用字符集而不是词的重复，单事件分析很短，标签匹配占了解析的大部分时间
+_SECTION_LABEL = (
+    r'[对整体美股主要相关分析的]*'
+    r'(?:市场(?:的?影响|情绪)|行业(?:板块)?的?影响|板块的?影响|个股(?:的?影响)?|相关个股|确信度|情绪|信息来源|来源)'
+    r'(?:分析|判断|评估)?'
+)
+
+# 行首的 "N." 分节编号（连同其后的已知标签，如 "市场影响:"、"**整体美股市场的影响**："；
+# 不是已知标签的 "美联储表示：" 之类保留在内容中）
+_SECTION_MARKER = (
+    r'^[ \t*#]*(?P<section>\d)\.[ \t]*(?:\**' + _SECTION_LABEL + r'\**[ \t]*[:：]'
+    r'|(?:市场影响|行业影响|相关个股|确信度|市场情绪|信息来源))?'
+)
+_SECTION_PATTERN = re.compile(_SECTION_MARKER, re.MULTILINE)
+# 批量分析另外匹配 "事件N分析:" 标题；合在一个模式里，整段文本只扫描一遍
+_MARKER_PATTERN = re.compile(r'事件(?P<event>\d+)分析[:：]|' + _SECTION_MARKER, re.MULTILINE)
+
+# 分节内容两端去除的空白和Markdown加粗
+_STRIP_CHARS = " \t\r\n*"
+
+URL_PATTERN = re.compile(r'https?://[^\s()<>"\\\[\]]+')
+
+# 关键词到规范值的映射，按顺序匹配，先匹配到的优先
+CONFIDENCE_KEYWORDS = [
+    ("high", re.compile(r'high|高')),
+    ("medium", re.compile(r'medium|中'))
+]
+SENTIMENT_KEYWORDS = [
+    ("bullish", re.compile(r'bullish|利好|正面')),
+    ("bearish", re.compile(r'bearish|利空|负面')),
+    ("neutral", re.compile(r'neutral|中性'))
+]
+# 没有明确情绪判断时，从市场影响分析中推断
+IMPACT_SENTIMENT_KEYWORDS = [
+    ("bullish", re.compile(r'利好|正面|积极|上涨')),
+    ("bearish", re.compile(r'利空|负面|消极|下跌')),
+    ("neutral", re.compile(r'中性|有限|轻微'))
+]
+
+def _match_keywords(text, keywords, default):
+    text = text.strip().lower()
+    for value, pattern in keywords:
+        if pattern.search(text):
+            return value
+    return default
+
+def normalize_confidence(text):
+    """将确信度文本映射为 high/medium/low"""
+    return _match_keywords(text, CONFIDENCE_KEYWORDS, "low")
+
+def normalize_sentiment(text):
+    """将市场情绪文本映射为 bullish/bearish/neutral/unknown"""
+    return _match_keywords(text, SENTIMENT_KEYWORDS, "unknown")
+
+def merge_sentiments(values):
+    """将条件式的情绪列表（如 ["bullish if 数据好于预期", "bearish if 数据差于预期"]）归并为单个情绪值
+
+    各项的判断一致时取该值，不一致或都无法判断时为unknown
+    """
+    sentiments = {normalize_sentiment(str(value)) for value in values} - {"unknown"}
+    return sentiments.pop() if len(sentiments) == 1 else "unknown"
+
+def infer_sentiment(impact_text):
+    """从市场影响分析中推断市场情绪，无法判断时返回unknown"""
+    return _match_keywords(impact_text, IMPACT_SENTIMENT_KEYWORDS, "unknown")
+
+def _scan(text, count=None):
+    """单遍扫描编号分节
+
+    count 为None时整段文本视为一个事件的分析，返回 {0: {节号: 内容}}；
+    否则只收集 "事件1分析" 到 "事件count分析" 标题下的分节，返回 {事件号: {节号: 内容}}。
+    同一事件内节号必须递增，内容中的 "2." 之类编号不会被误当作下一节。
+    """
+    events = {}
+    current = None if count else events.setdefault(0, {})
+    section = 0
+    value_start = None
+
+    for match in (_MARKER_PATTERN if count else _SECTION_PATTERN).finditer(text):
+        number = match.group("event") if match.lastgroup == "event" else None
+        if number is None:
+            index = int(match.group("section"))
+            if current is None or index <= section:
+                continue
+        if current is not None and section:
+            current[section] = text[value_start:match.start()].strip(_STRIP_CHARS)
+        if number is not None:
+            number = int(number)
+            # 只接受范围内且首次出现的事件标题
+            current = events.setdefault(number, {}) if 1 <= number <= (count or 0) and number not in events else None
+            section = 0
+        else:
+            section = index
+            value_start = match.end()
+
+    if current is not None and section:
+        current[section] = text[value_start:].strip(_STRIP_CHARS)
+    return events
+
+def parse_sections(text):
+    """解析单个事件的编号分析（"1. 市场影响: ..." 到 "5. 市场情绪: ..."），返回 {节号: 内容}"""
+    return _scan(text or "")[0]
+
+def parse_batch_sections(text, count):
+    """解析批量分析响应中 "事件N分析:" 下的编号分节
+
+    Returns:
+        list: 长度为count，第N-1项为事件N的 {节号: 内容}，缺少该事件时为None
+    """
+    events = _scan(text or "", count)
+    return [events.get(index) for index in range(1, count + 1)]
+
+def first_line(text):
+    """只保留第一行（市场情绪、信息来源等单行字段）"""
+    return text.split("\n", 1)[0].strip()
+
+def _batch_result(sections):
+    """将一个事件的分节转为批量分析结果，缺少市场影响时返回None"""
+    # 缺少核心分析内容视为解析失败
+    if not sections or not sections.get(1):
+        return None
+
+    result = {
+        "market_impact": sections[1],
+        "confidence_level": normalize_confidence(sections[4]) if 4 in sections else "medium",
+        "sentiment": normalize_sentiment(first_line(sections[5])) if 5 in sections else "unknown"
+    }
+    if sections.get(2):
+        result["industry_impact"] = sections[2]
+    if sections.get(3):
+        result["related_stocks"] = sections[3]
+    if 6 in sections:
+        source_text = first_line(sections[6])
+        url_match = URL_PATTERN.search(source_text)
+        if url_match:
+            result["source_url"] = url_match.group(0)
+            source_text = source_text.replace(url_match.group(0), "")
+        source_name = source_text.strip(" []【】()（）|-")
+        if source_name:
+            result["source_name"] = source_name
+    return result
+
+def parse_batch_analysis(text, count):
+    """解析批量分析响应（"事件N分析:" 加 1~6 编号分节）
+
+    Returns:
+        list: 与批次对应的分析结果（market_impact、industry_impact、related_stocks、
+        confidence_level、sentiment、source_url、source_name），解析失败的位置为None
+    """
+    return [_batch_result(sections) for sections in parse_batch_sections(text, count)]
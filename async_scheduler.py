@@ -0,0 +1,221 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 调度循环最长休眠时间（秒），系统休眠或时钟跳变后能及时发现到期任务
+MAX_SLEEP_SECONDS = 60
+
+# 查找最近一次错过的触发时最多向前推进的次数（防止极短间隔的触发器长时间停机后空转）
+MAX_CATCHUP_STEPS = 100000
+
+class DailyTrigger:
+    """每天在固定时间点触发，可限定星期（0=周一）"""
+
+    def __init__(self, times, weekdays=None):
+        if isinstance(times, str):
+            times = [times]
+        self.times = sorted(tuple(int(part) for part in value.split(":")) for value in times)
+        self.weekdays = set(weekdays) if weekdays is not None else None
+
+    def next_after(self, moment):
+        """返回严格晚于moment的下一个触发时间"""
+        day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        for offset in range(8):
+            candidate_day = day + timedelta(days=offset)
+            if self.weekdays is not None and candidate_day.weekday() not in self.weekdays:
+                continue
+            for hour, minute in self.times:
+                candidate = candidate_day.replace(hour=hour, minute=minute)
+                if candidate > moment:
+                    return candidate
+        raise ValueError("触发器没有可用的星期")
+
+    def __str__(self):
+        times = ", ".join(f"{hour:02d}:{minute:02d}" for hour, minute in self.times)
+        if self.weekdays is None:
+            return f"每天 {times}"
+        return f"每周{sorted(self.weekdays)} {times}"
+
+class AdaptiveIntervalTrigger:
+    """间隔由回调动态决定的触发器
+
+    任务每次运行结束后按最新间隔重新计算下次运行时间，
+    使任务本身根据运行结果调整的间隔立即生效。
+    """
+
+    reschedule_after_run = True
+
+    def __init__(self, get_seconds):
+        self.get_seconds = get_seconds
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.get_seconds())
+
+    def __str__(self):
+        return f"自适应间隔，当前每 {self.get_seconds()} 秒"
+
+class Job:
+    """调度任务及其运行统计"""
+
+    def __init__(self, name, func, trigger):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.next_run = None
+        self.running = False
+        self.stats = {
+            "runs": 0,
+            "failures": 0,
+            "skipped_overlap": 0,
+            "skipped_stale": 0,
+            "collapsed": 0,
+            "last_lag": None,
+            "max_lag": 0.0,
+            "last_duration": None,
+            "max_duration": 0.0
+        }
+
+class AsyncScheduler:
+    """基于asyncio的任务调度器
+
+    - 各任务在线程池中并发执行，慢任务不会阻塞其他任务按时启动
+    - 同一任务的上一次运行尚未结束时跳过本次触发（防止重叠）
+    - 每个任务最近一次的计划时间持久化到状态存储，重启或长时间停顿后
+      补跑错过的运行（多次错过只补跑最近的一次，最近一次也超过补跑窗口时不再补跑）
+    - 记录每次运行的启动延迟（实际开始 - 计划时间）和耗时
+    """
+
+    def __init__(self, state_store, catchup_window):
+        self.state = state_store
+        self.catchup_window = catchup_window
+        self.jobs = []
+        self._tasks = set()
+        self._executor = None
+
+    def add_job(self, name, func, trigger):
+        """注册任务，名称同时作为状态存储中的键"""
+        job = Job(name, func, trigger)
+        self.jobs.append(job)
+        logger.info(f"已设置任务 {name}: {trigger}")
+        return job
+
+    def _job_state(self, job):
+        return self.state.get(f"job:{job.name}", {}) or {}
+
+    def _latest_due(self, job, due, now):
+        """从已到期的触发时间due向前推进到不晚于now的最近一次触发，返回 (触发时间, 被合并的更早触发次数)"""
+        collapsed = 0
+        for _ in range(MAX_CATCHUP_STEPS):
+            following = job.trigger.next_after(due)
+            if following > now:
+                break
+            due = following
+            collapsed += 1
+        return due, collapsed
+
+    def _plan_first_run(self, job, now):
+        """根据上次计划时间确定首次运行时间，错过的运行立即补跑"""
+        last_run = self._job_state(job).get("last_run")
+        if last_run:
+            due = job.trigger.next_after(datetime.fromisoformat(last_run))
+            if due <= now:
+                due, collapsed = self._latest_due(job, due, now)
+                job.stats["collapsed"] += collapsed
+                logger.info(
+                    f"任务 {job.name} 错过了 {due.isoformat(timespec='minutes')} 的运行"
+                    f"（另有 {collapsed} 次更早的运行合并到这一次），将立即补跑"
+                )
+                job.next_run = due
+                return
+        job.next_run = job.trigger.next_after(now)
+
+    def _dispatch_due_jobs(self, now):
+        for job in self.jobs:
+            if job.next_run > now:
+                continue
+            # 多次错过的触发合并为最近的一次，是否超过补跑窗口按这一次判断
+            scheduled, collapsed = self._latest_due(job, job.next_run, now)
+            if collapsed:
+                job.stats["collapsed"] += collapsed
+                logger.info(f"任务 {job.name} 错过的 {collapsed + 1} 次运行合并为 {scheduled.isoformat(timespec='minutes')} 的一次")
+            job.next_run = job.trigger.next_after(now)
+
+            if (now - scheduled).total_seconds() > self.catchup_window:
+                job.stats["skipped_stale"] += 1
+                logger.warning(f"任务 {job.name} 的计划运行 {scheduled.isoformat(timespec='minutes')} 已超过补跑窗口，跳过")
+                continue
+            if job.running:
+                job.stats["skipped_overlap"] += 1
+                logger.warning(f"任务 {job.name} 上一次运行尚未结束，跳过 {scheduled.isoformat(timespec='minutes')} 的触发")
+                continue
+
+            job.running = True
+            task = asyncio.create_task(self._execute(job, scheduled))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job, scheduled):
+        started_at = datetime.now()
+        lag = max((started_at - scheduled).total_seconds(), 0.0)
+        logger.info(f"任务 {job.name} 开始，启动延迟 {lag:.1f}秒")
+
+        start = time.perf_counter()
+        outcome = "success"
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, job.func)
+        except Exception as e:
+            outcome = "failure"
+            job.stats["failures"] += 1
+            logger.error(f"任务 {job.name} 运行出错: {str(e)}")
+        finally:
+            duration = time.perf_counter() - start
+            job.running = False
+            if getattr(job.trigger, "reschedule_after_run", False):
+                job.next_run = job.trigger.next_after(datetime.now())
+
+        job.stats["runs"] += 1
+        job.stats["last_lag"] = lag
+        job.stats["max_lag"] = max(job.stats["max_lag"], lag)
+        job.stats["last_duration"] = duration
+        job.stats["max_duration"] = max(job.stats["max_duration"], duration)
+        logger.info(f"任务 {job.name} 结束（{outcome}），启动延迟 {lag:.1f}秒，耗时 {duration:.1f}秒")
+
+        # 运行结束后才记录，运行中途退出的任务在重启后会被补跑
+        self.state.set(f"job:{job.name}", {
+            "last_run": scheduled.isoformat(),
+            "last_started_at": started_at.isoformat(),
+            "last_outcome": outcome,
+            "last_lag": round(lag, 3),
+            "last_duration": round(duration, 3)
+        })
+
+    def stats(self):
+        """返回各任务的运行统计"""
+        return {job.name: dict(job.stats, next_run=job.next_run.isoformat() if job.next_run else None) for job in self.jobs}
+
+    async def run(self):
+        """运行调度循环，直到被取消"""
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.jobs), 1), thread_name_prefix="job")
+        now = datetime.now()
+        for job in self.jobs:
+            self._plan_first_run(job, now)
+            logger.info(f"任务 {job.name} 下次运行时间: {job.next_run.isoformat(timespec='minutes')}")
+
+        try:
+            while True:
+                now = datetime.now()
+                self._dispatch_due_jobs(now)
+                next_run = min(job.next_run for job in self.jobs)
+                delay = (next_run - datetime.now()).total_seconds()
+                await asyncio.sleep(min(max(delay, 0), MAX_SLEEP_SECONDS))
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            self._executor.shutdown(wait=False)
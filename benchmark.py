@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import config
+from mock_servers import FaultProfile, MockDeepSeekServer, MockNotionServer
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+# 各模块的本地状态文件，每个规模使用单独的目录，互不影响
+STATE_FILES = {
+    "BREAKING_NEWS_STATE_PATH": "breaking_news_state.json",
+    "EVENT_LEDGER_PATH": "event_ledger.sqlite3",
+    "EVENT_STORE_PATH": "event_store.sqlite3",
+    "NEAR_DUP_HISTORY_PATH": "near_duplicates.sqlite3",
+    "NOTION_INDEX_PATH": "notion_index.sqlite3"
+}
+
+def configure_for_mocks(deepseek_url, notion_url, notion_rate):
+    """将配置指向本地替身服务
+
+    业务模块在导入时读取部分配置，因此必须在导入它们之前调用。
+    """
+    config.DEEPSEEK_API_KEY = "benchmark"
+    config.DEEPSEEK_BASE_URL = deepseek_url
+    config.NOTION_API_KEY = "benchmark"
+    config.NOTION_BASE_URL = notion_url
+    config.NOTION_PARENT_PAGE_ID = "benchmark-parent"
+    config.NOTION_RATE_LIMIT = notion_rate
+    config.NOTION_RATE_BURST = max(notion_rate, 1)
+    config.CACHE_ENABLED = False
+    config.METRICS_DIR = None
+
+def point_state_at(directory, modules):
+    """将各模块引用的本地状态文件路径指向指定目录"""
+    os.makedirs(directory, exist_ok=True)
+    for module in modules:
+        for name, filename in STATE_FILES.items():
+            if hasattr(module, name):
+                setattr(module, name, os.path.join(directory, filename))
+
+def run_phase(label, func, servers):
+    """运行一个阶段，返回 (结果, 阶段报告)"""
+    metrics = get_metrics()
+    for server in servers.values():
+        server.reset_stats()
+    start = time.perf_counter()
+    with metrics.run(label):
+        result = func()
+    wall_seconds = time.perf_counter() - start
+    count = len(result) if isinstance(result, list) else result
+    return result, {
+        "events": count,
+        "wall_seconds": round(wall_seconds, 3),
+        "events_per_second": round(count / wall_seconds, 2) if wall_seconds else 0.0,
+        "stages": metrics.last_report["stages"],
+        "server_calls": {name: server.snapshot() for name, server in servers.items()}
+    }
+
+def run_scenario(size, servers, data_dir):
+    """以指定事件数端到端运行每日收集、财报收集和Notion发布"""
+    servers["deepseek"].events_per_search = size
+    servers["notion"].reset()
+    point_state_at(os.path.join(data_dir, f"size-{size}"), (config, data_collector, notion_updater))
+
+    collector = data_collector.DataCollector()
+    updater = notion_updater.NotionUpdater()
+    try:
+        daily, daily_report = run_phase("daily", collector.collect_daily_events, servers)
+        # 再次运行每日收集：以历史事件库中刚写入的当天事件为基础，只搜索和增强增量
+        _, seeded_report = run_phase("daily_seeded", collector.collect_daily_events, servers)
+        earnings, earnings_report = run_phase(
+            "earnings", lambda: collector.collect_earnings_events(force=True), servers
+        )
+        _, publish_report = run_phase(
+            "publish", lambda: updater.update_notion_with_events(daily + earnings), servers
+        )
+    finally:
+        for store in (collector.ledger, collector.near_duplicates, collector.store, updater.index, updater.store):
+            if store is not None:
+                store.close()
+    return {
+        "collect_daily_events": daily_report,
+        "collect_daily_events_seeded": seeded_report,
+        "collect_earnings_events": earnings_report,
+        "update_notion_with_events": publish_report
+    }
+
+def format_report(results):
+    """将结果整理为便于阅读的文本"""
+    lines = []
+    for size, phases in results.items():
+        lines.append(f"=== {size} 个事件 ===")
+        for phase, report in phases.items():
+            lines.append(
+                f"{phase}: {report['events']} 个事件，耗时 {report['wall_seconds']:.2f}s，"
+                f"吞吐 {report['events_per_second']:.2f} 个/秒"
+            )
+            for stage, stats in report["stages"].items():
+                lines.append(
+                    f"  {stage:<8} 调用 {stats['calls']:>5}  错误 {stats['errors']:>3}  重试 {stats['retries']:>3}  "
+                    f"p50 {stats['p50_seconds']:.3f}s  p99 {stats['p99_seconds']:.3f}s  "
+                    f"tokens {stats['prompt_tokens']}+{stats['completion_tokens']}"
+                )
+            for server, routes in report["server_calls"].items():
+                for route, counts in routes.items():
+                    lines.append(
+                        f"  [{server}] {route}: 请求 {counts['requests']}，"
+                        f"429 {counts['rate_limited']}，5xx {counts['errors']}"
+                    )
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='使用本地替身服务对收集和发布流程进行端到端基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='每次搜索返回的事件数')
+    parser.add_argument('--llm-latency', default='lognormal:0.05:0.5',
+                        help='DeepSeek首字节延迟分布（fixed:秒 / uniform:下限:上限 / lognormal:中位数:sigma / exponential:均值）')
+    parser.add_argument('--llm-chars-per-second', type=float, default=0, help='DeepSeek模拟生成速度（字符/秒，0表示不限）')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='DeepSeek返回500的概率')
+    parser.add_argument('--llm-429-rate', type=float, default=0.0, help='DeepSeek返回429的概率')
+    parser.add_argument('--notion-latency', default='lognormal:0.05:0.3', help='Notion延迟分布，格式同上')
+    parser.add_argument('--notion-error-rate', type=float, default=0.0, help='Notion返回500的概率')
+    parser.add_argument('--notion-429-rate', type=float, default=0.0, help='Notion返回429的概率')
+    parser.add_argument('--notion-rate', type=float, default=config.NOTION_RATE_LIMIT, help='Notion客户端限流速率（次/秒）')
+    parser.add_argument('--retry-after', type=float, default=1, help='429响应的Retry-After（秒）')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--output', help='将完整结果写入JSON文件')
+    parser.add_argument('--verbose', action='store_true', help='输出业务模块的INFO日志')
+    args = parser.parse_args()
+
+    deepseek = MockDeepSeekServer(FaultProfile(
+        args.llm_latency, args.llm_error_rate, args.llm_429_rate, args.retry_after,
+        args.llm_chars_per_second, seed=args.seed
+    ), seed=args.seed).start()
+    notion = MockNotionServer(FaultProfile(
+        args.notion_latency, args.notion_error_rate, args.notion_429_rate, args.retry_after,
+        seed=args.seed + 1
+    )).start()
+    servers = {"deepseek": deepseek, "notion": notion}
+    configure_for_mocks(deepseek.url, notion.url, args.notion_rate)
+
+    # 配置就绪后再导入业务模块
+    global data_collector, notion_updater, get_metrics
+    import data_collector
+    import notion_updater
+    from metrics import get_metrics
+    from http_pool import close_pools
+    from response_cache import disable_cache
+    disable_cache()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    data_dir = tempfile.mkdtemp(prefix="benchmark-")
+    results = {}
+    try:
+        for size in args.sizes:
+            print(f"开始 {size} 个事件的基准测试...", flush=True)
+            results[size] = run_scenario(size, servers, data_dir)
+    finally:
+        close_pools()
+        deepseek.stop()
+        notion.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(format_report(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"完整结果已写入: {args.output}")
+
+if __name__ == "__main__":
+    main()
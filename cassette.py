@@ -0,0 +1,230 @@
+import os
+import gzip
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+import httpx
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 录制时保留的响应头，其余响应头和全部请求头（含认证信息）不写入磁带
+KEPT_RESPONSE_HEADERS = ("content-type", "retry-after")
+
+# 回放时模拟耗时，响应体拆分为多少片依次输出
+REPLAY_SLICES = 16
+
+class CassetteMissError(httpx.TransportError):
+    """回放时磁带中没有可用于该请求的响应"""
+
+def request_key(request):
+    """请求的匹配键：方法、路径和查询参数、规范化后的JSON请求体"""
+    body = request.content or b""
+    try:
+        body = json.dumps(json.loads(body), ensure_ascii=False, sort_keys=True).encode("utf-8")
+    except ValueError:
+        pass
+    digest = hashlib.sha1()
+    digest.update(f"{request.method} {request.url.raw_path.decode('ascii')}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+def _encode_body(body):
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(body).decode("ascii")}
+
+def _decode_body(interaction):
+    if "body_b64" in interaction:
+        return base64.b64decode(interaction["body_b64"])
+    return interaction.get("body", "").encode("utf-8")
+
+class _RecordingStream(httpx.SyncByteStream):
+    """透传响应体，读取结束时把完整响应交给磁带记录"""
+
+    def __init__(self, stream, on_complete):
+        self._stream = stream
+        self._on_complete = on_complete
+        self._chunks = []
+        self._done = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunks.append(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._done:
+                self._done = True
+                self._on_complete(b"".join(self._chunks))
+
+class _ReplayStream(httpx.SyncByteStream):
+    """按片输出录制的响应体，可按录制时的耗时分摊等待"""
+
+    def __init__(self, body, delay):
+        self._body = body
+        self._delay = delay
+
+    def __iter__(self):
+        if not self._delay:
+            yield self._body
+            return
+        size = max(len(self._body) // REPLAY_SLICES, 1)
+        for start in range(0, len(self._body), size):
+            time.sleep(self._delay / REPLAY_SLICES)
+            yield self._body[start:start + size]
+
+class _RecordingTransport(httpx.BaseTransport):
+    def __init__(self, cassette, service, inner):
+        self.cassette = cassette
+        self.service = service
+        self.inner = inner
+
+    def handle_request(self, request):
+        # 要求上游不压缩，磁带中保存可读的响应体
+        request.headers["Accept-Encoding"] = "identity"
+        key = request_key(request)
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        ttfb = time.perf_counter() - start
+
+        def on_complete(body):
+            self.cassette.add({
+                "service": self.service,
+                "method": request.method,
+                "path": request.url.raw_path.decode("ascii"),
+                "key": key,
+                "status": response.status_code,
+                "headers": {
+                    name: response.headers[name] for name in KEPT_RESPONSE_HEADERS if name in response.headers
+                },
+                **_encode_body(body),
+                "ttfb": round(ttfb, 4),
+                "duration": round(time.perf_counter() - start, 4)
+            })
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, on_complete),
+            extensions=response.extensions
+        )
+
+    def close(self):
+        self.inner.close()
+
+class _ReplayTransport(httpx.BaseTransport):
+    def __init__(self, cassette, service):
+        self.cassette = cassette
+        self.service = service
+
+    def handle_request(self, request):
+        interaction = self.cassette.next_interaction(
+            self.service, request.method, request.url.raw_path.decode("ascii"), request_key(request)
+        )
+        delay = 0.0
+        if self.cassette.emulate_timing:
+            time.sleep(interaction.get("ttfb", 0))
+            delay = max(interaction.get("duration", 0) - interaction.get("ttfb", 0), 0)
+        return httpx.Response(
+            status_code=interaction["status"],
+            headers=interaction.get("headers", {}),
+            stream=_ReplayStream(_decode_body(interaction), delay),
+            request=request
+        )
+
+class Cassette:
+    """DeepSeek和Notion流量的录制/回放磁带
+
+    - record：通过真实网络请求，把每个请求/响应对（状态码、少量响应头、响应体、首字节和总耗时）
+      写入gzip压缩的JSON Lines文件；请求只保存匹配用的哈希，不保存请求头和请求体
+    - replay：不访问网络，按录制顺序返回响应。优先匹配请求完全相同的记录；请求中带有日期等
+      随运行变化的内容时，退回到同一服务、方法和路径上下一条尚未使用的记录。
+      emulate_timing 为真时按录制时的耗时等待
+    """
+
+    def __init__(self, path, mode, emulate_timing=False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"未知的磁带模式: {mode}")
+        self.path = path
+        self.mode = mode
+        self.emulate_timing = emulate_timing
+        self.interactions = []
+        self._lock = threading.Lock()
+        self._saved_count = 0
+        self._used = set()
+        self._by_key = defaultdict(deque)
+        self._by_endpoint = defaultdict(deque)
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def transport(self, service, inner):
+        """为指定服务的连接池创建传输层"""
+        if self.replaying:
+            return _ReplayTransport(self, service)
+        return _RecordingTransport(self, service, inner)
+
+    def add(self, interaction):
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def next_interaction(self, service, method, path, key):
+        with self._lock:
+            for queue in (self._by_key[(service, key)], self._by_endpoint[(service, method, path)]):
+                while queue:
+                    index = queue.popleft()
+                    if index not in self._used:
+                        self._used.add(index)
+                        return self.interactions[index]
+        raise CassetteMissError(f"磁带中没有可回放的响应: {service} {method} {path}")
+
+    def _load(self):
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            self.interactions = [json.loads(line) for line in f if line.strip()]
+        for index, interaction in enumerate(self.interactions):
+            service = interaction["service"]
+            self._by_key[(service, interaction["key"])].append(index)
+            self._by_endpoint[(service, interaction["method"], interaction["path"])].append(index)
+        logger.info(f"已加载磁带 {self.path}: {len(self.interactions)} 条记录")
+
+    def save(self):
+        """写出录制的记录（回放模式下不写）"""
+        if self.replaying:
+            return
+        with self._lock:
+            interactions = list(self.interactions)
+        if len(interactions) == self._saved_count:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        opener = gzip.open if self.path.endswith(".gz") else open
+        tmp_path = f"{self.path}.tmp"
+        with opener(tmp_path, "wt", encoding="utf-8") as f:
+            for interaction in interactions:
+                f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._saved_count = len(interactions)
+        logger.info(f"磁带已写入 {self.path}: {len(interactions)} 条记录")
+
+    def close(self):
+        if self.replaying:
+            unused = len(self.interactions) - len(self._used)
+            if unused:
+                logger.info(f"磁带中有 {unused} 条记录未被回放")
+            return
+        self.save()
@@ -11,10 +11,49 @@ load_dotenv()
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")  # Get from environment variable
 DEEPSEEK_MODEL = "deepseek-chat"  # Using DeepSeek-V3 model
 
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+# 用于估算调用费用（美元/百万token），按实际价格调整
+DEEPSEEK_INPUT_PRICE_PER_M = 0.27
+DEEPSEEK_OUTPUT_PRICE_PER_M = 1.10
+
 # Notion API Configuration
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")  # Get from environment variable
 NOTION_PARENT_PAGE_ID = os.getenv("NOTION_PARENT_PAGE_ID")  # Get from environment variable
 
+NOTION_BASE_URL = "https://api.notion.com"
+NOTION_RATE_LIMIT = 3  # Notion API 平均请求速率（次/秒），所有写入共享
+NOTION_RATE_BURST = 3  # 令牌桶容量，允许的瞬时突发请求数
+NOTION_MAX_RETRIES = 5  # 单次Notion请求的最大尝试次数
+# 当天的每日页面已存在时增量更新（只追加新事件行、只修改变化的行），而不是新建页面
+DAILY_PAGE_UPSERT = True
+# 报告日期 → 页面ID、事件指纹 → 行块ID 的本地索引（与Notion不一致时自动重新同步）
+NOTION_INDEX_PATH = "data/notion_index.sqlite3"
+
+# HTTP Connection Pool Configuration
+# 采集器、Notion更新器和调度器共享同一组长连接池
+HTTP_MAX_CONNECTIONS = 20  # 每个上游服务的最大连接数
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10  # 保持空闲的最大连接数
+HTTP_KEEPALIVE_EXPIRY = 7200  # 空闲连接保留时间（秒），覆盖突发新闻任务的2小时间隔
+HTTP_CONNECT_TIMEOUT = 10  # 建立连接超时（秒）
+HTTP_READ_TIMEOUT = 120  # 读取超时（秒）
+HTTP_VERIFY_SSL = True  # 是否校验SSL证书
+
+# Response Cache Configuration
+# 相同的DeepSeek请求（模型、消息、温度、max_tokens一致）直接读取本地缓存
+CACHE_ENABLED = True
+CACHE_PATH = "cache/deepseek_responses.sqlite3"
+CACHE_MAX_BYTES = 50 * 1024 * 1024  # 缓存总大小上限，超出后按LRU淘汰
+CACHE_TTL = {  # 按调用类型设置过期时间（秒）
+    "search": 3600,
+    "parse": 7 * 24 * 3600,
+    "source": 7 * 24 * 3600,
+    "analyze": 24 * 3600,
+    "enrich": 24 * 3600,
+    "batch": 24 * 3600,
+    "summary": 6 * 3600,
+    "default": 24 * 3600
+}
+
 # Schedule Configuration
 # Weekly event collection every Sunday at 8 PM
 WEEKLY_SCHEDULE_DAY = "Sunday"
@@ -27,11 +66,89 @@ PRE_MARKET_TIME = "08:00"  # Local time, adjust as needed
 # Post-market (after 4:00 PM ET)
 POST_MARKET_TIME = "17:00"  # Local time, adjust as needed
 
+# 调度器状态（各任务上次计划运行时间、启动延迟和耗时），用于重启后补跑错过的任务
+SCHEDULER_STATE_PATH = "data/scheduler_state.json"
+SCHEDULER_CATCHUP_WINDOW = 6 * 3600  # 错过超过该时长（秒）的运行不再补跑
+
+# Breaking News Configuration
+# 记录上次成功收集的时间（高水位），每次只搜索此后的新闻
+BREAKING_NEWS_STATE_PATH = "data/breaking_news_state.json"
+BREAKING_NEWS_DEFAULT_LOOKBACK = 3600  # 首次运行时回看的时长（秒）
+BREAKING_NEWS_MAX_LOOKBACK = 12 * 3600  # 长时间停机后最多回看的时长（秒）
+# 轮询间隔根据新闻量自适应：高峰时缩短一半，无新闻时延长一半
+BREAKING_NEWS_INTERVAL = 2 * 3600  # 初始间隔（秒）
+BREAKING_NEWS_MIN_INTERVAL = 30 * 60
+BREAKING_NEWS_MAX_INTERVAL = 4 * 3600
+BREAKING_NEWS_BUSY_THRESHOLD = 5  # 单次收集到的新闻数达到该值视为高峰
+BREAKING_NEWS_BUSY_KEYWORDS = ["CPI", "FOMC", "非农", "议息", "利率决议", "PPI"]  # 出现即视为高峰
+
 # Search Configuration - Optimized prompts for detailed but focused analysis
 WEEKLY_SEARCH_PROMPT = "详细列出下周美股市场重大事件，包括但不限于：重要经济数据发布（如非农、CPI、PPI、GDP、消费者信心指数、褐皮书经济报告等）、美联储决议及讲话、财报发布（特别关注大型科技公司和重要行业龙头）、IPO、分红除息、重大政策变动、地缘政治事件等。按时间顺序排列，并注明具体日期和时间。每条事件必须单独列出，每行只包含一个事件，不要将多个事件合并在一起。"
 
 DAILY_SEARCH_PROMPT = "详细列出今天美股市场重大事件，包括但不限于：重要经济数据发布（如非农、CPI、PPI、GDP、消费者信心指数、褐皮书经济报告等）、美联储官员讲话、财报发布、IPO、分红除息、重大政策变动、突发新闻、公司重大公告等。按时间顺序排列，并注明具体时间。非常重要：每条事件必须单独列出，每行只包含一个事件，不要将多个事件合并在一起。"
 
+# 每日收集以周度收集的事件为基础：当天已有周度（或当天早些时候）收集的事件时，
+# 直接复用这些事件及其分析，只向DeepSeek询问新增、变化和取消的事件
+DAILY_SEED_FROM_WEEKLY = True
+DAILY_DELTA_PROMPT = "以下是今天已知的美股市场重大事件（每行一个，格式为 时间|描述）。请只列出今天不在此列表中的新增重大事件，以及时间或内容发生变化的已知事件（按变化后的时间和内容列出）；已取消或推迟到其他日期的已知事件，请列出该事件并将事件类型写为\"已取消\"。没有变化的已知事件不要重复列出。每条事件单独列出，注明具体时间，并用中文描述。"
+
+# Parse Configuration
+# 搜索时直接要求输出JSON事件列表
+SEARCH_STRUCTURED_OUTPUT = True
+# 优先在本地解析搜索结果（JSON或"每行一个事件"文本），失败时才调用LLM解析
+LOCAL_PARSE_ENABLED = True
+# 流式接收搜索结果，每个事件一旦完整即提交增强，与后续事件的生成并行
+STREAMING_ENABLED = True
+
+# Enrichment Configuration
+# 事件增强（来源查询 + 影响分析）的最大并发数
+ENRICHMENT_MAX_WORKERS = 8
+# 事件增强模式：
+#   separate - 来源查询和影响分析分别请求（每个事件2次调用）
+#   fused    - 一次结构化JSON请求同时返回来源和分析（每个事件1次调用）
+#   batch    - 多个事件合并为一次请求并发发送，解析失败的批次对半拆分重试
+ENRICHMENT_MODE = "fused"
+# batch模式下的批次大小范围，实际大小按 事件数/并发数 动态确定
+ENRICHMENT_BATCH_MIN_SIZE = 2
+ENRICHMENT_BATCH_MAX_SIZE = 8
+# 已处理事件台账：同一事件（日期+时间+描述指纹相同）再次出现时复用已有的来源和分析
+EVENT_LEDGER_ENABLED = True
+EVENT_LEDGER_PATH = "data/event_ledger.sqlite3"
+EVENT_LEDGER_TTL = 3 * 24 * 3600  # 台账记录的有效期（秒）
+# 近似重复合并：同一天、同一时间且描述高度相似的事件视为同一事件（Jaccard按字符二元组、包含度按词元比较）
+NEAR_DUP_ENABLED = True
+NEAR_DUP_JACCARD_THRESHOLD = 0.7  # 描述的Jaccard相似度阈值
+NEAR_DUP_CONTAINMENT_THRESHOLD = 0.9  # 较短描述的词元被较长描述包含的比例阈值
+NEAR_DUP_TIME_TOLERANCE = 0  # 两个事件时间相差超过该分钟数时不视为重复（0 表示时间必须相同）
+# 区分同一时间发布的不同数据的限定词：只在其中一个描述中出现时，两个事件不视为重复
+# （如 CPI/核心CPI、初请/续请失业金人数、同比/环比）
+NEAR_DUP_DISTINGUISHING_TERMS = [
+    "核心", "初请", "续请", "同比", "环比", "年率", "月率", "初值", "终值", "修正值", "季调",
+    "core", "initial", "continuing", "yoy", "mom", "headline"
+]
+NEAR_DUP_HISTORY_PATH = "data/near_duplicates.sqlite3"
+NEAR_DUP_HISTORY_DAYS = 7  # 参与比较的历史事件天数
+# 历史事件库：每次收集的完整事件写入本地SQLite，可按日期、股票代码、事件类型查询
+EVENT_STORE_ENABLED = True
+EVENT_STORE_PATH = "data/event_store.sqlite3"
+
+# Summary Configuration
+# 总结提示词中的事件使用紧凑表格（只保留总结所需字段、长文本截断），关闭时使用完整JSON
+SUMMARY_COMPACT_PROMPT = True
+SUMMARY_FIELD_MAX_CHARS = 80  # 描述、市场影响等长文本字段的最大字符数
+SUMMARY_EVENTS_TOKEN_BUDGET = 6000  # 事件表格的估算token上限，超出时进一步缩短长文本字段
+# 事件较多时分层总结：事件表格超过阈值后按时间顺序分组并行概括要点（map），再由各组要点生成最终报告（reduce）
+SUMMARY_MAP_REDUCE = True
+SUMMARY_MAP_REDUCE_THRESHOLD = 6000  # 触发分组概括的事件表格估算token数
+SUMMARY_CHUNK_TOKENS = 3000  # 每组事件表格的估算token上限
+SUMMARY_PARTIAL_MAX_CHARS = 400  # 每组要点的字数上限
+SUMMARY_MAX_WORKERS = 4  # 分组概括的最大并发数
+
+# Metrics Configuration
+# 每次运行结束后写出各阶段（search/parse/source/analyze/summary/publish等）的耗时分位数、token和费用：
+# run-<时间>-<任务>.json 为单次运行汇总，metrics.prom 为进程累计值（Prometheus文本格式）
+METRICS_DIR = "data/metrics"
+
 # Logging Configuration
 LOG_FILE = "finance_events_collector.log"
 LOG_LEVEL = "INFO" 
\ No newline at end of file
@@ -1,13 +1,74 @@
 import os
 import json
+import math
 import logging
 import re
 import time
-import asyncio
-import aiohttp
-from openai import OpenAI  # 导入OpenAI SDK
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from config import DEEPSEEK_API_KEY, DEEPSEEK_MODEL, WEEKLY_SEARCH_PROMPT, DAILY_SEARCH_PROMPT
+from config import (
+    DEEPSEEK_API_KEY,
+    DEEPSEEK_MODEL,
+    WEEKLY_SEARCH_PROMPT,
+    DAILY_SEARCH_PROMPT,
+    ENRICHMENT_MAX_WORKERS,
+    ENRICHMENT_MODE,
+    ENRICHMENT_BATCH_MIN_SIZE,
+    ENRICHMENT_BATCH_MAX_SIZE,
+    SEARCH_STRUCTURED_OUTPUT,
+    LOCAL_PARSE_ENABLED,
+    STREAMING_ENABLED,
+    BREAKING_NEWS_STATE_PATH,
+    BREAKING_NEWS_INTERVAL,
+    BREAKING_NEWS_MIN_INTERVAL,
+    BREAKING_NEWS_MAX_INTERVAL,
+    BREAKING_NEWS_BUSY_THRESHOLD,
+    BREAKING_NEWS_BUSY_KEYWORDS,
+    BREAKING_NEWS_DEFAULT_LOOKBACK,
+    BREAKING_NEWS_MAX_LOOKBACK,
+    EVENT_LEDGER_ENABLED,
+    EVENT_LEDGER_PATH,
+    EVENT_LEDGER_TTL,
+    NEAR_DUP_ENABLED,
+    NEAR_DUP_JACCARD_THRESHOLD,
+    NEAR_DUP_CONTAINMENT_THRESHOLD,
+    NEAR_DUP_TIME_TOLERANCE,
+    NEAR_DUP_DISTINGUISHING_TERMS,
+    NEAR_DUP_HISTORY_PATH,
+    NEAR_DUP_HISTORY_DAYS,
+    EVENT_STORE_ENABLED,
+    EVENT_STORE_PATH,
+    DAILY_SEED_FROM_WEEKLY,
+    DAILY_DELTA_PROMPT
+)
+from http_pool import get_deepseek_client
+from state_store import JsonStateStore
+from event_ledger import EventLedger
+from event_store import EventStore
+from near_duplicates import NearDuplicateDetector, DuplicateCollapser, features, similarity, is_distinct
+from fingerprint import normalize_time, event_fingerprint
+from response_cache import (
+    cached_chat_completion,
+    stream_chat_completion,
+    store_response,
+    discard_response,
+    get_response_cache
+)
+from event_stream import IncrementalEventParser
+from json_extract import extract_json_object, extract_json_array
+from event_model import Event, EarningsEvent, event_from_dict, events_to_json
+from analysis_parser import (
+    URL_PATTERN,
+    parse_sections,
+    parse_batch_analysis,
+    normalize_confidence,
+    normalize_sentiment,
+    infer_sentiment,
+    first_line
+)
+from metrics import get_metrics
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', encoding='utf-8')
@@ -21,78 +82,330 @@ class ParseError(Exception):
     """数据解析相关错误"""
     pass
 
+# 搜索时要求直接输出的结构化格式，便于在本地解析
+STRUCTURED_OUTPUT_INSTRUCTION = """
+输出格式要求：请直接输出一个JSON数组，每个事件一个对象，不要附加其他说明。每个对象包含以下字段：
+- date: 事件日期（YYYY-MM-DD格式，可选）
+- time: 事件发生时间（HH:MM格式，或"盘前"/"盘后"）
+- description: 事件描述（中文，至少10个字符）
+- type: 事件类型（如：经济数据、财报事件、政策变动、市场新闻等）"""
+
+# "每行一个事件"文本格式的行解析模式：可选序号、日期，必需时间（可带上午/下午或AM/PM），其后为描述
+EVENT_LINE_PATTERN = re.compile(
+    r'^(?:[-*•·]\s*|\d+[.、)）]\s*)?'
+    r'(?:(?P<date>\d{4}-\d{1,2}-\d{1,2}|\d{4}/\d{1,2}/\d{1,2}|(?:\d{4}年)?\d{1,2}月\d{1,2}[日号])\s*'
+    r'(?:[（(]?(?:周|星期)[一二三四五六日天][)）]?)?\s*)?'
+    r'(?:美东时间|北京时间)?\s*'
+    r'(?:(?P<period>上午|下午|晚上|凌晨)\s*)?'
+    r'(?P<time>\d{1,2}:\d{2}|美股盘[前中后]|盘[前中后]|开盘|收盘)'
+    r'(?:\s*(?P<meridiem>[AaPp]\.?[Mm]\.?)(?![A-Za-z]))?'
+    r'\s*(?:ET|EST|EDT|（美东时间）|\(美东时间\))?\s*[:：\-–—|]?\s*'
+    r'(?P<desc>.+)$'
+)
+
+# 表示下午的时段标记，12小时制时间需要加12小时
+PM_PERIODS = ("下午", "晚上", "p")
+
+# 个股列表中需要去掉的Markdown加粗、花括号和引号
+STOCKS_CLEANUP_PATTERN = re.compile(r'\*\*|\{|\}|"')
+
+# 事件类型关键词，按优先级排列
+EVENT_TYPE_KEYWORDS = [
+    ("财报事件", ["财报", "业绩", "earnings", "EPS"]),
+    ("经济数据", ["CPI", "PPI", "GDP", "PCE", "PMI", "非农", "就业", "失业", "零售销售", "消费者信心", "褐皮书", "通胀", "数据"]),
+    ("政策变动", ["美联储", "FOMC", "利率", "议息", "政策", "监管", "关税"]),
+    ("IPO", ["IPO", "上市"]),
+    ("分红除息", ["分红", "除息", "股息"])
+]
+
+# 每日增量搜索中已知事件被取消或推迟时使用的事件类型；逐行格式没有类型字段，按描述关键词识别
+CANCELLED_EVENT_TYPE = "已取消"
+CANCELLED_PATTERN = re.compile(r'已取消|取消举行|推迟|延期')
+
+class EnrichmentSession:
+    """事件增强会话
+    
+    事件可以逐个提交（例如流式解析时每解析出一个事件就提交），
+    增强任务立即在线程池中并发执行；finish() 等待全部完成并按提交顺序返回事件。
+    batch 模式下事件先在缓冲区累积，满一个批次即提交。
+    已处理过的事件直接复用台账中的增强结果，不再提交任务；
+    与本次已提交事件近似重复的事件在提交前合并。
+    reuse 为False时不做近似重复合并也不读取台账，每个事件都重新增强（结果仍写入台账）。
+    """
+
+    def __init__(self, collector, mode=None, batch_size=None, reuse=True):
+        self.collector = collector
+        self.reuse = reuse
+        self.mode = mode or collector.enrichment_mode
+        self.batch_size = batch_size or ENRICHMENT_BATCH_MAX_SIZE
+        self.executor = ThreadPoolExecutor(max_workers=collector.max_workers)
+        self.events = []
+        self.pending_batch = []
+        self.tasks = []  # (事件列表, 步骤名称, future)
+        self.start = time.perf_counter()
+        self.first_completed = None
+        self.reused = set()  # 复用台账结果的事件
+        self.pending_records = {}  # 新事件: (指纹, 报告日期, 增强前的字段)
+        self.fallbacks = set()  # 任一增强步骤失败、使用了默认值的事件，不写入台账
+        detector = collector.near_duplicates
+        self.collapser = DuplicateCollapser(detector) if detector is not None and reuse else None
+        self._lock = threading.Lock()
+
+    def _reuse_from_ledger(self, event):
+        """台账中已有该事件时直接写入增强结果，返回是否复用"""
+        ledger = self.collector.ledger
+        if ledger is None:
+            return False
+        report_date = event.get("date") or datetime.now().strftime("%Y-%m-%d")
+        fingerprint = event_fingerprint(event, report_date)
+        enrichment = ledger.get(fingerprint) if self.reuse else None
+        if enrichment is None and self.reuse and self.collapser is not None:
+            # 同一事件的改写或改期：沿用历史事件的增强结果，事件本身保留本次的时间和描述
+            history_key = self.collapser.history_keys.get(id(event))
+            if history_key is not None:
+                enrichment = ledger.get(history_key)
+        if enrichment is not None:
+            event.update(enrichment)
+            self.reused.add(id(event))
+            return True
+        self.pending_records[id(event)] = (fingerprint, report_date, dict(event))
+        return False
+
+    def _record_to_ledger(self):
+        """将新事件的增强结果写入台账，任一步骤失败（使用了默认值）的事件不写入，下次运行重新增强"""
+        records = []
+        for event in self.events:
+            pending = self.pending_records.get(id(event))
+            if pending is None or id(event) in self.fallbacks:
+                continue
+            fingerprint, report_date, before = pending
+            enrichment = {key: value for key, value in event.items() if key not in before or before[key] != value}
+            if enrichment:
+                records.append((fingerprint, report_date, enrichment))
+        self.collector.ledger.put_many(records)
+
+    def submit(self, event):
+        """提交一个待增强的事件"""
+        if self.collapser is not None and self.collapser.add(event) is None:
+            return
+        self.events.append(event)
+        if self._reuse_from_ledger(event):
+            return
+        if self.mode == "batch":
+            self.pending_batch.append(event)
+            if len(self.pending_batch) >= self.batch_size:
+                self._flush_batch()
+            return
+        for name, func, fallback in self.collector._enrichment_steps():
+            future = self.executor.submit(self.collector._run_timed, func, event, fallback)
+            self._track([event], name, future)
+
+    def _flush_batch(self):
+        """提交缓冲区中的事件作为一个批次"""
+        if not self.pending_batch:
+            return
+        batch = self.pending_batch
+        self.pending_batch = []
+        future = self.executor.submit(self.collector._run_batch_timed, batch)
+        self._track(batch, "批量", future)
+
+    def _track(self, events, name, future):
+        self.tasks.append((events, name, future))
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        with self._lock:
+            if self.first_completed is None:
+                self.first_completed = time.perf_counter() - self.start
+
+    def finish(self):
+        """等待所有增强任务完成，按提交顺序返回事件并记录逐事件耗时"""
+        self._flush_batch()
+        try:
+            index = {id(event): i for i, event in enumerate(self.events)}
+            timings = [
+                {"description": event.get("description", "")[:50], "seconds": {}}
+                for event in self.events
+            ]
+            total_calls = 0
+            call_times = []
+            for events, name, future in self.tasks:
+                calls, seconds, fallback = future.result()
+                # 单事件步骤返回是否使用了默认值，批次返回使用了默认值的事件列表
+                failed = events if fallback is True else (fallback or [])
+                self.fallbacks.update(id(event) for event in failed)
+                total_calls += calls
+                call_times.append(seconds)
+                for event in events:
+                    timings[index[id(event)]]["seconds"][name] = round(seconds, 3)
+        finally:
+            self.executor.shutdown(wait=True)
+        
+        if self.collapser is not None:
+            self.collapser.apply_merges()
+        
+        for event, timing in zip(self.events, timings):
+            if id(event) in self.reused:
+                step_text = "复用已有分析"
+            else:
+                step_text = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timing["seconds"].items())
+            logger.info(f"完成事件分析: {timing['description']}... ({step_text})")
+        
+        if self.collector.ledger is not None and self.events:
+            self._record_to_ledger()
+            reused = len(self.reused)
+            logger.info(
+                f"增强结果复用率: {reused}/{len(self.events)} ({reused / len(self.events):.0%})，"
+                f"新事件 {len(self.events) - reused} 个"
+            )
+        self.collector.last_enrichment_reuse = {"reused": len(self.reused), "total": len(self.events)}
+        if self.collapser is not None and (self.collapser.merged or self.collapser.matched_history):
+            logger.info(
+                f"近似重复事件: 合并 {self.collapser.merged} 个，"
+                f"与历史事件的不同表述对应 {self.collapser.matched_history} 个"
+            )
+        
+        if call_times:
+            elapsed = time.perf_counter() - self.start
+            logger.info(
+                f"事件分析完成: 总耗时 {elapsed:.2f}s, 首个事件完成 {self.first_completed:.2f}s, "
+                f"最慢单次任务 {max(call_times):.2f}s, 任务耗时合计 {sum(call_times):.2f}s, "
+                f"API调用 {total_calls} 次"
+            )
+        self.collector.last_enrichment_timings = timings
+        return self.events
+
 class DataCollector:
+    # 分析失败时使用的默认值
+    DEFAULT_ANALYSIS = {
+        "market_phase": "其他",
+        "market_impact": "影响不确定",
+        "industry_impact": "暂无行业影响分析",
+        "related_stocks": "无相关个股",
+        "sentiment": "neutral"  # 默认使用中性
+    }
+
+    # 来源查询失败时使用的默认值
+    DEFAULT_SOURCE = {
+        "source_name": "未知来源",
+        "source_url": "",
+        "source_type": "其他"
+    }
+
     def __init__(self):
         self.deepseek_api_key = DEEPSEEK_API_KEY
-        # 初始化OpenAI客户端，配置为使用DeepSeek API
-        self.client = OpenAI(
-            api_key=self.deepseek_api_key,
-            base_url="https://api.deepseek.com",
-            default_headers={"Content-Type": "application/json; charset=utf-8"}
-        )
+        # 使用共享连接池中的OpenAI客户端，配置为使用DeepSeek API
+        self.client = get_deepseek_client()
         self.model = DEEPSEEK_MODEL
         self.max_retries = 3  # 最大重试次数
+        self.metrics = get_metrics()  # 各阶段调用的耗时和token统计
         self.retry_delay = 2  # 重试延迟（秒）
+        self.max_workers = ENRICHMENT_MAX_WORKERS  # 事件增强的最大并发数
+        self.enrichment_mode = ENRICHMENT_MODE  # 事件增强模式
+        self.structured_search = SEARCH_STRUCTURED_OUTPUT  # 搜索时直接要求JSON输出
+        self.local_parse_enabled = LOCAL_PARSE_ENABLED  # 优先在本地解析搜索结果
+        self.streaming_enabled = STREAMING_ENABLED  # 流式搜索并增量解析事件
+        self.last_enrichment_timings = []  # 最近一次增强的逐事件耗时
+        # 突发新闻的高水位时间戳和当前轮询间隔，跨进程重启保留
+        self.breaking_state = JsonStateStore(BREAKING_NEWS_STATE_PATH)
+        # 已处理事件台账，重复出现的事件复用已有的来源和分析
+        self.ledger = EventLedger(EVENT_LEDGER_PATH, EVENT_LEDGER_TTL) if EVENT_LEDGER_ENABLED else None
+        self.last_enrichment_reuse = {"reused": 0, "total": 0}  # 最近一次增强的台账复用情况
+        # 近似重复检测：同一事件的不同表述在增强前合并
+        self.near_duplicates = NearDuplicateDetector(
+            NEAR_DUP_JACCARD_THRESHOLD,
+            NEAR_DUP_CONTAINMENT_THRESHOLD,
+            history_path=NEAR_DUP_HISTORY_PATH,
+            history_days=NEAR_DUP_HISTORY_DAYS,
+            time_tolerance=NEAR_DUP_TIME_TOLERANCE,
+            distinguishing_terms=NEAR_DUP_DISTINGUISHING_TERMS
+        ) if NEAR_DUP_ENABLED else None
+        # 历史事件库：每次收集的完整事件都写入本地，供之后查询和复用
+        self.store = EventStore(EVENT_STORE_PATH) if EVENT_STORE_ENABLED else None
+        self.daily_seed_enabled = DAILY_SEED_FROM_WEEKLY  # 每日收集复用历史事件库中当天的已知事件
+        self._purge_expired_responses()
+        
+    def _purge_expired_responses(self):
+        """启动时清理响应缓存中已过期的条目，过期条目平时只在读取时才删除"""
+        cache = get_response_cache()
+        if cache is None:
+            return
+        try:
+            removed = cache.purge_expired()
+            if removed:
+                logger.info(f"已清理 {removed} 条过期的响应缓存")
+        except Exception as e:
+            logger.warning(f"清理过期响应缓存失败: {str(e)}")
+        
+    def _retry_with_exponential_backoff(self, func, *args, retry_if=None, **kwargs):
+        """使用指数退避的重试机制
         
-    def _retry_with_exponential_backoff(self, func, *args, **kwargs):
-        """使用指数退避的重试机制"""
+        retry_if 为可选的判断函数，接收异常，返回False时不再重试直接抛出
+        （例如流式响应已经收到部分内容时）。
+        """
         for attempt in range(self.max_retries):
             try:
-                return func(*args, **kwargs)
+                with self.metrics.attempt(attempt):
+                    return func(*args, **kwargs)
             except Exception as e:
                 if attempt == self.max_retries - 1:  # 最后一次尝试
                     raise e
+                if retry_if is not None and not retry_if(e):
+                    raise e
                 wait_time = (2 ** attempt) * self.retry_delay
                 logger.warning(f"操作失败，{wait_time}秒后重试: {str(e)}")
                 time.sleep(wait_time)
         
-    def _search_with_deepseek(self, prompt):
-        """使用DeepSeek搜索市场事件"""
+    def _build_search_messages(self, prompt, structured):
+        """构建搜索请求的消息列表"""
+        if structured:
+            prompt = f"{prompt}\n{STRUCTURED_OUTPUT_INSTRUCTION}"
+        return [
+            {"role": "system", "content": "你是一个专业的金融分析师，专门收集和整理美股市场事件信息。请用中文提供准确、全面的信息，并按时间顺序排列。所有事件描述都必须使用中文。"}, 
+            {"role": "user", "content": prompt}
+        ]
+
+    def _search_request(self, prompt, structured):
+        """构建搜索请求参数，流式与非流式搜索共用同一缓存键"""
+        return dict(
+            model=self.model,
+            messages=self._build_search_messages(prompt, structured),
+            temperature=0.3,
+            max_tokens=2000
+        )
+
+    def _search_with_deepseek(self, prompt, structured=False, parse=None):
+        """使用DeepSeek搜索市场事件
+        
+        Args:
+            prompt (str): 搜索提示词
+            structured (bool): 是否要求直接输出JSON事件列表
+            parse (callable): 搜索结果的解析函数，给出时返回解析结果，且只缓存解析成功的响应；
+                解析错误直接抛出，不重试也不转换为APIError
+        """
         try:
-            logger.info(f"Searching with prompt: {prompt}")
-            
-            async def _do_search_async():
-                headers = {
-                    "Content-Type": "application/json; charset=utf-8",
-                    "Authorization": f"Bearer {self.deepseek_api_key}"
-                }
-                
-                data = {
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": "你是一个专业的金融分析师，专门收集和整理美股市场事件信息。请用中文提供准确、全面的信息，并按时间顺序排列。所有事件描述都必须使用中文。"}, 
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 2000
-                }
-                
-                # 配置 SSL 连接器
-                connector = aiohttp.TCPConnector(ssl=False)
-                
-                async with aiohttp.ClientSession(connector=connector) as session:
-                    async with session.post(
-                        "https://api.deepseek.com/v1/chat/completions",
-                        headers=headers,
-                        json=data
-                    ) as response:
-                        if response.status != 200:
-                            text = await response.text()
-                            raise APIError(f"DeepSeek API returned status code {response.status}: {text}")
-                        
-                        result = await response.json()
-                        return result["choices"][0]["message"]["content"]
+            request = self._search_request(prompt, structured)
+            logger.info(f"Searching with prompt: {request['messages'][-1]['content']}")
             
             def _do_search():
-                return asyncio.run(_do_search_async())
+                return cached_chat_completion(self.client, "search", parse=parse, **request)
             
-            result = self._retry_with_exponential_backoff(_do_search)
+            result = self._retry_with_exponential_backoff(
+                _do_search,
+                retry_if=lambda e: not isinstance(e, (ParseError, json.JSONDecodeError))
+            )
             logger.info("Search completed successfully")
             return result
             
+        except (ParseError, json.JSONDecodeError):
+            raise
         except Exception as e:
             logger.error(f"Error searching with DeepSeek: {str(e)}")
             raise APIError(f"DeepSeek API call failed: {str(e)}")
+
+    def _discard_search(self, prompt, structured=False):
+        """删除无法完整使用的搜索响应缓存（如被截断的JSON数组）"""
+        discard_response("search", **self._search_request(prompt, structured))
     
     def _analyze_event(self, event):
         """分析单个事件，添加市场影响、情绪等信息"""
@@ -110,8 +423,8 @@ class DataCollector:
 3. industry_impact: 对相关行业的影响分析
 4. related_stocks: 可能受影响的主要个股代码（如AAPL、GOOGL等）
 5. sentiment: 市场情绪分析，格式如下：
-   - 如果结果确定：使用 "bullish"（利好）、"bearish"（利空）或 "neutral"（中性）
-   - 如果有多种可能：使用数组格式，如 ["bullish if 数据好于预期", "bearish if 数据差于预期"]
+   - 只能是 "bullish"（利好）、"bearish"（利空）或 "neutral"（中性）之一
+   - 如果有多种可能：选择可能性更大的一种，不同情况在 market_impact 中说明
 
 输出格式示例：
 {{
@@ -119,31 +432,25 @@ class DataCollector:
   "market_impact": "如果数据好于预期，可能推动大盘上涨0.5%；如果差于预期，可能引发回调",
   "industry_impact": "科技行业受影响最大，数据好于预期将带动芯片股走强",
   "related_stocks": "NVDA, AMD, INTC, TSM",
-  "sentiment": ["bullish if 数据好于预期", "bearish if 数据差于预期"]
+  "sentiment": "bullish"
 }}
 
 请确保输出是有效的JSON格式。每项分析控制在100字以内。"""
 
-            # 调用 DeepSeek API 进行分析
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+            # 调用 DeepSeek API 进行分析，只缓存能解析出JSON的响应
+            analysis = cached_chat_completion(
+                self.client,
+                "analyze",
+                model=self.model,
                 messages=[
                     {"role": "system", "content": "你是一个专业的金融分析师，擅长分析市场事件的影响。请提供准确、专业、简明的分析，并始终以有效的JSON格式输出。"},
                     {"role": "user", "content": analysis_prompt}
                 ],
                 temperature=0.3,
-                max_tokens=1000
+                max_tokens=1000,
+                parse=extract_json_object
             )
             
-            # 提取JSON部分
-            content = response.choices[0].message.content
-            json_match = re.search(r'\{[\s\S]*\}', content)
-            if json_match:
-                content = json_match.group()
-            
-            # 解析分析结果
-            analysis = json.loads(content)
-            
             # 更新事件信息
             event.update(analysis)
             
@@ -151,15 +458,8 @@ class DataCollector:
             
         except Exception as e:
             logger.error(f"分析事件时出错: {str(e)}")
-            # 返回带有默认值的事件
-            event.update({
-                "market_phase": "其他",
-                "market_impact": "影响不确定",
-                "industry_impact": "暂无行业影响分析",
-                "related_stocks": "无相关个股",
-                "sentiment": "neutral"  # 默认使用中性
-            })
-            return event
+            # 由 _run_timed 写入默认值并标记为失败
+            raise
 
     def _get_event_source(self, event):
         """获取事件的信息来源"""
@@ -187,26 +487,20 @@ class DataCollector:
 
 请确保输出是有效的JSON格式，必须包含source_url字段。"""
 
-            # 调用 DeepSeek API 获取来源
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+            # 调用 DeepSeek API 获取来源，只缓存能解析出JSON的响应
+            source_info = cached_chat_completion(
+                self.client,
+                "source",
+                model=self.model,
                 messages=[
                     {"role": "system", "content": "你是一个专业的金融信息检索专家，擅长查找市场事件的原始信息来源。请提供准确、权威的来源信息，并始终以有效的JSON格式输出，确保包含source_url字段。"},
                     {"role": "user", "content": source_prompt}
                 ],
                 temperature=0.3,
-                max_tokens=500
+                max_tokens=500,
+                parse=extract_json_object
             )
             
-            # 提取JSON部分
-            content = response.choices[0].message.content
-            json_match = re.search(r'\{[\s\S]*\}', content)
-            if json_match:
-                content = json_match.group()
-            
-            # 解析来源信息
-            source_info = json.loads(content)
-            
             # 确保source_url存在
             if not source_info.get("source_url"):
                 source_info["source_url"] = ""
@@ -221,11 +515,82 @@ class DataCollector:
             
         except Exception as e:
             logger.error(f"获取事件来源时出错: {str(e)}")
-            # 确保即使出错也设置基本的来源信息
-            event["source_name"] = "未知来源"
-            event["source_url"] = ""
-            event["source_type"] = "其他"
-            return "未知来源"
+            # 由 _run_timed 写入默认来源并标记为失败
+            raise
+
+    def _enrich_event_fused(self, event):
+        """通过一次请求同时获取事件来源和影响分析，缺失字段使用默认值"""
+        defaults = {**self.DEFAULT_SOURCE, **self.DEFAULT_ANALYSIS}
+        try:
+            description = event.get('description', '')
+            if not description:
+                event.update(defaults)
+                return event
+            
+            # 构建合并提示词
+            enrich_prompt = f"""作为专业的金融分析师，请查找以下美股市场事件的信息来源并分析其影响：
+
+事件描述：{description}
+事件类型：{event.get('type', '其他')}
+发生时间：{event.get('time', '未指定时间')}
+
+请以JSON格式输出以下字段：
+1. source_name: 最权威的信息来源名称（官方来源如公司官网、SEC文件、政府网站，或权威媒体如Bloomberg、Reuters、CNBC等）
+2. source_url: 信息来源链接
+3. source_type: 来源类型，可选值：官方网站、官方媒体、行业媒体、其他
+4. market_phase: 事件发生的市场阶段（如盘前、盘中、盘后等）
+5. market_impact: 对整体市场的潜在影响
+6. industry_impact: 对相关行业的影响分析
+7. related_stocks: 可能受影响的主要个股代码（如AAPL、GOOGL等）
+8. sentiment: 市场情绪分析，格式如下：
+   - 只能是 "bullish"（利好）、"bearish"（利空）或 "neutral"（中性）之一
+   - 如果有多种可能：选择可能性更大的一种，不同情况在 market_impact 中说明
+
+输出格式示例：
+{{
+  "source_name": "Bloomberg",
+  "source_url": "https://www.bloomberg.com/news/articles/...",
+  "source_type": "官方媒体",
+  "market_phase": "盘前",
+  "market_impact": "如果数据好于预期，可能推动大盘上涨0.5%；如果差于预期，可能引发回调",
+  "industry_impact": "科技行业受影响最大，数据好于预期将带动芯片股走强",
+  "related_stocks": "NVDA, AMD, INTC, TSM",
+  "sentiment": "bullish"
+}}
+
+请确保输出是有效的JSON格式，必须包含source_url字段。每项分析控制在100字以内。"""
+
+            # 调用 DeepSeek API 一次性完成来源查询和分析，只缓存能解析出JSON的响应
+            result = cached_chat_completion(
+                self.client,
+                "enrich",
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "你是一个专业的金融分析师和信息检索专家，擅长查找市场事件的权威来源并分析其影响。请提供准确、专业、简明的内容，并始终以有效的JSON格式输出。"},
+                    {"role": "user", "content": enrich_prompt}
+                ],
+                temperature=0.3,
+                max_tokens=1200,
+                parse=extract_json_object
+            )
+            
+            # 逐字段合并，缺失或为空的字段使用默认值
+            missing = []
+            for field, default in defaults.items():
+                value = result.get(field)
+                if value in (None, "", []):
+                    missing.append(field)
+                    value = default
+                event[field] = value
+            if missing:
+                logger.warning(f"增强结果缺少字段 {', '.join(missing)}: {description[:50]}...")
+            
+            return event
+            
+        except Exception as e:
+            logger.error(f"合并增强事件时出错: {str(e)}")
+            # 由 _run_timed 写入默认值并标记为失败
+            raise
 
     def _clean_event_data(self, event):
         """清理和标准化事件数据"""
@@ -323,11 +688,128 @@ class DataCollector:
         
         return True
         
-    def _parse_events(self, text):
-        """解析事件文本，提取事件列表"""
+    def _validate_and_clean_events(self, raw_events):
+        """验证并清理原始事件列表，跳过无效事件"""
+        events = []
+        for raw_event in raw_events:
+            if not isinstance(raw_event, Mapping):
+                continue
+            event = event_from_dict(raw_event)
+            try:
+                if self._validate_event(event):
+                    events.append(self._clean_event_data(event))
+            except ParseError as e:
+                logger.warning(f"跳过无效事件: {str(e)}")
+                continue
+        return events
+
+    def _normalize_event_date(self, date_text, report_date=None):
+        """将 YYYY-MM-DD、YYYY/MM/DD、YYYY年M月D日 或 M月D日 格式的日期统一为 YYYY-MM-DD
+        
+        没有年份的 M月D日 取离报告日期（YYYY-MM-DD，默认今天）最近的年份，
+        年末收集下周事件时 "1月2日" 会归到下一年。
+        """
+        if not date_text:
+            return None
+        match = re.match(r'^(\d{4})[-/年](\d{1,2})[-/月](\d{1,2})[日号]?$', date_text)
+        if match:
+            year, month, day = map(int, match.groups())
+            try:
+                return datetime(year, month, day).strftime("%Y-%m-%d")
+            except ValueError:
+                return None
+        
+        match = re.match(r'^(\d{1,2})月(\d{1,2})[日号]$', date_text)
+        if not match:
+            return None
+        month, day = map(int, match.groups())
+        reference = datetime.strptime(report_date, "%Y-%m-%d") if report_date else datetime.now()
+        candidates = []
+        for year in (reference.year - 1, reference.year, reference.year + 1):
+            try:
+                candidates.append(datetime(year, month, day))
+            except ValueError:
+                continue
+        if not candidates:
+            return None
+        return min(candidates, key=lambda date: abs(date - reference)).strftime("%Y-%m-%d")
+
+    def _infer_event_type(self, description):
+        """根据关键词推断事件类型"""
+        for event_type, keywords in EVENT_TYPE_KEYWORDS:
+            if any(keyword in description for keyword in keywords):
+                return event_type
+        return "市场新闻"
+
+    def _parse_event_line(self, line, report_date=None):
+        """解析"每行一个事件"格式中的一行，无法识别时间时返回None
+        
+        12小时制时间（"下午2:00"、"12:00 PM"）转换为24小时制；没有年份的日期按报告日期确定年份。
+        """
+        line = line.replace("**", "").strip()
+        if not line:
+            return None
+        match = EVENT_LINE_PATTERN.match(line)
+        if not match:
+            return None
+        
+        description = match.group("desc").strip()
+        event_time = match.group("time")
+        period = match.group("meridiem") or match.group("period")
+        if period and re.match(r'^\d{1,2}:\d{2}$', event_time):
+            hour, minute = event_time.split(":")
+            hour = int(hour) % 12
+            if period.lower().startswith(PM_PERIODS):
+                hour += 12
+            event_time = f"{hour}:{minute}"
+        if re.match(r'^\d:\d{2}$', event_time):
+            event_time = "0" + event_time
+        event = {
+            "time": event_time,
+            "description": description,
+            "type": self._infer_event_type(description)
+        }
+        event_date = self._normalize_event_date(match.group("date"), report_date)
+        if event_date:
+            event["date"] = event_date
+        return event
+
+    def _parse_events_locally(self, text, report_date=None):
+        """在本地解析搜索结果，无需额外的LLM调用
+        
+        优先解析搜索结果中的JSON数组；否则按"每行一个事件"的格式逐行解析，
+        只保留能识别出时间的行。report_date 用于确定没有年份的日期属于哪一年。
+        """
+        if not text:
+            return []
+        
+        # 优先尝试JSON数组，被截断的数组保留其中完整的事件
         try:
-            # 构建解析提示词
-            parse_prompt = f"""请将以下文本解析为结构化的事件列表。
+            parsed, partial = extract_json_array(text)
+            if partial:
+                logger.warning(f"搜索结果中的JSON数组不完整，保留了 {len(parsed)} 个完整事件")
+            for event in parsed:
+                if event.get("date"):
+                    event["date"] = self._normalize_event_date(event["date"], report_date) or event["date"]
+            events = self._validate_and_clean_events(parsed)
+            if events:
+                return events
+        except json.JSONDecodeError:
+            pass
+        
+        # 逐行解析
+        raw_events = []
+        for line in text.splitlines():
+            event = self._parse_event_line(line, report_date)
+            if event:
+                raw_events.append(event)
+        
+        return self._validate_and_clean_events(raw_events)
+
+    def _parse_events_with_llm(self, text):
+        """调用LLM将非结构化文本解析为事件列表"""
+        # 构建解析提示词
+        parse_prompt = f"""请将以下文本解析为结构化的事件列表。
 
 {text}
 
@@ -347,71 +829,208 @@ class DataCollector:
 
 请确保输出是有效的JSON格式。"""
 
-            # 解析事件
-            events = []
-            try:
-                # 调用 DeepSeek API 进行解析
-                response = self._retry_with_exponential_backoff(
-                    lambda: self.client.chat.completions.create(
-                        model="deepseek-chat",
-                        messages=[
-                            {"role": "system", "content": "你是一个专业的文本解析器，擅长将非结构化文本转换为结构化数据。请始终以有效的JSON格式输出。"},
-                            {"role": "user", "content": parse_prompt}
-                        ],
-                        temperature=0.3,
-                        max_tokens=2000
-                    )
-                )
-                
-                # 提取JSON部分
-                content = response.choices[0].message.content
-                json_match = re.search(r'\[[\s\S]*\]', content)
-                if json_match:
-                    content = json_match.group()
-                
-                # 解析事件列表
-                parsed_events = json.loads(content)
-                
-                # 验证和清理每个事件
-                for event in parsed_events:
-                    try:
-                        if self._validate_event(event):
-                            cleaned_event = self._clean_event_data(event)
-                            events.append(cleaned_event)
-                    except ParseError as e:
-                        logger.warning(f"跳过无效事件: {str(e)}")
-                        continue
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON解析错误: {str(e)}")
-                raise ParseError(f"无效的JSON格式: {str(e)}")
+        try:
+            # 调用 DeepSeek API 进行解析，只缓存能解析出JSON数组的响应；
+            # 解析失败不重试（重试只针对接口错误）
+            request = dict(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "你是一个专业的文本解析器，擅长将非结构化文本转换为结构化数据。请始终以有效的JSON格式输出。"},
+                    {"role": "user", "content": parse_prompt}
+                ],
+                temperature=0.3,
+                max_tokens=2000
+            )
+            events, partial = self._retry_with_exponential_backoff(
+                lambda: cached_chat_completion(self.client, "parse", parse=extract_json_array, **request),
+                retry_if=lambda e: not isinstance(e, json.JSONDecodeError)
+            )
             
-            # 分析和增强事件
-            logger.info("开始分析事件...")
-            enhanced_events = []
-            for event in events:
-                try:
-                    # 获取事件来源
-                    logger.info(f"获取事件来源: {event.get('description', '')[:50]}...")
-                    source = self._get_event_source(event)
-                    
-                    # 分析事件
-                    logger.info(f"分析事件: {event.get('description', '')[:50]}...")
-                    enhanced_event = self._analyze_event(event)
-                    enhanced_events.append(enhanced_event)
-                    logger.info(f"完成事件分析: {event.get('description', '')[:50]}...")
-                except Exception as e:
-                    logger.error(f"处理事件时出错: {str(e)}")
-                    # 如果处理失败，添加基本事件信息
-                    events.append(event)
+            # 被截断时保留其中完整的事件，但不缓存不完整的响应
+            if partial:
+                logger.warning(f"解析结果中的JSON数组不完整，保留了 {len(events)} 个完整事件")
+                discard_response("parse", **request)
             
-            logger.info(f"成功解析并增强了 {len(enhanced_events)} 个事件")
-            return enhanced_events
+            # 验证和清理每个事件
+            return self._validate_and_clean_events(events)
             
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON解析错误: {str(e)}")
+            raise ParseError(f"无效的JSON格式: {str(e)}")
+
+    def _extract_events(self, text, report_date=None):
+        """从搜索结果中提取事件，本地解析失败时才调用LLM解析"""
+        if self.local_parse_enabled:
+            events = self._parse_events_locally(text, report_date)
+            if events:
+                logger.info(f"本地解析得到 {len(events)} 个事件，跳过LLM解析")
+                return events
+            logger.info("本地解析未得到有效事件，改用LLM解析")
+        return self._parse_events_with_llm(text)
+
+    def _parse_search_result(self, text, report_date=None):
+        """解析搜索结果文本，用作搜索请求的解析函数：结果为空时返回None，解析失败时返回空列表"""
+        if not text:
+            return None
+        try:
+            return self._extract_events(text, report_date)
         except Exception as e:
             logger.error(f"解析事件时出错: {str(e)}")
             return []
+
+    def _enrich_parsed_events(self, events):
+        """增强从搜索结果中解析出的事件，搜索结果为空（None）时返回None"""
+        if events is None:
+            return None
+        enhanced_events = self._enrich_events(events)
+        logger.info(f"成功解析并增强了 {len(enhanced_events)} 个事件")
+        return enhanced_events
     
+    def _run_timed(self, func, event, fallback):
+        """执行单个增强步骤，失败时写入默认值，返回 (API调用次数, 耗时, 是否使用了默认值)"""
+        start = time.perf_counter()
+        is_fallback = False
+        try:
+            func(event)
+        except Exception as e:
+            logger.error(f"处理事件时出错: {str(e)}")
+            # 如果处理失败，保留基本事件信息并补充默认值
+            event.update(fallback)
+            is_fallback = True
+        return 1, time.perf_counter() - start, is_fallback
+
+    def _enrichment_steps(self):
+        """根据增强模式返回每个事件需要执行的步骤 (名称, 方法, 默认值)"""
+        if self.enrichment_mode == "fused":
+            return [("合并增强", self._enrich_event_fused, {**self.DEFAULT_SOURCE, **self.DEFAULT_ANALYSIS})]
+        return [
+            ("来源", self._get_event_source, self.DEFAULT_SOURCE),
+            ("分析", self._analyze_event, self.DEFAULT_ANALYSIS)
+        ]
+
+    def _enrich_events(self, events, reuse=True):
+        """并发获取所有事件的来源并进行分析，保持事件原始顺序
+        
+        每个事件的增强步骤作为独立任务提交到线程池，
+        整体耗时取决于最慢的单次调用，而不是所有调用之和。
+        reuse 为False时跳过近似重复合并和台账复用，所有事件都重新增强。
+        """
+        if not events:
+            self.last_enrichment_timings = []
+            return []
+        
+        if self.enrichment_mode == "batch":
+            return self._batch_enhance_events(events, reuse=reuse)
+        
+        logger.info(
+            f"开始并发分析 {len(events)} 个事件，增强模式: {self.enrichment_mode}，"
+            f"最大并发数: {self.max_workers}"
+        )
+        session = EnrichmentSession(self, reuse=reuse)
+        for event in events:
+            session.submit(event)
+        return session.finish()
+
+    def _submit_streamed_item(self, session, item, report_date=None):
+        """验证流式解析出的单个事件并立即提交增强"""
+        raw_event = self._parse_event_line(item, report_date) if isinstance(item, str) else item
+        if not raw_event:
+            return
+        if raw_event.get("date"):
+            raw_event["date"] = self._normalize_event_date(raw_event["date"], report_date) or raw_event["date"]
+        for event in self._validate_and_clean_events([raw_event]):
+            session.submit(event)
+
+    def _search_and_parse_streaming(self, prompt, report_date=None):
+        """流式搜索：每个事件一旦完整即验证、清理并提交增强，
+        使早期事件的增强与后续事件的生成重叠进行
+        
+        关闭本地解析时不做增量解析，只流式接收完整文本，再按 _extract_events 解析。
+        完整文本只有在流式响应正常结束且解析出事件时才写入缓存。
+        """
+        request = self._search_request(prompt, self.structured_search)
+        logger.info(f"Streaming search with prompt: {request['messages'][-1]['content']}")
+        
+        session = EnrichmentSession(self)
+        parser = IncrementalEventParser() if self.local_parse_enabled else None
+        chunks = []
+        start = time.perf_counter()
+        first_event_time = None
+        
+        def _consume_stream():
+            nonlocal first_event_time
+            stream = stream_chat_completion(self.client, "search", defer_cache=True, **request)
+            for delta in stream:
+                chunks.append(delta)
+                if parser is None:
+                    continue
+                for item in parser.feed(delta):
+                    self._submit_streamed_item(session, item, report_date)
+                    if first_event_time is None and session.events:
+                        first_event_time = time.perf_counter() - start
+                        logger.info(f"流式解析出首个事件: {first_event_time:.2f}s")
+            if parser is not None:
+                for item in parser.finish():
+                    self._submit_streamed_item(session, item, report_date)
+        
+        try:
+            # 尚未收到任何内容时可以整体重试，否则保留已解析的事件
+            self._retry_with_exponential_backoff(_consume_stream, retry_if=lambda e: not chunks)
+        except Exception as e:
+            logger.error(f"Error streaming search with DeepSeek: {str(e)}")
+            if not session.events:
+                session.finish()
+                raise APIError(f"DeepSeek API call failed: {str(e)}")
+            # 中途断开的响应不完整，不写入缓存
+            discard_response("search", **request)
+            return session.finish()
+        
+        logger.info(f"流式搜索完成: {time.perf_counter() - start:.2f}s，解析出 {len(session.events)} 个事件")
+        result_text = "".join(chunks)
+        if session.events:
+            store_response("search", content=result_text, **request)
+            return session.finish()
+        
+        # 流式解析未得到有效事件，退回到完整文本解析
+        session.finish()
+        events = self._parse_search_result(result_text, report_date)
+        if events:
+            store_response("search", content=result_text, **request)
+        elif events is not None:
+            discard_response("search", **request)
+        return self._enrich_parsed_events(events)
+
+    def _search_and_parse(self, prompt, report_date=None):
+        """搜索并解析、增强事件，搜索结果为空时返回None
+        
+        report_date（YYYY-MM-DD）用于确定搜索结果中没有年份的日期属于哪一年，默认今天。
+        """
+        if self.streaming_enabled:
+            return self._search_and_parse_streaming(prompt, report_date)
+        
+        # 只缓存能解析出事件的搜索结果
+        events = self._search_with_deepseek(
+            prompt,
+            structured=self.structured_search,
+            parse=lambda text: self._parse_search_result(text, report_date)
+        )
+        return self._enrich_parsed_events(events)
+
+    def _store_events(self, events, kind):
+        """将收集到的事件写入历史事件库，写入失败不影响本次收集"""
+        if self.store is None or not events:
+            return
+        try:
+            self.store.put_many(events, kind)
+        except Exception as e:
+            logger.error(f"写入历史事件库失败: {str(e)}")
+
+    def query_history(self, **filters):
+        """查询历史事件库，参数见 EventStore.query；未启用历史事件库时返回空列表"""
+        if self.store is None:
+            return []
+        return self.store.query(**filters)
+
     def collect_weekly_events(self):
         """收集下周的美股市场重大事件"""
         logger.info("Collecting weekly events")
@@ -425,163 +1044,288 @@ class DataCollector:
         # 构建搜索提示词
         prompt = f"{WEEKLY_SEARCH_PROMPT}\n日期范围: {date_range}"
         
-        # 搜索事件
-        result_text = self._search_with_deepseek(prompt)
-        if not result_text:
+        # 搜索并解析事件
+        events = self._search_and_parse(prompt, next_monday.strftime("%Y-%m-%d"))
+        if events is None:
             logger.error("Failed to collect weekly events")
             return []
-        
-        # 解析事件
-        events = self._parse_events(result_text)
         logger.info(f"Collected {len(events)} weekly events")
         
+        # 没有日期的事件无法确定属于哪一天，不写入历史事件库，也就不会成为每日收集的已知事件
+        dated_events = [event for event in events if event.get("date")]
+        if len(dated_events) < len(events):
+            logger.warning(f"{len(events) - len(dated_events)} 个周度事件缺少日期，未写入历史事件库")
+        self._store_events(dated_events, "weekly")
         return events
     
+    def _load_daily_seed(self, today):
+        """读取历史事件库中当天已知的事件（周度收集或当天早些时候的每日收集，含增强结果）"""
+        if not self.daily_seed_enabled or self.store is None:
+            return []
+        try:
+            return self.store.query(start_date=today, end_date=today, kind=("weekly", "daily"), earnings=False)
+        except Exception as e:
+            logger.error(f"读取历史事件库失败: {str(e)}")
+            return []
+
+    def _is_cancellation(self, event):
+        """增量搜索结果中的事件是否表示已知事件被取消或推迟"""
+        return event.get("type") == CANCELLED_EVENT_TYPE or bool(CANCELLED_PATTERN.search(event.get("description", "")))
+
+    def _match_seed_event(self, event, today, seed, seed_keys, seed_features, claimed):
+        """在已知事件中查找增量事件对应的事件，返回其下标，未找到时返回None
+
+        先按指纹精确匹配；否则按描述的相似度匹配（不比较时间，时间变化的事件也能对应上）。
+        """
+        index = seed_keys.get(event_fingerprint(event, today))
+        if index is not None and index not in claimed:
+            return index
+        feature = features(event.get("description", ""))
+        best, best_score = None, 0.0
+        for index, candidate in enumerate(seed_features):
+            if index in claimed:
+                continue
+            jaccard, containment = similarity(feature, candidate)
+            if jaccard < NEAR_DUP_JACCARD_THRESHOLD and containment < NEAR_DUP_CONTAINMENT_THRESHOLD:
+                continue
+            if is_distinct(event.get("description", ""), seed[index].get("description", ""), NEAR_DUP_DISTINGUISHING_TERMS):
+                continue
+            if jaccard > best_score:
+                best, best_score = index, jaccard
+        return best
+
+    def _merge_daily_delta(self, today, seed, added, changes, cancelled):
+        """将增量搜索的结果合并到已知事件中，按时间排序返回当天的完整事件列表
+
+        - 取消：从列表中移除对应的已知事件，该事件在历史事件库中标记为 cancelled
+        - 变化：替换对应的已知事件，指纹改变时旧事件标记为 superseded
+        - 新增：直接加入列表
+
+        Args:
+            added (list): 新增的事件
+            changes (list): (已知事件下标, 变化后的事件)
+            cancelled (list): 被取消的已知事件下标
+        """
+        merged = list(seed)
+        superseded = []
+        for index in cancelled:
+            merged[index] = None
+        for index, event in changes:
+            if event_fingerprint(event, today) != event_fingerprint(seed[index], today):
+                superseded.append(seed[index])
+            merged[index] = event
+
+        events = [event for event in merged if event is not None] + added
+        events.sort(key=lambda event: normalize_time(event.get("time", "")))
+        logger.info(
+            f"每日增量合并: 已知 {len(seed)} 个事件，新增 {len(added)} 个，"
+            f"变化 {len(changes)} 个，取消 {len(cancelled)} 个"
+        )
+        self._store_events([seed[index] for index in cancelled], "cancelled")
+        self._store_events(superseded, "superseded")
+        return events
+
+    def _collect_daily_delta(self, today, seed):
+        """以已知事件为基础，只向DeepSeek询问新增、变化和取消的事件，只增强新增和变化的事件"""
+        known = "\n".join(f"{event.get('time', '')}|{event.get('description', '')}" for event in seed)
+        prompt = f"{DAILY_DELTA_PROMPT}\nDate: {today}\n已知事件：\n{known}"
+        try:
+            reported = self._search_with_deepseek(
+                prompt,
+                structured=self.structured_search,
+                parse=lambda text: self._extract_events(text, today)
+            )
+        except Exception as e:
+            logger.warning(f"增量搜索失败，仅使用已知事件: {str(e)}")
+            reported = []
+
+        # 先与已知事件对应、分类，再增强：变化的事件若先经过近似重复合并，
+        # 时间相近的变化会被认回旧事件并沿用台账中的旧分析
+        seed_keys = {event_fingerprint(event, today): index for index, event in enumerate(seed)}
+        seed_features = [features(event.get("description", "")) for event in seed]
+        claimed = set()
+        cancelled, added, changes = [], [], []
+        for event in reported:
+            if not self._is_cancellation(event):
+                continue
+            index = self._match_seed_event(event, today, seed, seed_keys, seed_features, claimed)
+            if index is None:
+                logger.info(f"取消的事件不在已知事件中，忽略: {event.get('description', '')}")
+                continue
+            claimed.add(index)
+            cancelled.append(index)
+        for event in reported:
+            if self._is_cancellation(event):
+                continue
+            # 没有变化却被重复列出的已知事件直接沿用已有分析，不再增强
+            index = seed_keys.get(event_fingerprint(event, today))
+            if index is not None:
+                claimed.add(index)
+                continue
+            index = self._match_seed_event(event, today, seed, seed_keys, seed_features, claimed)
+            if index is None:
+                added.append(event)
+            else:
+                claimed.add(index)
+                changes.append((index, event))
+
+        # 变化的事件重新增强，不复用旧事件的分析
+        self._enrich_events([event for _, event in changes], reuse=False)
+        added = self._enrich_events(added)
+        return self._merge_daily_delta(today, seed, added, changes, cancelled)
+
     def collect_daily_events(self):
-        """收集当天的美股市场重大事件"""
+        """收集当天的美股市场重大事件
+        
+        历史事件库中已有当天的事件（通常来自周度收集）时，直接复用这些事件及其分析，
+        只搜索和增强新增、变化的事件；否则完整搜索当天的全部事件。
+        """
         logger.info("Collecting daily events")
         
         # 获取当天日期
         today = datetime.now().strftime("%Y-%m-%d")
         
-        # 构建搜索提示词
-        prompt = f"{DAILY_SEARCH_PROMPT}\nDate: {today}"
-        
-        # 搜索事件
-        result_text = self._search_with_deepseek(prompt)
-        if not result_text:
-            logger.error("Failed to collect daily events")
-            return []
-        
-        # 解析事件
-        events = self._parse_events(result_text)
+        seed = self._load_daily_seed(today)
+        if seed:
+            logger.info(f"历史事件库中有 {len(seed)} 个今天的已知事件，只搜索新增和变化的事件")
+            events = self._collect_daily_delta(today, seed)
+        else:
+            # 构建搜索提示词
+            prompt = f"{DAILY_SEARCH_PROMPT}\nDate: {today}"
+            
+            # 搜索并解析事件
+            events = self._search_and_parse(prompt, today)
+            if events is None:
+                logger.error("Failed to collect daily events")
+                return []
         logger.info(f"Collected {len(events)} daily events")
         
+        self._store_events(events, "daily")
         return events
 
-    def _batch_enhance_events(self, events, batch_size=5):
-        """批量增强事件分析，减少API调用次数"""
+    def _plan_batch_size(self, events):
+        """根据事件数量和并发数动态确定批次大小，使各批次能同时发出"""
+        size = math.ceil(len(events) / self.max_workers)
+        return max(ENRICHMENT_BATCH_MIN_SIZE, min(ENRICHMENT_BATCH_MAX_SIZE, size))
+
+    def _infer_market_phase(self, event_time):
+        """根据事件时间推断市场阶段"""
+        if not re.match(r'^\d{1,2}:\d{2}$', event_time or ""):
+            return self.DEFAULT_ANALYSIS["market_phase"]
+        hour, minute = map(int, event_time.split(":"))
+        minutes = hour * 60 + minute
+        if minutes < 9 * 60 + 30:
+            return "盘前"
+        if minutes < 16 * 60:
+            return "盘中"
+        return "盘后"
+
+    def _request_batch_analysis(self, batch):
+        """对一批事件发起一次分析请求，返回与批次对应的解析结果，解析失败的位置为None"""
+        # 构建批量分析提示词
+        batch_prompt = "请对以下多个美股市场事件进行批量分析，为每个事件提供市场影响、行业影响、相关个股、确信度评估、市场情绪判断和信息来源。\n\n"
+        for idx, event in enumerate(batch):
+            batch_prompt += f"事件{idx+1}: [{event.get('time', '未指定时间')}] {event.get('description', '')}\n"
+        
+        batch_prompt += "\n请按照以下格式回答，为每个事件提供分析：\n"
+        for idx in range(len(batch)):
+            batch_prompt += f"事件{idx+1}分析:\n1. 市场影响: [分析]\n2. 行业影响: [分析]\n3. 相关个股: [股票代码，逗号分隔]\n4. 确信度: [high/medium/low]\n5. 市场情绪: [bullish/bearish/neutral]\n6. 信息来源: [来源名称] [来源链接]\n\n"
+        
+        # 调用DeepSeek进行批量分析
+        request = dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "你是一个专业的金融分析师，擅长分析事件对美股市场的影响并查找权威信息来源。请提供简洁、准确的分析，并严格按照指定格式回答。"}, 
+                {"role": "user", "content": batch_prompt}
+            ],
+            temperature=0.3,
+            max_tokens=min(8000, 400 * len(batch) + 200)
+        )
+        
+        def _parse(text):
+            results = parse_batch_analysis(text, len(batch))
+            if not any(results):
+                raise ParseError("批量分析响应中没有可解析的事件")
+            return results
+        
+        # 解析批量分析结果，只缓存能解析的响应；部分事件解析失败时也不保留缓存，
+        # 避免被截断的响应在下次运行时被重放
+        results = cached_chat_completion(self.client, "batch", parse=_parse, **request)
+        if None in results:
+            discard_response("batch", **request)
+        return results
+
+    def _apply_batch_result(self, event, result):
+        """将批量分析结果写入事件，缺失字段使用默认值，返回是否整体使用了默认值"""
+        event.update(self.DEFAULT_SOURCE)
+        event.update(self.DEFAULT_ANALYSIS)
+        event["market_phase"] = self._infer_market_phase(event.get("time", ""))
+        if result:
+            event.update(result)
+            return False
+        event["confidence_level"] = "low"
+        return True
+
+    def _enhance_batch_with_bisection(self, batch):
+        """分析一个批次，对解析失败的事件对半拆分后重试，返回 (API调用次数, 使用默认值的事件列表)"""
+        try:
+            results = self._request_batch_analysis(batch)
+        except Exception as e:
+            logger.error(f"Error in batch enhancing events: {str(e)}")
+            results = [None] * len(batch)
+        calls = 1
+        
+        failed = []
+        for event, result in zip(batch, results):
+            if result is None:
+                failed.append(event)
+            else:
+                self._apply_batch_result(event, result)
+        
+        if not failed:
+            return calls, []
+        
+        # 单个事件仍然失败，使用默认值
+        if len(batch) == 1:
+            logger.warning(f"事件分析失败，使用默认值: {batch[0].get('description', '')[:50]}...")
+            self._apply_batch_result(batch[0], None)
+            return calls, [batch[0]]
+        
+        # 对失败的事件对半拆分后分别重试
+        logger.warning(f"批次中 {len(failed)}/{len(batch)} 个事件解析失败，拆分后重试")
+        if len(failed) == 1:
+            halves = [failed]
+        else:
+            middle = len(failed) // 2
+            halves = [failed[:middle], failed[middle:]]
+        fallbacks = []
+        for half in halves:
+            half_calls, half_fallbacks = self._enhance_batch_with_bisection(half)
+            calls += half_calls
+            fallbacks.extend(half_fallbacks)
+        return calls, fallbacks
+
+    def _run_batch_timed(self, batch):
+        """分析一个批次，返回 (API调用次数, 耗时, 使用默认值的事件列表)"""
+        start = time.perf_counter()
+        calls, fallbacks = self._enhance_batch_with_bisection(batch)
+        return calls, time.perf_counter() - start, fallbacks
+
+    def _batch_enhance_events(self, events, batch_size=None, reuse=True):
+        """批量增强事件分析，减少API调用次数
+        
+        事件按动态确定的批次大小分组并发请求，每次请求同时返回
+        分析结果和信息来源；解析失败的批次会对半拆分后重试。
+        """
         if not events:
             return []
-            
-        # 首先为每个事件添加信息来源
-        for event in events:
-            description = event.get("description", "")
-            if not description:
-                continue
-                
-            try:
-                # 添加信息来源查询
-                source_prompt = f"请查找以下美股市场事件的信息来源：\n\n事件：{description}\n\n请提供该事件的官方来源网址或新闻报道链接。如果有多个来源，请提供最权威的一个。"
-                
-                source_response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "你是一个专业的金融信息检索专家，擅长查找市场事件的原始信息来源。请提供准确、权威的来源链接。"}, 
-                        {"role": "user", "content": source_prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=500
-                )
-                
-                source_text = source_response.choices[0].message.content
-                
-                # 提取URL
-                import re
-                url_match = re.search(r'https?://[^\s()<>"\\\[\]]+', source_text)
-                if url_match:
-                    event["source_url"] = url_match.group(0)
-                else:
-                    # 如果没有找到URL，使用整个回答作为来源信息
-                    event["source_url"] = source_text.strip()
-            except Exception as e:
-                logger.error(f"Error getting source for event: {str(e)}")
-                event["source_url"] = "获取来源失败"
         
-        enhanced_events = []
-        # 按批次处理事件
-        for i in range(0, len(events), batch_size):
-            batch = events[i:i+batch_size]
-            
-            # 构建批量分析提示词
-            batch_prompt = "请对以下多个美股市场事件进行批量分析，为每个事件提供市场影响、行业影响、相关个股、确信度评估和市场情绪判断。\n\n"
-            for idx, event in enumerate(batch):
-                batch_prompt += f"事件{idx+1}: {event.get('description', '')}\n"
-            
-            batch_prompt += "\n请按照以下格式回答，为每个事件提供分析：\n"
-            for idx in range(len(batch)):
-                batch_prompt += f"事件{idx+1}分析:\n1. 市场影响: [分析]\n2. 行业影响: [分析]\n3. 相关个股: [分析]\n4. 确信度: [high/medium/low]\n5. 市场情绪: [bullish/bearish/neutral]\n\n"
-            
-            try:
-                # 调用DeepSeek进行批量分析
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "你是一个专业的金融分析师，擅长分析事件对美股市场的影响。请提供简洁、准确的分析，并严格按照指定格式回答。"}, 
-                        {"role": "user", "content": batch_prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=2000
-                )
-                
-                analysis_text = response.choices[0].message.content
-                
-                # 解析批量分析结果
-                import re
-                for idx, event in enumerate(batch):
-                    event_pattern = rf"事件{idx+1}分析:(.*?)(?=事件{idx+2}分析:|$)"
-                    event_analysis = re.search(event_pattern, analysis_text, re.DOTALL)
-                    
-                    if event_analysis:
-                        analysis = event_analysis.group(1).strip()
-                        
-                        # 提取各部分分析
-                        market_impact = re.search(r'1\.\s*市场影响:?(.*?)(?=\n2\.\s*|$)', analysis, re.DOTALL)
-                        sector_impact = re.search(r'2\.\s*行业影响:?(.*?)(?=\n3\.\s*|$)', analysis, re.DOTALL)
-                        stocks_affected = re.search(r'3\.\s*相关个股:?(.*?)(?=\n4\.\s*|$)', analysis, re.DOTALL)
-                        confidence = re.search(r'4\.\s*确信度:?(.*?)(?=\n5\.\s*|$)', analysis, re.DOTALL)
-                        sentiment = re.search(r'5\.\s*市场情绪:?(.*?)(?=\n|$)', analysis, re.DOTALL)
-                        
-                        # 更新事件信息
-                        if market_impact:
-                            event["market_impact"] = market_impact.group(1).strip()
-                        if sector_impact:
-                            event["sector_impact"] = sector_impact.group(1).strip()
-                        if stocks_affected:
-                            event["stocks_affected"] = stocks_affected.group(1).strip()
-                        if confidence:
-                            conf_text = confidence.group(1).strip().lower()
-                            if "high" in conf_text or "高" in conf_text:
-                                event["confidence_level"] = "high"
-                            elif "medium" in conf_text or "中" in conf_text:
-                                event["confidence_level"] = "medium"
-                            else:
-                                event["confidence_level"] = "low"
-                        else:
-                            event["confidence_level"] = "medium"
-                            
-                        # 添加市场情绪判断
-                        if sentiment:
-                            sentiment_text = sentiment.group(1).strip().lower()
-                            if "bullish" in sentiment_text or "利好" in sentiment_text or "正面" in sentiment_text:
-                                event["sentiment"] = "bullish"
-                            elif "bearish" in sentiment_text or "利空" in sentiment_text or "负面" in sentiment_text:
-                                event["sentiment"] = "bearish"
-                            elif "neutral" in sentiment_text or "中性" in sentiment_text:
-                                event["sentiment"] = "neutral"
-                            else:
-                                event["sentiment"] = "unknown"
-                        else:
-                            event["sentiment"] = "unknown"
-                    
-                    enhanced_events.append(event)
-                    
-            except Exception as e:
-                logger.error(f"Error in batch enhancing events: {str(e)}")
-                # 如果批量处理失败，添加原始事件
-                enhanced_events.extend(batch)
-                
-        return enhanced_events
+        batch_size = batch_size or self._plan_batch_size(events)
+        logger.info(f"开始批量分析 {len(events)} 个事件，每批 {batch_size} 个")
+        session = EnrichmentSession(self, mode="batch", batch_size=batch_size, reuse=reuse)
+        for event in events:
+            session.submit(event)
+        return session.finish()
     
     def _enhance_event_analysis(self, event):
         """增强事件分析，添加更多维度的分析信息"""
@@ -593,7 +1337,9 @@ class DataCollector:
             # 添加信息来源查询
             source_prompt = f"请查找以下美股市场事件的信息来源：\n\n事件：{description}\n\n请提供该事件的官方来源网址或新闻报道链接。如果有多个来源，请提供最权威的一个。"
             
-            source_response = self.client.chat.completions.create(
+            source_text = cached_chat_completion(
+                self.client,
+                "source",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "你是一个专业的金融信息检索专家，擅长查找市场事件的原始信息来源。请提供准确、权威的来源链接。"}, 
@@ -603,11 +1349,8 @@ class DataCollector:
                 max_tokens=500
             )
             
-            source_text = source_response.choices[0].message.content
-            
             # 提取URL
-            import re
-            url_match = re.search(r'https?://[^\s()<>"\\\\[\\]]+', source_text)
+            url_match = URL_PATTERN.search(source_text)
             if url_match:
                 event["source_url"] = url_match.group(0)
             else:
@@ -618,90 +1361,108 @@ class DataCollector:
             # 调用DeepSeek进行深度分析
             analysis_prompt = f"作为专业金融分析师，请对以下美股市场事件进行深度分析：\n\n事件：{description}\n\n请提供：\n1. 对整体美股市场的影响分析\n2. 对相关行业板块的影响分析\n3. 对主要相关个股的影响分析（请以逗号分隔列出股票代码或名称）\n4. 分析的确信度（high/medium/low）\n5. 市场情绪判断（请明确指出该事件对市场情绪的影响是利好/bullish、利空/bearish、中性/neutral）"
             
-            analysis_response = self.client.chat.completions.create(
+            # 只缓存能解析出编号分节的响应
+            sections = cached_chat_completion(
+                self.client,
+                "analyze",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "你是一个专业的金融分析师，擅长分析事件对美股市场的影响。请提供详细、准确、有深度的分析，并确保按照指定格式回答。"}, 
                     {"role": "user", "content": analysis_prompt}
                 ],
                 temperature=0.3,
-                max_tokens=1000
+                max_tokens=1000,
+                parse=parse_sections
             )
             
-            analysis_text = analysis_response.choices[0].message.content
-            
-            # 提取各部分分析，使用更精确的正则表达式
-            import re
-            market_impact = re.search(r'1\.\s*(?:整体美股市场.*?影响|.*?市场影响)[：:](.*?)(?=\n\s*2\.\s*|$)', analysis_text, re.DOTALL)
-            sector_impact = re.search(r'2\.\s*(?:行业板块.*?影响|.*?行业影响)[：:](.*?)(?=\n\s*3\.\s*|$)', analysis_text, re.DOTALL)
-            stocks_affected = re.search(r'3\.\s*(?:相关个股.*?影响|.*?个股影响)[：:](.*?)(?=\n\s*4\.\s*|$)', analysis_text, re.DOTALL)
-            confidence = re.search(r'4\.\s*(?:确信度|.*?确信度)[：:](.*?)(?=\n\s*5\.\s*|$)', analysis_text, re.DOTALL)
-            sentiment = re.search(r'5\.\s*(?:市场情绪|.*?情绪)[：:](.*?)(?=\n|$)', analysis_text, re.DOTALL)
-            
             # 更新事件信息
-            if market_impact:
-                event["market_impact"] = market_impact.group(1).strip()
-            if sector_impact:
-                event["sector_impact"] = sector_impact.group(1).strip()
-            if stocks_affected:
-                # 确保stocks_affected是字符串格式
-                stocks_text = stocks_affected.group(1).strip()
+            if 1 in sections:
+                event["market_impact"] = sections[1]
+            if 2 in sections:
+                event["industry_impact"] = sections[2]
+            if 3 in sections:
                 # 清理格式，确保是简单的文本列表
-                stocks_text = re.sub(r'\*\*|\{|\}|"', '', stocks_text)
-                event["stocks_affected"] = stocks_text
-            if confidence:
-                conf_text = confidence.group(1).strip().lower()
-                if "high" in conf_text or "高" in conf_text:
-                    event["confidence_level"] = "high"
-                elif "medium" in conf_text or "中" in conf_text:
-                    event["confidence_level"] = "medium"
-                else:
-                    event["confidence_level"] = "low"
-            else:
-                event["confidence_level"] = "medium"
+                event["related_stocks"] = STOCKS_CLEANUP_PATTERN.sub('', sections[3])
+            event["confidence_level"] = normalize_confidence(sections[4]) if 4 in sections else "medium"
                 
-            # 添加市场情绪判断
-            if sentiment:
-                sentiment_text = sentiment.group(1).strip().lower()
-                if "bullish" in sentiment_text or "利好" in sentiment_text or "正面" in sentiment_text:
-                    event["sentiment"] = "bullish"
-                elif "bearish" in sentiment_text or "利空" in sentiment_text or "负面" in sentiment_text:
-                    event["sentiment"] = "bearish"
-                elif "neutral" in sentiment_text or "中性" in sentiment_text:
-                    event["sentiment"] = "neutral"
-                else:
-                    event["sentiment"] = "unknown"
+            # 添加市场情绪判断，没有明确的情绪判断时从市场影响分析中推断
+            if 5 in sections:
+                event["sentiment"] = normalize_sentiment(first_line(sections[5]))
+            elif 1 in sections:
+                event["sentiment"] = infer_sentiment(sections[1])
             else:
-                # 如果没有明确的情绪判断，尝试从市场影响分析中推断
-                if market_impact:
-                    impact_text = market_impact.group(1).strip().lower()
-                    if "利好" in impact_text or "正面" in impact_text or "积极" in impact_text or "上涨" in impact_text:
-                        event["sentiment"] = "bullish"
-                    elif "利空" in impact_text or "负面" in impact_text or "消极" in impact_text or "下跌" in impact_text:
-                        event["sentiment"] = "bearish"
-                    elif "中性" in impact_text or "有限" in impact_text or "轻微" in impact_text:
-                        event["sentiment"] = "neutral"
-                    else:
-                        event["sentiment"] = "unknown"
-                else:
-                    event["sentiment"] = "unknown"
+                event["sentiment"] = "unknown"
                 
             return event
         except Exception as e:
             logger.error(f"Error enhancing event analysis: {str(e)}")
             return event
     
+    def _resolve_event_datetime(self, event, now):
+        """将事件的日期和时间解析为完整时间，无法解析时返回None
+        
+        事件没有日期时按当天处理；若得到的时间晚于当前时间，说明事件发生在午夜之前，按前一天处理。
+        """
+        match = re.match(r'^(\d{1,2}):(\d{2})$', normalize_time(event.get("time", "")))
+        if not match:
+            return None
+        hour, minute = map(int, match.groups())
+        if hour > 23 or minute > 59:
+            return None
+        
+        event_date = self._normalize_event_date(event.get("date"), now.strftime("%Y-%m-%d"))
+        if event_date:
+            day = datetime.strptime(event_date, "%Y-%m-%d")
+            return day.replace(hour=hour, minute=minute)
+        
+        event_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if event_time > now + timedelta(minutes=5):
+            event_time -= timedelta(days=1)
+        return event_time
+
+    def _breaking_news_since(self, now):
+        """本次收集的起始时间：上次成功收集的高水位，首次运行时回看默认时长，最长不超过上限"""
+        earliest = now - timedelta(seconds=BREAKING_NEWS_MAX_LOOKBACK)
+        watermark = self.breaking_state.get("watermark")
+        if not watermark:
+            return now - timedelta(seconds=BREAKING_NEWS_DEFAULT_LOOKBACK)
+        since = datetime.fromisoformat(watermark)
+        if since < earliest:
+            logger.warning(f"距上次收集突发新闻已超过 {BREAKING_NEWS_MAX_LOOKBACK // 3600} 小时，只回看到 {earliest.strftime('%Y-%m-%d %H:%M')}")
+            return earliest
+        return since
+
+    def breaking_news_interval(self):
+        """当前的突发新闻轮询间隔（秒）"""
+        return self.breaking_state.get("interval", BREAKING_NEWS_INTERVAL)
+
+    def _update_breaking_news_interval(self, events):
+        """根据本次收集到的新闻量调整轮询间隔：高峰时缩短一半，无新闻时延长一半"""
+        interval = self.breaking_news_interval()
+        busy = len(events) >= BREAKING_NEWS_BUSY_THRESHOLD or any(
+            keyword in event.get("description", "") for event in events for keyword in BREAKING_NEWS_BUSY_KEYWORDS
+        )
+        if busy:
+            interval = max(interval // 2, BREAKING_NEWS_MIN_INTERVAL)
+        elif not events:
+            interval = min(int(interval * 1.5), BREAKING_NEWS_MAX_INTERVAL)
+        
+        if interval != self.breaking_news_interval():
+            logger.info(f"突发新闻轮询间隔调整为 {interval // 60} 分钟（本次 {len(events)} 条新闻）")
+        self.breaking_state.set("interval", interval)
+
     def collect_breaking_news(self):
-        """收集突发重要新闻"""
+        """收集自上次成功收集以来的突发重要新闻"""
         logger.info("Collecting breaking news")
         
-        # 获取当前时间
+        # 本次收集覆盖 [高水位, 当前时间]
         now = datetime.now()
-        one_hour_ago = (now - timedelta(hours=1)).strftime("%H:%M")
-        current_time = now.strftime("%H:%M")
+        since = self._breaking_news_since(now)
+        since_text = since.strftime("%Y-%m-%d %H:%M")
+        now_text = now.strftime("%Y-%m-%d %H:%M")
         
         # 构建搜索提示词
-        prompt = f"""列出过去一小时（{one_hour_ago} 至 {current_time}）内美股市场的重要突发新闻。
+        prompt = f"""列出 {since_text} 至 {now_text} 期间美股市场的重要突发新闻。
 
 重点关注：
 1. 重大公司公告和重要人物讲话
@@ -711,36 +1472,36 @@ class DataCollector:
 5. 重要经济数据发布
 
 每条新闻必须包含：
-1. 具体发生时间
+1. 具体发生日期和时间
 2. 详细事件描述
 3. 信息来源
 4. 对市场的潜在影响分析
 
-特别说明：仅收集过去一小时内的新闻，确保时效性。"""
+特别说明：仅收集上述时间段内的新闻，确保时效性。"""
         
-        # 搜索事件
-        result_text = self._search_with_deepseek(prompt)
-        if not result_text:
+        # 搜索并解析事件
+        events = self._search_and_parse(prompt, now.strftime("%Y-%m-%d"))
+        if events is None:
+            # 高水位保持不变，下次收集会覆盖本次缺失的时间段
             logger.error("Failed to collect breaking news")
             return []
-        
-        # 解析事件
-        events = self._parse_events(result_text)
         logger.info(f"Collected {len(events)} breaking news events")
         
-        # 过滤掉一小时前的事件
+        # 过滤掉时间段之外的事件（允许5分钟误差）
+        tolerance = timedelta(minutes=5)
         filtered_events = []
         for event in events:
-            try:
-                event_time = datetime.strptime(event.get("time", "00:00"), "%H:%M")
-                event_time = event_time.replace(year=now.year, month=now.month, day=now.day)
-                if now - timedelta(hours=1) <= event_time <= now:
-                    filtered_events.append(event)
-            except ValueError:
+            event_time = self._resolve_event_datetime(event, now)
+            if event_time is None:
                 logger.warning(f"无法解析事件时间: {event.get('time')}")
                 continue
+            if since - tolerance <= event_time <= now + tolerance:
+                filtered_events.append(event)
         
-        logger.info(f"过滤后保留 {len(filtered_events)} 个最近一小时的事件")
+        logger.info(f"过滤后保留 {len(filtered_events)} 个 {since_text} 之后的事件")
+        self.breaking_state.set("watermark", now.isoformat())
+        self._update_breaking_news_interval(filtered_events)
+        self._store_events(filtered_events, "breaking")
         return filtered_events
         
     def collect_earnings_events(self, force=False):
@@ -802,27 +1563,23 @@ class DataCollector:
 
 请确保输出是有效的JSON格式，每个事件必须包含上述所有字段。"""
 
-        # 搜索事件
-        result_text = self._search_with_deepseek(prompt)
-        if not result_text:
-            logger.error("Failed to collect earnings events")
+        # 搜索事件并提取JSON部分，只缓存能提取出JSON数组的响应
+        try:
+            events, partial = self._search_with_deepseek(prompt, parse=extract_json_array)
+        except json.JSONDecodeError as e:
+            logger.error(f"无法从响应中提取JSON数据: {str(e)}")
             return []
+        # 被截断时保留其中完整的财报事件，但不缓存不完整的响应
+        if partial:
+            logger.warning(f"财报搜索结果中的JSON数组不完整，保留了 {len(events)} 个完整事件")
+            self._discard_search(prompt)
         
         # 解析事件
         try:
-            # 提取JSON部分
-            json_match = re.search(r'\[[\s\S]*\]', result_text)
-            if json_match:
-                content = json_match.group()
-                events = json.loads(content)
-            else:
-                logger.error("无法从响应中提取JSON数据")
-                return []
-            
-            # 为每个财报事件添加额外标记
+            # 转换为财报事件（带 is_earnings 标记）
+            events = [EarningsEvent(event) for event in events]
             for event in events:
                 event["type"] = "财报事件"  # 确保事件类型正确
-                event["is_earnings"] = True  # 添加财报事件标记
                 
                 # 标准化时间格式
                 if "盘前" in event.get("time", ""):
@@ -846,6 +1603,7 @@ class DataCollector:
                         event[field] = "未知"
             
             logger.info(f"成功收集到 {len(events)} 个财报事件")
+            self._store_events(events, "earnings")
             return events
             
         except Exception as e:
@@ -867,26 +1625,27 @@ class DataCollector:
         
         # 创建市场情绪事件
         today = datetime.now().strftime("%Y-%m-%d")
-        event = {
-            "date": today,
-            "time": datetime.now().strftime("%H:%M"),
-            "description": "市场情绪和关注焦点分析",
-            "type": "市场分析",
-            "market_phase": "其他",
-            "market_impact": result_text,
-            "sentiment": "neutral",  # 默认中性
-            "confidence_level": "medium"
-        }
+        event = Event(
+            date=today,
+            time=datetime.now().strftime("%H:%M"),
+            description="市场情绪和关注焦点分析",
+            type="市场分析",
+            market_phase="其他",
+            market_impact=result_text,
+            sentiment="neutral",  # 默认中性
+            confidence_level="medium"
+        )
         
         logger.info("Collected market sentiment analysis")
+        self._store_events([event], "sentiment")
         return [event]
 # 测试代码
 if __name__ == "__main__":
     collector = DataCollector()
     weekly_events = collector.collect_weekly_events()
     print(f"Collected {len(weekly_events)} weekly events")
-    print(json.dumps(weekly_events[:2], indent=2, ensure_ascii=False))
+    print(events_to_json(weekly_events[:2], indent=2))
     
     daily_events = collector.collect_daily_events()
     print(f"Collected {len(daily_events)} daily events")
-    print(json.dumps(daily_events[:2], indent=2, ensure_ascii=False))
\ No newline at end of file
+    print(events_to_json(daily_events[:2], indent=2))
\ No newline at end of file
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class EventLedger:
+    """已处理事件台账
+
+    以事件指纹（日期 + 规范化时间 + 规范化描述）为键保存增强结果（来源和影响分析），
+    盘前、盘后和突发新闻任务再次遇到同一事件时直接复用，不再请求DeepSeek。
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                fingerprint TEXT PRIMARY KEY,
+                report_date TEXT NOT NULL,
+                enrichment TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                seen_count INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        self._conn.commit()
+        # 过期记录平时只在读取时删除，启动时统一清理，避免台账无限增长
+        self.purge_expired()
+
+    def get(self, fingerprint):
+        """读取事件的增强结果，不存在或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT enrichment, created_at FROM events WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is None:
+                return None
+            enrichment, created_at = row
+            if now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM events WHERE fingerprint = ?", (fingerprint,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE events SET last_seen = ?, seen_count = seen_count + 1 WHERE fingerprint = ?",
+                (now, fingerprint)
+            )
+            self._conn.commit()
+        return json.loads(enrichment)
+
+    def put_many(self, records):
+        """批量写入增强结果
+
+        Args:
+            records (list): (指纹, 报告日期, 增强字段dict) 列表
+        """
+        if not records:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events (fingerprint, report_date, enrichment, created_at, last_seen, seen_count) "
+                "VALUES (?, ?, ?, ?, ?, 1)",
+                [
+                    (fingerprint, report_date, json.dumps(enrichment, ensure_ascii=False), now, now)
+                    for fingerprint, report_date, enrichment in records
+                ]
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        """删除所有已过期的记录，返回删除的记录数"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        if cursor.rowcount:
+            logger.info(f"已清理 {cursor.rowcount} 条过期的台账记录")
+        return cursor.rowcount
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
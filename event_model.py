@@ -0,0 +1,169 @@
+import json
+from collections.abc import Mapping, MutableMapping
+from analysis_parser import merge_sentiments
+
+_MISSING = object()
+
+class Event(MutableMapping):
+    """每日市场事件
+
+    使用 __slots__ 保存规范字段，内存占用远小于普通字典；同时实现字典接口（get、[]、update、items 等），
+    原有按字典读写事件的代码无需修改。
+    - 字段别名写入规范字段：sector_impact → industry_impact，stocks_affected → related_stocks
+    - sentiment 为列表（模型给出的条件式判断）时归并为单个情绪值（bullish/bearish/neutral/unknown）
+    - 规范字段之外的键保存在 extra 中，to_dict 时原样输出
+    """
+
+    FIELDS = (
+        "date", "time", "description", "type", "market_phase",
+        "market_impact", "industry_impact", "related_stocks", "sentiment", "confidence_level",
+        "source_name", "source_url", "source_type"
+    )
+    ALIASES = {
+        "sector_impact": "industry_impact",
+        "stocks_affected": "related_stocks"
+    }
+    __slots__ = FIELDS + ("extra",)
+    _field_set = frozenset(FIELDS)
+
+    def __init__(self, data=None, **fields):
+        self.extra = None
+        if data:
+            self.update(data)
+        if fields:
+            self.update(fields)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        key = self.ALIASES.get(key, key)
+        if key in self._field_set:
+            return getattr(self, key, default)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        key = self.ALIASES.get(key, key)
+        if key in self._field_set:
+            if key == "sentiment" and isinstance(value, (list, tuple)):
+                value = merge_sentiments(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        key = self.ALIASES.get(key, key)
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        for name in self.FIELDS:
+            if getattr(self, name, _MISSING) is not _MISSING:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def update(self, other=(), **fields):
+        items = other.items() if isinstance(other, Mapping) else other
+        for key, value in items:
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    def copy(self):
+        """浅拷贝"""
+        event = type(self)()
+        for name in self.FIELDS:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                setattr(event, name, value)
+        if self.extra:
+            event.extra = dict(self.extra)
+        return event
+
+    def project(self, fields, default=None):
+        """按顺序取出指定字段的值（不复制事件），用于提示词和表格行"""
+        return tuple(self.get(field, default) for field in fields)
+
+    def to_dict(self):
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), ensure_ascii=False, **kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text))
+
+class EarningsEvent(Event):
+    """财报事件，在每日事件字段之外增加财报相关字段"""
+
+    EARNINGS_FIELDS = (
+        "report_date", "earnings_time", "company_name", "stock_code",
+        "eps_forecast", "revenue_forecast", "last_quarter", "focus_points", "is_earnings"
+    )
+    FIELDS = Event.FIELDS + EARNINGS_FIELDS
+    __slots__ = EARNINGS_FIELDS
+    _field_set = frozenset(FIELDS)
+
+    def __init__(self, data=None, **fields):
+        self.is_earnings = True
+        super().__init__(data, **fields)
+
+def event_from_dict(data):
+    """将字典转换为事件对象（已是事件对象时原样返回），带 is_earnings 标记的转换为财报事件"""
+    if isinstance(data, Event):
+        return data
+    if data.get("is_earnings"):
+        return EarningsEvent(data)
+    return Event(data)
+
+def project(event, fields, default=None):
+    """按顺序取出事件（事件对象或字典）指定字段的值"""
+    if isinstance(event, Event):
+        return event.project(fields, default)
+    return tuple(event.get(field, default) for field in fields)
+
+def json_default(value):
+    """json.dumps 的 default 参数，使事件对象可以直接序列化"""
+    if isinstance(value, Event):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def events_to_json(events, **kwargs):
+    """将事件列表序列化为JSON"""
+    return json.dumps(events, ensure_ascii=False, default=json_default, **kwargs)
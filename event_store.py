@@ -0,0 +1,210 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from event_model import EarningsEvent, Event, event_from_dict
+from fingerprint import event_fingerprint
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 相关个股/股票代码中的美股代码（如 AAPL、BRK.B）
+TICKER_PATTERN = re.compile(r'(?<![A-Za-z])[A-Z]{1,5}(?:\.[A-Z])?(?![A-Za-z])')
+
+# 形似股票代码的常见缩写，不作为股票代码索引
+NON_TICKERS = {"AI", "CEO", "CPI", "EPS", "ETF", "FOMC", "GDP", "IPO", "PCE", "PMI", "PPI", "SEC", "US", "USD"}
+
+# 单条SQL语句中的参数数量上限（SQLite默认限制为32766，留出余量）
+_MAX_SQL_PARAMS = 900
+
+def extract_tickers(event):
+    """从股票代码和相关个股字段中提取去重后的美股代码"""
+    tickers = []
+    for field in ("stock_code", "related_stocks"):
+        value = event.get(field)
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(item) for item in value)
+        if not value or not isinstance(value, str):
+            continue
+        for ticker in TICKER_PATTERN.findall(value):
+            if ticker not in NON_TICKERS and ticker not in tickers:
+                tickers.append(ticker)
+    return tickers
+
+def event_report_date(event):
+    """事件的报告日期：财报事件为发布日期，其他事件为事件日期，都没有时为当天"""
+    return event.get("report_date") or event.get("date") or datetime.now().strftime("%Y-%m-%d")
+
+class EventStore:
+    """本地历史事件库
+
+    每次收集得到的完整事件（含增强结果）按指纹写入SQLite（WAL模式），同一事件再次收集时覆盖为最新内容。
+    按报告日期、股票代码、事件类型、收集任务和指纹建立索引，可以直接查询历史事件，
+    例如某只股票上个季度的全部事件，而不必再次请求DeepSeek。
+    写入在单个事务中批量执行，数十万行规模下单次写入仍只需一次提交。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL模式下 NORMAL 足以保证一致性，提交时不必每次同步到磁盘
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                fingerprint TEXT PRIMARY KEY,
+                report_date TEXT NOT NULL,
+                time TEXT NOT NULL DEFAULT '',
+                type TEXT NOT NULL DEFAULT '',
+                kind TEXT NOT NULL DEFAULT '',
+                is_earnings INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_report_date ON events (report_date, time);
+            CREATE INDEX IF NOT EXISTS idx_events_type ON events (type, report_date);
+            CREATE INDEX IF NOT EXISTS idx_events_kind ON events (kind, report_date);
+            CREATE TABLE IF NOT EXISTS event_tickers (
+                ticker TEXT NOT NULL,
+                report_date TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (ticker, report_date, fingerprint)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_event_tickers_fingerprint ON event_tickers (fingerprint);
+        """)
+        self._conn.commit()
+
+    def put_many(self, events, kind=""):
+        """在一个事务中批量写入事件，已存在的事件（指纹相同）更新为最新内容
+
+        Args:
+            events (list): 事件列表
+            kind (str): 收集任务（daily/weekly/breaking/earnings/sentiment）
+
+        Returns:
+            list: 与事件对应的指纹列表
+        """
+        if not events:
+            return []
+        now = time.time()
+        rows, ticker_rows, fingerprints = [], [], []
+        for event in events:
+            report_date = event_report_date(event)
+            fingerprint = event_fingerprint(event, report_date)
+            data = event_from_dict(event).to_json()
+            rows.append((
+                fingerprint, report_date, event.get("time") or "", event.get("type") or "", kind,
+                1 if event.get("is_earnings") else 0, data, now, now
+            ))
+            ticker_rows.extend((ticker, report_date, fingerprint) for ticker in extract_tickers(event))
+            fingerprints.append(fingerprint)
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO events (fingerprint, report_date, time, type, kind, is_earnings, data, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(fingerprint) DO UPDATE SET "
+                    "report_date = excluded.report_date, time = excluded.time, type = excluded.type, "
+                    "kind = excluded.kind, is_earnings = excluded.is_earnings, data = excluded.data, "
+                    "updated_at = excluded.updated_at",
+                    rows
+                )
+                unique = list(dict.fromkeys(fingerprints))
+                for start in range(0, len(unique), _MAX_SQL_PARAMS):
+                    chunk = unique[start:start + _MAX_SQL_PARAMS]
+                    self._conn.execute(
+                        f"DELETE FROM event_tickers WHERE fingerprint IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO event_tickers (ticker, report_date, fingerprint) VALUES (?, ?, ?)",
+                    ticker_rows
+                )
+        logger.info(f"历史事件库写入 {len(rows)} 个事件")
+        return fingerprints
+
+    def get(self, fingerprint):
+        """按指纹读取事件，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, is_earnings FROM events WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, is_earnings = row
+        return (EarningsEvent if is_earnings else Event).from_json(data)
+
+    def query(self, start_date=None, end_date=None, ticker=None, event_type=None, kind=None,
+              earnings=None, limit=None):
+        """按条件查询历史事件，按报告日期和时间排序
+
+        Args:
+            start_date (str): 起始报告日期（YYYY-MM-DD，含）
+            end_date (str): 结束报告日期（YYYY-MM-DD，含）
+            ticker (str): 股票代码
+            event_type (str): 事件类型（如 经济数据、财报事件）
+            kind (str|tuple): 收集任务（daily/weekly/breaking/earnings/sentiment），可传入多个
+            earnings (bool): 只查询财报事件（True）或非财报事件（False）
+            limit (int): 最多返回的事件数
+
+        Returns:
+            list: 事件对象列表
+        """
+        sql = "SELECT e.data, e.is_earnings FROM events e"
+        conditions, params = [], []
+        if ticker:
+            sql += " JOIN event_tickers t ON t.fingerprint = e.fingerprint"
+            conditions.append("t.ticker = ?")
+            params.append(ticker.upper())
+            date_column = "t.report_date"
+        else:
+            date_column = "e.report_date"
+        if start_date:
+            conditions.append(f"{date_column} >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append(f"{date_column} <= ?")
+            params.append(end_date)
+        if event_type:
+            conditions.append("e.type = ?")
+            params.append(event_type)
+        if isinstance(kind, (list, tuple)):
+            conditions.append(f"e.kind IN ({','.join('?' * len(kind))})")
+            params.extend(kind)
+        elif kind:
+            conditions.append("e.kind = ?")
+            params.append(kind)
+        if earnings is not None:
+            conditions.append("e.is_earnings = ?")
+            params.append(1 if earnings else 0)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {date_column}, e.time"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(EarningsEvent if is_earnings else Event).from_json(data) for data, is_earnings in rows]
+
+    def count(self):
+        """返回库中的事件总数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,139 @@
+import json
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class IncrementalEventParser:
+    """流式响应的增量事件解析器
+
+    支持两种输出格式：
+    1. JSON数组：数组中的每个对象一旦闭合即产出（dict）
+    2. 每行一个事件的文本：每一行完整后即产出（str），由调用方解析
+
+    格式根据第一个有效字符自动判断，允许以 ``` 代码块包裹；
+    文本模式下遇到以 [ 开头的行会切换为JSON模式。
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.mode = None  # "json" 或 "lines"
+        self.done = False
+        # JSON扫描状态
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.object_start = None
+
+    def feed(self, text):
+        """追加一段响应文本，返回新完成的事件列表"""
+        if self.done or not text:
+            return []
+        self.buffer += text
+        return self._drain(final=False)
+
+    def finish(self):
+        """响应结束，返回剩余的完整事件"""
+        if self.done:
+            return []
+        items = self._drain(final=True)
+        self.done = True
+        return items
+
+    def _drain(self, final):
+        items = []
+        while not self.done:
+            if self.mode is None and not self._detect_mode(final):
+                break
+            if self.mode == "json":
+                items.extend(self._scan_json())
+                break
+            line_items, switched = self._scan_lines(final)
+            items.extend(line_items)
+            if not switched:
+                break
+        return items
+
+    def _detect_mode(self, final):
+        """跳过空白和代码块标记，根据第一个有效字符确定解析模式"""
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if char.isspace():
+                self.pos += 1
+                continue
+            if self.buffer.startswith("```", self.pos):
+                newline = self.buffer.find("\n", self.pos)
+                if newline == -1:
+                    return False  # 等待代码块标记行结束
+                self.pos = newline + 1
+                continue
+            self.mode = "json" if char == "[" else "lines"
+            return True
+        if final:
+            self.done = True
+        return False
+
+    def _scan_json(self):
+        """从上次位置继续扫描JSON数组，产出所有已闭合的顶层对象"""
+        items = []
+        buffer = self.buffer
+        i = self.pos
+        while i < len(buffer):
+            char = buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "[{":
+                if char == "{" and self.depth == 1:
+                    self.object_start = i
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if char == "}" and self.depth == 1 and self.object_start is not None:
+                    try:
+                        item = json.loads(buffer[self.object_start:i + 1])
+                        if isinstance(item, dict):
+                            items.append(item)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"跳过无法解析的流式事件: {str(e)}")
+                    self.object_start = None
+                elif self.depth <= 0:
+                    # 顶层数组已结束，忽略其后的内容
+                    self.done = True
+                    i += 1
+                    break
+            i += 1
+        self.pos = i
+        return items
+
+    def _scan_lines(self, final):
+        """产出所有已完整的行；遇到以 [ 开头的行时切换到JSON模式"""
+        items = []
+        while True:
+            newline = self.buffer.find("\n", self.pos)
+            if newline == -1:
+                if not final:
+                    return items, False
+                newline = len(self.buffer)
+                if newline == self.pos:
+                    self.done = True
+                    return items, False
+            line = self.buffer[self.pos:newline].strip()
+            if line == "[" or line.startswith("```") or (line.startswith("[") and line[1:].lstrip().startswith("{")):
+                # 文本说明之后出现JSON，从该行开始重新判断格式
+                self.mode = None
+                return items, True
+            self.pos = min(newline + 1, len(self.buffer))
+            if line:
+                items.append(line)
+            if final and self.pos >= len(self.buffer):
+                self.done = True
+                return items, False
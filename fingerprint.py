@@ -0,0 +1,41 @@
+import re
+import hashlib
+import unicodedata
+
+# 描述中不影响语义的空白和标点
+_IGNORED_CHARS = re.compile(r'[\s\W_]+', re.UNICODE)
+
+# 时间别名，与 DataCollector._clean_event_data 的映射保持一致
+_TIME_ALIASES = {
+    "盘前": "09:00",
+    "盘中": "13:30",
+    "盘后": "16:00",
+    "美股盘前": "09:00",
+    "美股盘中": "13:30",
+    "美股盘后": "16:00",
+    "开盘": "09:30",
+    "收盘": "16:00"
+}
+
+def normalize_time(value):
+    """将时间统一为 HH:MM 格式，无法识别时原样返回（去除空白）"""
+    value = (value or "").strip()
+    value = _TIME_ALIASES.get(value, value)
+    match = re.match(r'^(\d{1,2}):(\d{2})$', value)
+    if match:
+        return f"{int(match.group(1)):02d}:{match.group(2)}"
+    return value
+
+def normalize_description(value):
+    """规范化事件描述：全角转半角、统一小写，并去除空白和标点"""
+    value = unicodedata.normalize("NFKC", value or "").lower()
+    return _IGNORED_CHARS.sub("", value)
+
+def event_fingerprint(event, report_date):
+    """计算事件的稳定指纹：日期 + 规范化时间 + 规范化描述"""
+    key = "|".join([
+        report_date or "",
+        normalize_time(event.get("time", "")),
+        normalize_description(event.get("description", ""))
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
@@ -0,0 +1,115 @@
+import atexit
+import logging
+import threading
+import httpx
+from openai import OpenAI
+from notion_client import Client
+import config
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 进程内共享的连接池，按上游服务区分
+_http_clients = {}
+_deepseek_client = None
+_notion_client = None
+_bound_http_clients = {}  # 记录各API客户端当前绑定的连接池
+_cassette = None  # 录制/回放磁带，为None时正常访问网络
+_lock = threading.Lock()
+
+def use_cassette(cassette):
+    """之后创建的连接池的全部请求经由磁带录制或回放，需在创建任何客户端之前调用"""
+    global _cassette
+    with _lock:
+        _cassette = cassette
+
+def _build_http_client(name):
+    """按配置创建一个支持keep-alive的HTTP连接池"""
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+    )
+    transport = None
+    if _cassette is not None:
+        transport = _cassette.transport(
+            name, httpx.HTTPTransport(limits=limits, verify=config.HTTP_VERIFY_SSL)
+        )
+    return httpx.Client(
+        limits=limits,
+        timeout=_build_timeout(),
+        verify=config.HTTP_VERIFY_SSL,
+        transport=transport
+    )
+
+def _api_key(value):
+    """回放时不会访问真实服务，未配置密钥时使用占位值"""
+    if not value and _cassette is not None and _cassette.replaying:
+        return "cassette-replay"
+    return value
+
+def _build_timeout():
+    """按配置创建请求超时设置"""
+    return httpx.Timeout(config.HTTP_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)
+
+def get_http_client(name):
+    """获取指定上游服务（deepseek/notion）的共享HTTP连接池"""
+    with _lock:
+        client = _http_clients.get(name)
+        if client is None or client.is_closed:
+            client = _build_http_client(name)
+            _http_clients[name] = client
+            logger.info(f"已创建HTTP连接池: {name}")
+        return client
+
+def get_deepseek_client():
+    """获取共享的DeepSeek（OpenAI兼容）客户端"""
+    global _deepseek_client
+    http_client = get_http_client("deepseek")
+    with _lock:
+        if _deepseek_client is None or _bound_http_clients.get("deepseek") is not http_client:
+            _deepseek_client = OpenAI(
+                api_key=_api_key(config.DEEPSEEK_API_KEY),
+                base_url=config.DEEPSEEK_BASE_URL,
+                default_headers={"Content-Type": "application/json; charset=utf-8"},
+                timeout=_build_timeout(),
+                http_client=http_client
+            )
+            _bound_http_clients["deepseek"] = http_client
+        return _deepseek_client
+
+def get_notion_client():
+    """获取共享的Notion客户端"""
+    global _notion_client
+    http_client = get_http_client("notion")
+    with _lock:
+        if _notion_client is None or _bound_http_clients.get("notion") is not http_client:
+            _notion_client = Client(
+                auth=_api_key(config.NOTION_API_KEY),
+                base_url=config.NOTION_BASE_URL,
+                timeout_ms=int(config.HTTP_READ_TIMEOUT * 1000),
+                # 关闭客户端自带的429/5xx重试：NotionPublisher 是唯一的重试和限速层，
+                # 自带重试会绕过令牌桶，且与外层重试叠加使单次调用的请求次数成倍增加
+                retry=False,
+                client=http_client
+            )
+            _bound_http_clients["notion"] = http_client
+        return _notion_client
+
+def close_pools():
+    """关闭所有共享连接池，在进程退出前调用"""
+    global _deepseek_client, _notion_client
+    with _lock:
+        for name, client in _http_clients.items():
+            if not client.is_closed:
+                client.close()
+                logger.info(f"已关闭HTTP连接池: {name}")
+        _http_clients.clear()
+        _bound_http_clients.clear()
+        _deepseek_client = None
+        _notion_client = None
+        if _cassette is not None:
+            _cassette.close()
+
+atexit.register(close_pools)
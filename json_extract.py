@@ -0,0 +1,126 @@
+import re
+import json
+
+# 扫描时只关心括号、引号和转义符，其余字符一次跳过
+_TOKEN_PATTERN = re.compile(r'[\[\]{}"\\]')
+_CLOSERS = {"[": "]", "{": "}"}
+
+def _scan(text):
+    """单遍扫描全文的括号配对，跳过括号内字符串中的括号（括号外的引号视为说明文字）
+
+    遇到不匹配的右括号时，当前所有未闭合的括号都不可能构成有效JSON，全部作废后从下一个括号重新开始。
+
+    Returns:
+        list: 按起始位置排列的 [起始位置, 结束位置, 子元素区间列表]；结束位置为None表示扫描到文本末尾
+        仍未闭合（被截断），为-1表示括号不匹配；子元素区间为数组中已闭合的对象/数组元素
+    """
+    pairs = []
+    stack = []  # 未闭合括号在 pairs 中的下标
+    in_string = False
+    skip_to = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        i = match.start()
+        if i < skip_to:
+            continue  # 被转义的字符
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                skip_to = i + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = bool(stack)
+        elif char in "[{":
+            stack.append(len(pairs))
+            pairs.append([i, None, []])
+        elif char in "]}" and stack:
+            pair = pairs[stack.pop()]
+            if _CLOSERS[text[pair[0]]] != char:
+                pair[1] = -1
+                for index in stack:
+                    pairs[index][1] = -1
+                stack = []
+                continue
+            pair[1] = i + 1
+            if stack and text[pairs[stack[-1]][0]] == "[":
+                pairs[stack[-1]][2].append((pair[0], i + 1))
+    return pairs
+
+def _salvage(text, spans):
+    """逐个解析顶层数组中已闭合的元素，返回其中的对象"""
+    items = []
+    for start, end in spans:
+        try:
+            item = json.loads(text[start:end])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(item, dict):
+            items.append(item)
+    return items
+
+def _is_object_list(value):
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+def _extract(text, opener, accept):
+    """按起始位置依次尝试以 opener 开始的括号区间，返回第一个满足 accept 的非空JSON值
+
+    空值（如说明文字中的"[]"）只在其后没有其他可用的JSON时返回。
+    """
+    if not text:
+        raise json.JSONDecodeError("响应内容为空", text or "", 0)
+    truncated_at = None
+    empty = None
+    for start, end, spans in _scan(text):
+        if text[start] != opener or end == -1:
+            continue
+        if end is None:
+            # 扫描到文本末尾仍未闭合：可能是被截断的JSON，也可能是说明文字中未闭合的括号
+            # （其后仍可能有完整的JSON），挽救不出对象时继续尝试后面的起点
+            items = _salvage(text, spans) if opener == "[" else []
+            if items and accept(items):
+                return items, True
+            if truncated_at is None:
+                truncated_at = start
+            continue
+        try:
+            value = json.loads(text[start:end])
+        except json.JSONDecodeError:
+            # 括号完整但内容无效（如尾随逗号、未转义的引号），保留其中可解析的对象
+            items = _salvage(text, spans) if opener == "[" else []
+            if items and accept(items):
+                return items, True
+            continue
+        if not accept(value):
+            continue
+        if value:
+            return value, False
+        if empty is None:
+            empty = value
+    if truncated_at is not None:
+        raise json.JSONDecodeError("JSON在闭合前被截断", text, truncated_at)
+    if empty is not None:
+        return empty, False
+    raise json.JSONDecodeError("未找到有效的JSON", text, 0)
+
+def extract_json_object(text):
+    """从模型输出中提取第一个完整的JSON对象
+
+    Raises:
+        json.JSONDecodeError: 文本中没有完整的JSON对象
+    """
+    value, _ = _extract(text, "{", lambda value: isinstance(value, dict))
+    return value
+
+def extract_json_array(text):
+    """从模型输出中提取由对象组成的JSON数组
+
+    数组被截断（如达到 max_tokens）或个别元素无效时，返回其中所有完整且有效的对象，
+    并将第二个返回值置为True，调用方可以据此决定是否还需要补充请求。
+
+    Returns:
+        tuple: (对象列表, 是否为部分结果)
+
+    Raises:
+        json.JSONDecodeError: 文本中没有可用的对象数组
+    """
+    return _extract(text, "[", _is_object_list)
@@ -6,6 +6,10 @@ from datetime import datetime
 from data_collector import DataCollector
 from notion_updater import NotionUpdater
 from scheduler import EventScheduler
+from http_pool import close_pools, use_cassette
+from cassette import Cassette
+from response_cache import disable_cache, get_response_cache
+from metrics import get_metrics
 from config import LOG_FILE, LOG_LEVEL
 from dotenv import load_dotenv
 
@@ -29,38 +33,64 @@ def run_once(task_type):
     collector = DataCollector()
     updater = NotionUpdater()
     
-    if task_type == "daily":
-        logger.info("运行每日数据收集任务")
-        events = collector.collect_daily_events()
-    elif task_type == "breaking":
-        logger.info("运行突发新闻收集任务")
-        events = collector.collect_breaking_news()
-    elif task_type == "earnings":
-        logger.info("运行财报事件收集任务")
-        events = collector.collect_earnings_events()
-    else:
-        logger.error(f"未知的任务类型: {task_type}")
-        return
+    with get_metrics().run(task_type):
+        if task_type == "daily":
+            logger.info("运行每日数据收集任务")
+            events = collector.collect_daily_events()
+        elif task_type == "weekly":
+            # 周度收集只写入历史事件库，供之后的每日收集复用，不更新Notion
+            logger.info("运行周度事件收集任务")
+            events = collector.collect_weekly_events()
+            logger.info(f"任务完成，收集了 {len(events)} 个事件")
+            return
+        elif task_type == "breaking":
+            logger.info("运行突发新闻收集任务")
+            events = collector.collect_breaking_news()
+        elif task_type == "earnings":
+            logger.info("运行财报事件收集任务")
+            events = collector.collect_earnings_events()
+        else:
+            logger.error(f"未知的任务类型: {task_type}")
+            return
+        
+        created_count = updater.update_notion_with_events(events)
+        logger.info(f"任务完成，创建了 {created_count} 个事件")
     
-    created_count = updater.update_notion_with_events(events)
-    logger.info(f"任务完成，创建了 {created_count} 个事件")
+    cache = get_response_cache()
+    if cache:
+        cache.log_stats()
 
 def main():
     """主程序入口"""
     parser = argparse.ArgumentParser(description="美股市场重大事件自动收集与Notion更新系统")
-    parser.add_argument("--run-once", choices=["daily", "breaking", "earnings"], help="立即运行一次任务 (daily/breaking/earnings)")
+    parser.add_argument("--run-once", choices=["daily", "weekly", "breaking", "earnings"], help="立即运行一次任务 (daily/weekly/breaking/earnings)")
     parser.add_argument("--daemon", action="store_true", help="以守护进程模式运行定时任务")
+    parser.add_argument("--no-cache", action="store_true", help="不使用DeepSeek响应缓存")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", metavar="PATH", help="将DeepSeek和Notion的请求/响应录制到磁带文件（不使用缓存）")
+    cassette_group.add_argument("--replay", metavar="PATH", help="从磁带文件回放响应，不访问网络（不使用缓存）")
+    parser.add_argument("--replay-timing", action="store_true", help="回放时按录制时的耗时等待")
     
     args = parser.parse_args()
     
-    if args.run_once:
-        run_once(args.run_once)
-    elif args.daemon:
-        logger.info("以守护进程模式启动调度器")
-        scheduler = EventScheduler()
-        scheduler.run()
-    else:
-        parser.print_help()
+    # 录制和回放都需要每次调用真实经过传输层，因此同时禁用缓存
+    if args.record or args.replay:
+        mode = "record" if args.record else "replay"
+        use_cassette(Cassette(args.record or args.replay, mode, emulate_timing=args.replay_timing))
+    if args.no_cache or args.record or args.replay:
+        disable_cache()
+    
+    try:
+        if args.run_once:
+            run_once(args.run_once)
+        elif args.daemon:
+            logger.info("以守护进程模式启动调度器")
+            scheduler = EventScheduler()
+            scheduler.run()
+        else:
+            parser.print_help()
+    finally:
+        close_pools()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,265 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from collections import defaultdict, deque
+from datetime import datetime
+import config
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 统计的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Prometheus指标名前缀
+METRIC_PREFIX = "finance_events"
+
+def percentile(sorted_values, quantile):
+    """最近秩法分位数，输入需已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(quantile * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class MetricsRegistry:
+    """LLM和Notion调用的耗时、token和结果统计
+
+    每次API请求（包括重试中的每一次尝试）记录一条：阶段（search/parse/source/analyze/
+    enrich/batch/summary/publish）、耗时、prompt/completion token数、第几次尝试和结果
+    （success/error/cached）。
+
+    - run() 包裹一次任务运行，结束时汇总该时间窗口内的记录，写出JSON并记录日志
+    - 进程级累计值和最近的耗时样本用于导出Prometheus文本格式
+    """
+
+    def __init__(self, window=5000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._records = []  # 进行中的运行窗口内的记录
+        self._active_runs = 0
+        self._totals = defaultdict(lambda: {
+            "success": 0,
+            "error": 0,
+            "cached": 0,
+            "retries": 0,
+            "seconds": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0
+        })
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self.last_report = None  # 最近一次结束的运行汇总
+
+    @contextmanager
+    def attempt(self, attempt):
+        """标记当前线程正在进行第几次尝试（0表示首次），供本线程内的调用记录"""
+        previous = getattr(self._local, "attempt", 0)
+        self._local.attempt = attempt
+        try:
+            yield
+        finally:
+            self._local.attempt = previous
+
+    def current_attempt(self):
+        return getattr(self._local, "attempt", 0)
+
+    def record(self, stage, seconds, prompt_tokens=0, completion_tokens=0, outcome="success", attempt=None):
+        """记录一次调用"""
+        if attempt is None:
+            attempt = self.current_attempt()
+        record = {
+            "stage": stage,
+            "seconds": seconds,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "attempt": attempt,
+            "outcome": outcome
+        }
+        with self._lock:
+            if self._active_runs:
+                self._records.append(record)
+            totals = self._totals[stage]
+            totals[outcome] += 1
+            totals["retries"] += 1 if attempt else 0
+            totals["seconds"] += seconds
+            totals["prompt_tokens"] += record["prompt_tokens"]
+            totals["completion_tokens"] += record["completion_tokens"]
+            if outcome != "cached":
+                self._samples[stage].append(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        """记录代码块的耗时；调用方可在产出的dict中填写token数，异常时记为error"""
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "outcome": "success"}
+        start = time.perf_counter()
+        try:
+            yield usage
+        except Exception:
+            usage["outcome"] = "error"
+            raise
+        finally:
+            self.record(
+                stage,
+                time.perf_counter() - start,
+                usage["prompt_tokens"],
+                usage["completion_tokens"],
+                usage["outcome"]
+            )
+
+    def _cost(self, prompt_tokens, completion_tokens, stage):
+        """估算费用（美元），Notion调用不计费"""
+        if stage == "publish":
+            return 0.0
+        return (
+            prompt_tokens * config.DEEPSEEK_INPUT_PRICE_PER_M
+            + completion_tokens * config.DEEPSEEK_OUTPUT_PRICE_PER_M
+        ) / 1_000_000
+
+    def summarize(self, records):
+        """按阶段汇总记录：调用数、错误、重试、缓存命中、耗时分位数、token和费用"""
+        stages = defaultdict(list)
+        for record in records:
+            stages[record["stage"]].append(record)
+
+        summary = {}
+        for stage, items in sorted(stages.items()):
+            latencies = sorted(item["seconds"] for item in items if item["outcome"] != "cached")
+            prompt_tokens = sum(item["prompt_tokens"] for item in items)
+            completion_tokens = sum(item["completion_tokens"] for item in items)
+            summary[stage] = {
+                "calls": len(latencies),
+                "errors": sum(1 for item in items if item["outcome"] == "error"),
+                "retries": sum(1 for item in items if item["attempt"]),
+                "cached": sum(1 for item in items if item["outcome"] == "cached"),
+                "total_seconds": round(sum(latencies), 3),
+                **{f"p{int(q * 100)}_seconds": round(percentile(latencies, q), 3) for q in QUANTILES},
+                "max_seconds": round(latencies[-1], 3) if latencies else 0.0,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": round(self._cost(prompt_tokens, completion_tokens, stage), 6)
+            }
+        return summary
+
+    @contextmanager
+    def run(self, label):
+        """统计一次任务运行，结束时输出各阶段汇总并写出JSON和Prometheus文件
+
+        同时进行的多个运行共享时间窗口内的全部记录。
+        """
+        started_at = datetime.now()
+        start = time.perf_counter()
+        with self._lock:
+            self._active_runs += 1
+            offset = len(self._records)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                records = self._records[offset:]
+                self._active_runs -= 1
+                if not self._active_runs:
+                    self._records = []
+            report = {
+                "label": label,
+                "started_at": started_at.isoformat(),
+                "wall_seconds": round(time.perf_counter() - start, 3),
+                "stages": self.summarize(records)
+            }
+            self.last_report = report
+            self._log_report(report)
+            self._export(report)
+
+    def _log_report(self, report):
+        logger.info(f"运行 {report['label']} 耗时 {report['wall_seconds']:.2f}s，各阶段调用统计:")
+        for stage, stats in report["stages"].items():
+            logger.info(
+                f"  {stage}: 调用 {stats['calls']} 次（错误 {stats['errors']}，重试 {stats['retries']}，"
+                f"缓存 {stats['cached']}），合计 {stats['total_seconds']:.2f}s，"
+                f"p50 {stats['p50_seconds']:.2f}s，p90 {stats['p90_seconds']:.2f}s，"
+                f"p99 {stats['p99_seconds']:.2f}s，tokens {stats['prompt_tokens']}+{stats['completion_tokens']}，"
+                f"费用 ${stats['cost_usd']:.4f}"
+            )
+
+    def _export(self, report):
+        if not config.METRICS_DIR:
+            return
+        try:
+            os.makedirs(config.METRICS_DIR, exist_ok=True)
+            stamp = datetime.fromisoformat(report["started_at"]).strftime("%Y%m%d-%H%M%S")
+            json_path = os.path.join(config.METRICS_DIR, f"run-{stamp}-{report['label']}.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+            prom_path = os.path.join(config.METRICS_DIR, "metrics.prom")
+            tmp_path = f"{prom_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, prom_path)
+            logger.info(f"调用统计已写入: {json_path}")
+        except OSError as e:
+            logger.warning(f"写出调用统计失败: {str(e)}")
+
+    def to_json(self):
+        """进程累计统计的JSON"""
+        with self._lock:
+            totals = {stage: dict(values) for stage, values in self._totals.items()}
+        return json.dumps(totals, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """进程累计统计的Prometheus文本格式（可供node_exporter的textfile采集器读取）"""
+        with self._lock:
+            totals = {stage: dict(values) for stage, values in self._totals.items()}
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+
+        lines = [
+            f"# HELP {METRIC_PREFIX}_call_seconds Latency of LLM and Notion calls (recent window).",
+            f"# TYPE {METRIC_PREFIX}_call_seconds summary"
+        ]
+        for stage, values in sorted(samples.items()):
+            for q in QUANTILES:
+                lines.append(f'{METRIC_PREFIX}_call_seconds{{stage="{stage}",quantile="{q}"}} {percentile(values, q):.6f}')
+            lines.append(f'{METRIC_PREFIX}_call_seconds_sum{{stage="{stage}"}} {totals[stage]["seconds"]:.6f}')
+            lines.append(f'{METRIC_PREFIX}_call_seconds_count{{stage="{stage}"}} {totals[stage]["success"] + totals[stage]["error"]}')
+
+        lines += [
+            f"# HELP {METRIC_PREFIX}_calls_total Calls by stage and outcome.",
+            f"# TYPE {METRIC_PREFIX}_calls_total counter"
+        ]
+        for stage, values in sorted(totals.items()):
+            for outcome in ("success", "error", "cached"):
+                lines.append(f'{METRIC_PREFIX}_calls_total{{stage="{stage}",outcome="{outcome}"}} {values[outcome]}')
+
+        lines += [
+            f"# HELP {METRIC_PREFIX}_retries_total Retry attempts by stage.",
+            f"# TYPE {METRIC_PREFIX}_retries_total counter"
+        ]
+        for stage, values in sorted(totals.items()):
+            lines.append(f'{METRIC_PREFIX}_retries_total{{stage="{stage}"}} {values["retries"]}')
+
+        lines += [
+            f"# HELP {METRIC_PREFIX}_tokens_total Tokens reported in response usage.",
+            f"# TYPE {METRIC_PREFIX}_tokens_total counter"
+        ]
+        for stage, values in sorted(totals.items()):
+            lines.append(f'{METRIC_PREFIX}_tokens_total{{stage="{stage}",kind="prompt"}} {values["prompt_tokens"]}')
+            lines.append(f'{METRIC_PREFIX}_tokens_total{{stage="{stage}",kind="completion"}} {values["completion_tokens"]}')
+
+        lines += [
+            f"# HELP {METRIC_PREFIX}_cost_usd_total Estimated DeepSeek cost.",
+            f"# TYPE {METRIC_PREFIX}_cost_usd_total counter"
+        ]
+        for stage, values in sorted(totals.items()):
+            cost = self._cost(values["prompt_tokens"], values["completion_tokens"], stage)
+            lines.append(f'{METRIC_PREFIX}_cost_usd_total{{stage="{stage}"}} {cost:.6f}')
+        return "\n".join(lines) + "\n"
+
+# 进程内共享的统计实例
+_metrics = MetricsRegistry()
+
+def get_metrics():
+    """获取共享的调用统计"""
+    return _metrics
@@ -0,0 +1,535 @@
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import logging
+import threading
+from collections import Counter, defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 流式响应每个分片的字符数
+STREAM_CHUNK_CHARS = 24
+
+# 生成模拟事件描述用的主体和词语，随机组合后描述之间的n-gram重叠很小，不会被近似去重合并
+EVENT_SUBJECTS = [
+    "美联储", "美国劳工部", "美国商务部", "美国财政部", "苹果公司", "英伟达", "微软", "亚马逊",
+    "谷歌母公司", "特斯拉", "Meta", "摩根大通", "高盛", "伯克希尔", "埃克森美孚", "强生",
+    "波音", "英特尔", "超威半导体", "奈飞", "沃尔玛", "好市多", "辉瑞", "礼来"
+]
+EVENT_WORDS = [
+    "利率", "通胀", "就业", "薪资", "零售", "消费", "制造", "服务", "出口", "进口",
+    "库存", "订单", "房价", "信贷", "债券", "收益", "美元", "原油", "黄金", "芯片",
+    "云端", "广告", "订阅", "电商", "物流", "医药", "疫苗", "电池", "汽车", "航空",
+    "银行", "保险", "支付", "游戏", "能源", "电力", "钢铁", "农业", "旅游", "地产",
+    "回购", "分红", "并购", "裁员", "扩产", "监管", "诉讼", "关税", "补贴", "预算",
+    "指引", "上调", "下调", "超预期", "不及预期", "创新高", "放缓", "反弹", "承压", "改善"
+]
+EVENT_TYPES = ["经济数据", "财报事件", "政策变动", "市场新闻", "公司公告"]
+EARNINGS_COMPANIES = [
+    ("Oracle", "ORCL"), ("Adobe", "ADBE"), ("Broadcom", "AVGO"), ("Micron", "MU"), ("FedEx", "FDX"),
+    ("Nike", "NKE"), ("Costco", "COST"), ("Accenture", "ACN"), ("General Mills", "GIS"), ("Carnival", "CCL")
+]
+
+def parse_latency(spec):
+    """解析延迟分布描述，返回采样函数（秒）
+
+    支持的格式：
+    - fixed:0.1 固定延迟
+    - uniform:0.05:0.3 均匀分布
+    - lognormal:0.2:0.5 对数正态分布（中位数, sigma），模拟长尾
+    - exponential:0.1 指数分布（均值）
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(":") if value]
+    except ValueError:
+        raise ValueError(f"无效的延迟分布: {spec}")
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        if median <= 0:
+            return lambda rng: 0.0
+        mu = math.log(median)
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    if kind == "exponential" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"无效的延迟分布: {spec}")
+
+def estimate_tokens(text):
+    """粗略估算token数（按约2个字符1个token）"""
+    return max(1, len(text) // 2)
+
+class FaultProfile:
+    """替身服务的延迟和故障注入配置
+
+    - latency: 首字节延迟分布，见 parse_latency
+    - error_rate: 返回500错误的概率
+    - rate_limit_rate: 返回429（带Retry-After头）的概率
+    - retry_after: 429响应的Retry-After（秒）
+    - chars_per_second: 模拟生成速度，响应内容按此速度输出（0表示不限）
+    """
+
+    def __init__(self, latency="fixed:0", error_rate=0.0, rate_limit_rate=0.0, retry_after=1,
+                 chars_per_second=0, seed=None):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.chars_per_second = chars_per_second
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self):
+        with self._lock:
+            return max(self.latency(self._rng), 0.0)
+
+    def sample_fault(self):
+        """按概率返回注入的状态码（429/500），不注入时返回None"""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+    def generation_delay(self, text):
+        return len(text) / self.chars_per_second if self.chars_per_second else 0.0
+
+class StreamResponse:
+    """分块传输的流式响应：依次输出的字节片段及每片之前的等待时间"""
+
+    def __init__(self, pieces, delay_per_piece=0.0, headers=None):
+        self.pieces = pieces
+        self.delay_per_piece = delay_per_piece
+        self.headers = headers or {}
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            body = {}
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        status, payload, headers = self.server.owner.dispatch(self.command, url.path, query, body)
+        if isinstance(payload, StreamResponse):
+            self._send_stream(status, payload)
+        else:
+            self._send_json(status, payload, headers)
+
+    def _send_json(self, status, payload, headers):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, status, stream):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in stream.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        for piece in stream.pieces:
+            if stream.delay_per_piece:
+                time.sleep(stream.delay_per_piece)
+            self.wfile.write(f"{len(piece):X}\r\n".encode("ascii") + piece + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PATCH = _handle
+    do_DELETE = _handle
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端关闭多余的keep-alive连接属于正常情况，不输出堆栈
+        error = sys.exc_info()[1]
+        if isinstance(error, (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+class MockServer:
+    """在后台线程中运行的本地替身HTTP服务
+
+    子类实现 route(method, path, query, body)，返回 (状态码, 响应体, 响应头, 路由名)；
+    响应体为 StreamResponse 时按分块传输输出。每个请求先按 FaultProfile 等待首字节延迟并
+    按概率注入429/500，每个路由的请求数和状态码计入 stats。
+    """
+
+    def __init__(self, profile=None, host="127.0.0.1", port=0):
+        self.profile = profile or FaultProfile()
+        self._httpd = _QuietHTTPServer((host, port), _Handler)
+        self._httpd.owner = self
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.stats = defaultdict(Counter)  # 路由名 -> 状态码计数
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"{type(self).__name__} 已启动: {self.url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def snapshot(self):
+        """各路由的请求数和注入的错误数"""
+        with self._stats_lock:
+            return {
+                route: {
+                    "requests": sum(counts.values()),
+                    "rate_limited": counts.get(429, 0),
+                    "errors": sum(count for status, count in counts.items() if status >= 500)
+                }
+                for route, counts in sorted(self.stats.items())
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats.clear()
+
+    def _count(self, route, status):
+        with self._stats_lock:
+            self.stats[route][status] += 1
+
+    def error_payload(self, status):
+        return {"error": {"message": "injected error", "code": status}}
+
+    def dispatch(self, method, path, query, body):
+        time.sleep(self.profile.sample_latency())
+        status = self.profile.sample_fault()
+        if status is not None:
+            self._count(self.route_name(method, path, body), status)
+            headers = {"Retry-After": str(self.profile.retry_after)} if status == 429 else {}
+            return status, self.error_payload(status), headers
+        status, payload, headers, route = self.route(method, path, query, body)
+        self._count(route, status)
+        return status, payload, headers
+
+    def route_name(self, method, path, body):
+        return f"{method} {path}"
+
+    def route(self, method, path, query, body):
+        raise NotImplementedError
+
+class MockDeepSeekServer(MockServer):
+    """OpenAI兼容的 /chat/completions 替身
+
+    按提示词内容返回对应的预设响应：事件搜索返回 events_per_search 个事件的JSON数组，
+    每日增量搜索返回一个新增、一个变化和一个取消的事件，
+    财报搜索返回同样数量的财报事件，增强请求返回来源和分析JSON，批量分析返回分段文本，
+    总结请求返回固定长度的报告。支持 stream=true 的SSE流式输出及结尾的usage分片。
+    """
+
+    def __init__(self, profile=None, events_per_search=10, seed=1, **kwargs):
+        super().__init__(profile, **kwargs)
+        self.events_per_search = events_per_search
+        self.seed = seed
+
+    def error_payload(self, status):
+        kind = "rate_limit_exceeded" if status == 429 else "server_error"
+        return {"error": {"message": "injected error", "type": kind, "code": kind}}
+
+    def classify(self, body):
+        """根据最后一条用户消息判断请求类型"""
+        messages = body.get("messages") or [{}]
+        prompt = messages[-1].get("content", "")
+        if "总结" in prompt or "要点" in prompt:
+            return "summary"
+        if "将发布财报" in prompt:
+            return "earnings"
+        if "已知事件：" in prompt:
+            return "delta"
+        if "批量分析" in prompt:
+            return "batch"
+        if "以JSON格式输出" in prompt:
+            return "enrich"
+        return "search"
+
+    def route_name(self, method, path, body):
+        return f"chat.completions:{self.classify(body)}" if path.endswith("/chat/completions") else f"{method} {path}"
+
+    def build_events(self, date):
+        rng = random.Random(f"{self.seed}-{self.events_per_search}")
+        events = []
+        for index in range(self.events_per_search):
+            subject = EVENT_SUBJECTS[index % len(EVENT_SUBJECTS)]
+            events.append({
+                "date": date,
+                "time": f"{rng.randint(4, 20):02d}:{rng.choice((0, 15, 30, 45)):02d}",
+                "description": subject + "".join(rng.sample(EVENT_WORDS, 5)),
+                "type": rng.choice(EVENT_TYPES)
+            })
+        return events
+
+    def build_delta(self, date, prompt):
+        """每日增量搜索：新增一个事件，第一个已知事件推迟一小时，第二个已知事件取消"""
+        known = []
+        for line in prompt.split("已知事件：", 1)[1].splitlines():
+            event_time, _, description = line.partition("|")
+            if description:
+                known.append((event_time.strip(), description.strip()))
+        events = [{
+            "date": date,
+            "time": "10:30",
+            "description": "美联储理事临时发表讲话，讨论通胀前景与利率路径",
+            "type": "政策变动"
+        }]
+        if known:
+            event_time, description = known[0]
+            hour, _, minute = event_time.partition(":")
+            if hour.isdigit() and minute.isdigit():
+                event_time = f"{(int(hour) + 1) % 24:02d}:{minute}"
+            events.append({"date": date, "time": event_time, "description": description, "type": "市场新闻"})
+        if len(known) > 1:
+            event_time, description = known[1]
+            events.append({"date": date, "time": event_time, "description": description, "type": "已取消"})
+        return events
+
+    def build_earnings(self, date):
+        rng = random.Random(f"{self.seed}-earnings-{self.events_per_search}")
+        events = []
+        for index in range(self.events_per_search):
+            name, code = EARNINGS_COMPANIES[index % len(EARNINGS_COMPANIES)]
+            if index >= len(EARNINGS_COMPANIES):
+                name, code = f"{name} {index // len(EARNINGS_COMPANIES)}", f"{code}{index // len(EARNINGS_COMPANIES)}"
+            events.append({
+                "report_date": date,
+                "time": rng.choice(("盘前", "盘后")),
+                "company_name": name,
+                "stock_code": code,
+                "description": f"{name}将发布季度财报",
+                "eps_forecast": f"{rng.uniform(0.5, 5):.2f}美元",
+                "revenue_forecast": f"{rng.uniform(10, 900):.1f}亿美元",
+                "last_quarter": "上季度业绩符合预期",
+                "focus_points": "营收增长、利润率、全年指引",
+                "market_impact": "可能影响所在行业板块走势",
+                "type": "财报事件"
+            })
+        return events
+
+    def build_content(self, kind, body):
+        date = time.strftime("%Y-%m-%d")
+        prompt = (body.get("messages") or [{}])[-1].get("content", "")
+        if kind == "search":
+            return json.dumps(self.build_events(date), ensure_ascii=False, indent=2)
+        if kind == "delta":
+            return json.dumps(self.build_delta(date, prompt), ensure_ascii=False, indent=2)
+        if kind == "earnings":
+            return json.dumps(self.build_earnings(date), ensure_ascii=False, indent=2)
+        if kind == "enrich":
+            return json.dumps({
+                "source_name": "Reuters",
+                "source_url": "https://www.reuters.com/markets/us/",
+                "source_type": "官方媒体",
+                "market_phase": "盘中",
+                "market_impact": "短期内可能带动相关板块波动，整体影响有限",
+                "industry_impact": "相关行业龙头公司可能出现较大波动",
+                "related_stocks": "AAPL, MSFT, NVDA",
+                "sentiment": ["bullish if 数据好于预期", "bearish if 数据差于预期"],
+                "confidence_level": "medium"
+            }, ensure_ascii=False, indent=2)
+        if kind == "batch":
+            count = max([int(n) for n in re.findall(r"事件(\d+)[:：]", prompt)] or [0])
+            return "\n".join(
+                f"事件{index}分析:\n1. 市场影响: 短期内可能带动相关板块波动\n2. 行业影响: 相关行业龙头可能出现较大波动\n"
+                f"3. 相关个股: AAPL, MSFT\n4. 确信度: medium\n5. 市场情绪: neutral\n"
+                f"6. 信息来源: Reuters https://www.reuters.com/markets/us/\n"
+                for index in range(1, count + 1)
+            )
+        return "\n".join(f"{index}. 市场总结第{index}部分：" + "市场整体表现平稳，投资者关注后续数据。" * 8 for index in range(1, 8))
+
+    def route(self, method, path, query, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": "not found", "type": "invalid_request_error"}}, {}, f"{method} {path}"
+        kind = self.classify(body)
+        route = f"chat.completions:{kind}"
+        content = self.build_content(kind, body)
+        prompt_text = "".join(message.get("content", "") for message in body.get("messages", []))
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt_text),
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": estimate_tokens(prompt_text) + estimate_tokens(content)
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "deepseek-chat")
+
+        if not body.get("stream"):
+            time.sleep(self.profile.generation_delay(content))
+            return 200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }, {}, route
+
+        def chunk(choices, **extra):
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                **extra
+            }
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        pieces = [
+            chunk([{"index": 0, "delta": {"content": content[i:i + STREAM_CHUNK_CHARS]}, "finish_reason": None}])
+            for i in range(0, len(content), STREAM_CHUNK_CHARS)
+        ]
+        pieces.append(chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            pieces.append(chunk([], usage=usage))
+        pieces.append(b"data: [DONE]\n\n")
+        delay = self.profile.generation_delay(content[:STREAM_CHUNK_CHARS])
+        return 200, StreamResponse(pieces, delay), {}, route
+
+class MockNotionServer(MockServer):
+    """Notion pages/blocks API 替身
+
+    在内存中保存页面和块树，支持创建页面、分页读取子块、追加子块和更新块，
+    新建页面会作为 child_page 出现在父页面的子块中。
+    """
+
+    def __init__(self, profile=None, **kwargs):
+        super().__init__(profile, **kwargs)
+        self._lock = threading.Lock()
+        self.blocks = {}
+        self.children = defaultdict(list)
+
+    def reset(self):
+        with self._lock:
+            self.blocks.clear()
+            self.children.clear()
+
+    def error_payload(self, status):
+        code = "rate_limited" if status == 429 else "internal_server_error"
+        return {"object": "error", "status": status, "code": code, "message": "injected error"}
+
+    def _not_found(self, block_id, route):
+        return 404, {
+            "object": "error",
+            "status": 404,
+            "code": "object_not_found",
+            "message": f"Could not find block with ID: {block_id}."
+        }, {}, route
+
+    def route_name(self, method, path, body):
+        parts = path.strip("/").split("/")
+        if parts[-1] == "pages":
+            return "pages.create"
+        if parts[-1] == "children":
+            return "blocks.children.list" if method == "GET" else "blocks.children.append"
+        if len(parts) >= 3 and parts[-2] == "blocks":
+            return "blocks.update"
+        return f"{method} {path}"
+
+    def _add_children(self, parent_id, blocks):
+        """登记子块（调用方持有锁），表格的行作为表格的子块保存"""
+        created = []
+        for block in blocks:
+            block = json.loads(json.dumps(block))
+            block_type = block.get("type")
+            rows = block.get(block_type, {}).pop("children", []) if block_type == "table" else []
+            block.update({"object": "block", "id": str(uuid.uuid4()), "has_children": bool(rows)})
+            self.blocks[block["id"]] = block
+            self.children[parent_id].append(block["id"])
+            if rows:
+                self._add_children(block["id"], rows)
+            created.append(block)
+        return created
+
+    def route(self, method, path, query, body):
+        route = self.route_name(method, path, body)
+        parts = path.strip("/").split("/")
+        with self._lock:
+            if route == "pages.create":
+                parent = body.get("parent", {})
+                parent_id = parent.get("page_id") or parent.get("database_id") or parent.get("data_source_id")
+                title_items = body.get("properties", {}).get("title", {}).get("title", [])
+                title = "".join(item.get("text", {}).get("content", "") for item in title_items)
+                page_id = str(uuid.uuid4())
+                self.blocks[page_id] = {
+                    "object": "block",
+                    "id": page_id,
+                    "type": "child_page",
+                    "child_page": {"title": title},
+                    "has_children": True
+                }
+                self.children[parent_id].append(page_id)
+                self._add_children(page_id, body.get("children", []))
+                return 200, {"object": "page", "id": page_id, "url": f"https://www.notion.so/{page_id.replace('-', '')}"}, {}, route
+
+            if route == "blocks.children.list":
+                block_id = parts[-2]
+                ids = self.children.get(block_id, [])
+                start = int(query.get("start_cursor") or 0)
+                size = min(int(query.get("page_size") or 100), 100)
+                end = start + size
+                return 200, {
+                    "object": "list",
+                    "results": [self.blocks[child_id] for child_id in ids[start:end]],
+                    "has_more": end < len(ids),
+                    "next_cursor": str(end) if end < len(ids) else None
+                }, {}, route
+
+            if route == "blocks.children.append":
+                block_id = parts[-2]
+                if block_id not in self.blocks:
+                    return self._not_found(block_id, route)
+                created = self._add_children(block_id, body.get("children", []))
+                return 200, {"object": "list", "results": created, "has_more": False, "next_cursor": None}, {}, route
+
+            if route == "blocks.update":
+                block_id = parts[-1]
+                block = self.blocks.get(block_id)
+                if block is None:
+                    return self._not_found(block_id, route)
+                block_type = block.get("type")
+                if block_type in body:
+                    block[block_type] = body[block_type]
+                return 200, block, {}, route
+
+        return 404, {"object": "error", "status": 404, "code": "invalid_request_url", "message": "Invalid request URL."}, {}, route
@@ -0,0 +1,288 @@
+import os
+import re
+import time
+import zlib
+import random
+import sqlite3
+import logging
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from fingerprint import normalize_description, normalize_time, event_fingerprint
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 包含度只对足够长的描述有意义，较短描述至少包含这么多个词元时才按包含度判断
+MIN_CONTAINMENT_TOKENS = 5
+
+# 词元：连续的字母数字（如 cpi、3）作为一个词元，其余字符（中文）逐字作为词元
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+|.')
+
+def shingles(text, size=2):
+    """将规范化后的描述切分为字符n-gram集合（中文按字切分无需分词）"""
+    text = normalize_description(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def tokens(text):
+    """将规范化后的描述切分为词元集合"""
+    return set(_TOKEN_PATTERN.findall(normalize_description(text)))
+
+def features(text, size=2):
+    """描述的比较特征：(字符n-gram集合, 词元集合)"""
+    return shingles(text, size), tokens(text)
+
+def is_distinct(left, right, terms):
+    """两个描述中是否有限定词只出现在其中一个（如 CPI 与 核心CPI），此时不视为同一事件"""
+    if not terms:
+        return False
+    left, right = normalize_description(left), normalize_description(right)
+    return any((term in left) != (term in right) for term in terms)
+
+def similarity(left, right):
+    """返回两个描述特征的 (n-gram Jaccard相似度, 词元包含度)，较短一方词元过少时不计包含度
+
+    改写后的同一事件（如"美国3月CPI公布"/"美国劳工部公布3月CPI数据"）插入的词会打散n-gram，
+    n-gram包含度只有0.75，但较短描述的词元全部出现在较长描述中；
+    只差一个词的不同事件（如"3月CPI"/"3月PPI"）中 cpi 与 ppi 是不同的词元。
+    """
+    left_shingles, left_tokens = left
+    right_shingles, right_tokens = right
+    if not left_shingles or not right_shingles:
+        return 0.0, 0.0
+    intersection = len(left_shingles & right_shingles)
+    jaccard = intersection / (len(left_shingles) + len(right_shingles) - intersection)
+    shorter = min(len(left_tokens), len(right_tokens))
+    containment = len(left_tokens & right_tokens) / shorter if shorter >= MIN_CONTAINMENT_TOKENS else 0.0
+    return jaccard, containment
+
+class MinHasher:
+    """MinHash签名，使用固定种子的随机排列，签名可跨进程持久化比较"""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingle_set):
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set]
+        if not hashes:
+            return array("I", [_MAX_HASH] * self.num_perm)
+        return array("I", [
+            min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes)
+            for a, b in self.permutations
+        ])
+
+class LSHIndex:
+    """MinHash签名的分段LSH索引：同一范围（如日期）内任一分段完全相同的签名成为候选"""
+
+    def __init__(self, bands, rows):
+        self.bands = bands
+        self.rows = rows
+        self.tables = [defaultdict(list) for _ in range(bands)]
+
+    def _band_keys(self, signature, scope):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, (scope, signature[start:start + self.rows].tobytes())
+
+    def add(self, key, signature, scope=None):
+        for band, band_key in self._band_keys(signature, scope):
+            self.tables[band][band_key].append(key)
+
+    def candidates(self, signature, scope=None):
+        found = set()
+        for band, band_key in self._band_keys(signature, scope):
+            found.update(self.tables[band].get(band_key, ()))
+        return found
+
+class NearDuplicateDetector:
+    """近似重复事件检测
+
+    对事件描述的字符n-gram计算MinHash签名，并按日期用LSH索引本次运行和最近历史中的事件；
+    LSH候选再用精确的n-gram集合和词元集合验证。同一天、时间在容差内（默认必须相同），且描述的
+    n-gram Jaccard相似度或词元包含度（交集占较短描述的比例）达到阈值的事件视为同一事件。
+    同一时间发布的不同数据（如"CPI同比"/"核心CPI同比"）词元高度重合，包含度可达0.9以上，
+    因此还要求两者不存在只出现在一方的限定词（distinguishing_terms）。
+    使用32段×2行的分段，使Jaccard为0.3的事件对成为候选的概率仍超过95%。
+    历史事件及其签名保存在SQLite中，按日期在首次查询时加载。
+    """
+
+    def __init__(self, jaccard_threshold, containment_threshold, history_path=None, history_days=7,
+                 time_tolerance=0, distinguishing_terms=(), num_perm=64, bands=32, shingle_size=2):
+        self.jaccard_threshold = jaccard_threshold
+        self.containment_threshold = containment_threshold
+        self.history_days = history_days
+        self.time_tolerance = time_tolerance  # 分钟
+        self.distinguishing_terms = [normalize_description(term) for term in distinguishing_terms]
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.index = LSHIndex(bands, num_perm // bands)
+        self.entries = {}  # 指纹 -> (日期, 时间, 描述, 比较特征, 分钟数)
+        self._loaded_dates = set()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if history_path:
+            directory = os.path.dirname(history_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(history_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    fingerprint TEXT PRIMARY KEY,
+                    report_date TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_events_report_date ON events (report_date)")
+            self._conn.execute(
+                "DELETE FROM events WHERE created_at < ?", (time.time() - history_days * 86400,)
+            )
+            self._conn.commit()
+
+    def _load_date(self, report_date):
+        """首次遇到某个日期时加载该日期的历史事件（调用方持有锁）"""
+        if report_date in self._loaded_dates:
+            return
+        self._loaded_dates.add(report_date)
+        if self._conn is None:
+            return
+        rows = self._conn.execute(
+            "SELECT fingerprint, time, description, signature FROM events WHERE report_date = ?", (report_date,)
+        ).fetchall()
+        for fingerprint, event_time, description, blob in rows:
+            signature = array("I")
+            signature.frombytes(blob)
+            if fingerprint in self.entries or len(signature) != self.hasher.num_perm:
+                continue
+            self.entries[fingerprint] = (
+                report_date, event_time, description, features(description, self.shingle_size), self._minutes(event_time)
+            )
+            self.index.add(fingerprint, signature, report_date)
+        if rows:
+            logger.info(f"已加载 {report_date} 的 {len(rows)} 个历史事件")
+
+    def _minutes(self, value):
+        match = re.match(r'^(\d{2}):(\d{2})$', normalize_time(value))
+        return int(match.group(1)) * 60 + int(match.group(2)) if match else None
+
+    def _times_compatible(self, left, right):
+        """两个时间（分钟数）都能解析时要求相差不超过容差，否则不作限制"""
+        return left is None or right is None or abs(left - right) <= self.time_tolerance
+
+    def match(self, event, report_date):
+        """查找与事件近似重复的已知事件
+
+        Returns:
+            tuple: (指纹, 签名, 比较特征)，其中指纹为匹配到的已知事件指纹（未匹配时为None）
+        """
+        description = event.get("description", "")
+        feature = features(description, self.shingle_size)
+        signature = self.hasher.signature(feature[0])
+        minutes = self._minutes(event.get("time", ""))
+        best, best_score = None, 0.0
+        with self._lock:
+            self._load_date(report_date)
+            for key in self.index.candidates(signature, report_date):
+                _, _, entry_description, entry_feature, entry_minutes = self.entries[key]
+                if not self._times_compatible(entry_minutes, minutes):
+                    continue
+                jaccard, containment = similarity(feature, entry_feature)
+                if jaccard < self.jaccard_threshold and containment < self.containment_threshold:
+                    continue
+                if is_distinct(description, entry_description, self.distinguishing_terms):
+                    continue
+                if jaccard > best_score:
+                    best, best_score = key, jaccard
+        return best, signature, feature
+
+    def entry(self, key):
+        """返回已知事件的 (日期, 时间, 描述)"""
+        report_date, event_time, description, _, _ = self.entries[key]
+        return report_date, event_time, description
+
+    def add(self, event, report_date, signature, feature):
+        """登记一个新事件并写入历史，返回其指纹"""
+        key = event_fingerprint(event, report_date)
+        event_time, description = event.get("time", ""), event.get("description", "")
+        with self._lock:
+            self._load_date(report_date)
+            if key in self.entries:
+                return key
+            self.entries[key] = (report_date, event_time, description, feature, self._minutes(event_time))
+            self.index.add(key, signature, report_date)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO events (fingerprint, report_date, time, description, signature, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, report_date, event_time, description, signature.tobytes(), time.time())
+                )
+                self._conn.commit()
+        return key
+
+    def close(self):
+        """关闭数据库连接"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+class DuplicateCollapser:
+    """单次运行内的近似重复合并
+
+    - 与本次运行中已保留的事件重复：丢弃当前事件，已保留的事件可能正在增强线程中被修改，
+      因此在增强全部完成后再由 apply_merges 用它补全已保留事件缺失的字段
+    - 与历史事件重复：保留本次的时间和描述（改期、改写不被隐藏），记下历史事件的指纹，
+      台账中没有本次指纹的记录时复用历史事件的增强结果
+    - 新事件：保留并登记
+    """
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.kept = {}  # 指纹 -> 本次保留的事件
+        self.history_keys = {}  # id(事件) -> 匹配到的历史事件指纹
+        self.pending_merges = []  # (已保留的事件, 被合并的重复事件)
+        self.merged = 0
+        self.matched_history = 0
+
+    def add(self, event):
+        """处理一个事件，返回应保留的事件，重复时返回None"""
+        report_date = event.get("date") or datetime.now().strftime("%Y-%m-%d")
+        key, signature, feature = self.detector.match(event, report_date)
+        if key is not None and key in self.kept:
+            kept = self.kept[key]
+            self.pending_merges.append((kept, event))
+            self.merged += 1
+            logger.info(f"合并近似重复事件: {event.get('description', '')[:30]} -> {kept.get('description', '')[:30]}")
+            return None
+
+        if key is not None:
+            _, event_time, description = self.detector.entry(key)
+            if description != event.get("description") or event_time != event.get("time"):
+                self.history_keys[id(event)] = key
+                self.matched_history += 1
+        else:
+            key = self.detector.add(event, report_date, signature, feature)
+        self.kept[key] = event
+        return event
+
+    def apply_merges(self):
+        """增强任务全部完成后，用被合并的重复事件补全已保留事件缺失的字段"""
+        for kept, event in self.pending_merges:
+            for field, value in event.items():
+                kept.setdefault(field, value)
+        self.pending_merges = []
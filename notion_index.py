@@ -0,0 +1,120 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class NotionIndex:
+    """Notion页面和块ID的本地索引
+
+    记录 报告日期 → 页面ID（及表格、总结块ID），以及 事件指纹 → 表格行块ID，
+    写入前直接查询本地索引，避免通过Notion API搜索页面和读取表格。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                report_date TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                table_id TEXT,
+                summary_block_id TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (report_date, kind)
+            );
+            CREATE TABLE IF NOT EXISTS rows (
+                page_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                block_id TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                PRIMARY KEY (page_id, fingerprint)
+            );
+        """)
+        self._conn.commit()
+
+    def get_page(self, report_date, kind):
+        """查询指定日期和类型的页面记录，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_id, table_id, summary_block_id FROM pages WHERE report_date = ? AND kind = ?",
+                (report_date, kind)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def save_page(self, report_date, kind, page_id, table_id=None, summary_block_id=None):
+        """写入页面记录"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (report_date, kind, page_id, table_id, summary_block_id, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (report_date, kind, page_id, table_id, summary_block_id, time.time())
+            )
+            self._conn.commit()
+
+    def get_rows(self, page_id):
+        """返回页面中各事件行: {指纹: {"block_id": ..., "signature": ...}}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint, block_id, signature FROM rows WHERE page_id = ?", (page_id,)
+            ).fetchall()
+        return {row["fingerprint"]: {"block_id": row["block_id"], "signature": row["signature"]} for row in rows}
+
+    def save_rows(self, page_id, rows):
+        """写入或更新事件行记录
+
+        Args:
+            page_id (str): 页面ID
+            rows (dict): {指纹: {"block_id": ..., "signature": ...}}
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (page_id, fingerprint, block_id, signature) VALUES (?, ?, ?, ?)",
+                [(page_id, fingerprint, row["block_id"], row["signature"]) for fingerprint, row in rows.items()]
+            )
+            self._conn.commit()
+
+    def replace_page(self, report_date, kind, page_id, table_id, summary_block_id, rows):
+        """用从Notion同步的完整状态覆盖页面及其全部行记录"""
+        with self._lock:
+            self._conn.execute("DELETE FROM rows WHERE page_id = ?", (page_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (report_date, kind, page_id, table_id, summary_block_id, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (report_date, kind, page_id, table_id, summary_block_id, time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO rows (page_id, fingerprint, block_id, signature) VALUES (?, ?, ?, ?)",
+                [(page_id, fingerprint, row["block_id"], row["signature"]) for fingerprint, row in rows.items()]
+            )
+            self._conn.commit()
+        logger.info(f"已同步Notion索引: {report_date} {kind}，{len(rows)} 行")
+
+    def delete_page(self, report_date, kind):
+        """删除页面及其行记录（索引与Notion不一致时调用）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_id FROM pages WHERE report_date = ? AND kind = ?", (report_date, kind)
+            ).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM rows WHERE page_id = ?", (row["page_id"],))
+            self._conn.execute("DELETE FROM pages WHERE report_date = ? AND kind = ?", (report_date, kind))
+            self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
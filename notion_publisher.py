@@ -0,0 +1,215 @@
+import time
+import logging
+import threading
+from notion_client import APIResponseError
+from config import (
+    NOTION_RATE_LIMIT,
+    NOTION_RATE_BURST,
+    NOTION_MAX_RETRIES
+)
+from http_pool import get_notion_client
+from metrics import get_metrics
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Notion API 单次请求的子块数量上限和单个文本对象的长度上限
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_TEXT_LENGTH = 2000
+
+class TokenBucket:
+    """令牌桶限流器，多线程共享"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # 每秒补充的令牌数
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+# 所有Notion写入共享同一个限流器
+_rate_limiter = TokenBucket(NOTION_RATE_LIMIT, NOTION_RATE_BURST)
+
+class NotionPublisher:
+    """Notion发布层
+
+    - 所有请求经过共享令牌桶限流（约3次/秒）
+    - 429 响应按 Retry-After 头等待后重试，5xx 和网络错误按指数退避重试
+    - 超过100个的子块、超过100行的表格和超过2000字的段落自动拆分为多次追加
+    """
+
+    def __init__(self, notion=None):
+        self.notion = notion or get_notion_client()
+        self.limiter = _rate_limiter
+        self.max_retries = NOTION_MAX_RETRIES
+        self.retry_delay = 2
+        self.metrics = get_metrics()
+
+    def _retry_after(self, error):
+        """从429响应中读取Retry-After（秒）"""
+        headers = getattr(error, "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            return max(float(value), 0)
+        except (TypeError, ValueError):
+            return None
+
+    def call(self, func, *args, **kwargs):
+        """限流并重试地执行一次Notion API调用"""
+        for attempt in range(self.max_retries):
+            self.limiter.acquire()
+            try:
+                with self.metrics.attempt(attempt), self.metrics.timed("publish"):
+                    return func(*args, **kwargs)
+            except APIResponseError as e:
+                status = getattr(e, "status", None)
+                if attempt == self.max_retries - 1:
+                    raise e
+                if status == 429 or getattr(e, "code", None) == "rate_limited":
+                    wait_time = self._retry_after(e)
+                    if wait_time is None:
+                        wait_time = (2 ** attempt) * self.retry_delay
+                    logger.warning(f"Notion请求被限流，{wait_time}秒后重试")
+                elif status is not None and status < 500:
+                    # 其他4xx错误重试无意义
+                    raise e
+                else:
+                    wait_time = (2 ** attempt) * self.retry_delay
+                    logger.warning(f"Notion请求失败，{wait_time}秒后重试: {str(e)}")
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise e
+                wait_time = (2 ** attempt) * self.retry_delay
+                logger.warning(f"操作失败，{wait_time}秒后重试: {str(e)}")
+            time.sleep(wait_time)
+
+    def list_children(self, block_id):
+        """分页读取页面或块的全部子块"""
+        cursor = None
+        while True:
+            kwargs = {"block_id": block_id, "page_size": 100}
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = self.call(self.notion.blocks.children.list, **kwargs)
+            for block in response.get("results", []):
+                yield block
+            if not response.get("has_more"):
+                return
+            cursor = response.get("next_cursor")
+
+    def _split_paragraph(self, block):
+        """将超长段落拆分为多个不超过2000字的段落块"""
+        rich_text = block["paragraph"].get("rich_text", [])
+        text = "".join(item.get("text", {}).get("content", "") for item in rich_text)
+        if len(text) <= MAX_TEXT_LENGTH or any(item.get("text", {}).get("link") for item in rich_text):
+            return [block]
+        return [
+            {
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {
+                    "rich_text": [{"type": "text", "text": {"content": text[i:i + MAX_TEXT_LENGTH]}}]
+                }
+            }
+            for i in range(0, len(text), MAX_TEXT_LENGTH)
+        ]
+
+    def _prepare_blocks(self, blocks):
+        """拆分超长段落，并截出表格超过100行的部分
+
+        Returns:
+            list: (块, 需要在创建后追加到该表格的剩余行) 列表
+        """
+        prepared = []
+        for block in blocks:
+            if block.get("type") == "paragraph":
+                prepared.extend((item, []) for item in self._split_paragraph(block))
+            elif block.get("type") == "table":
+                rows = block["table"].get("children", [])
+                table = dict(block)
+                table["table"] = dict(block["table"], children=rows[:MAX_BLOCKS_PER_REQUEST])
+                prepared.append((table, rows[MAX_BLOCKS_PER_REQUEST:]))
+            else:
+                prepared.append((block, []))
+        return prepared
+
+    def append_blocks(self, parent_id, blocks):
+        """向页面或块追加子块，自动按100个一组分批，返回创建的块列表"""
+        return self._append_prepared(parent_id, self._prepare_blocks(blocks))
+
+    def _append_prepared(self, parent_id, prepared):
+        created = []
+        for i in range(0, len(prepared), MAX_BLOCKS_PER_REQUEST):
+            chunk = prepared[i:i + MAX_BLOCKS_PER_REQUEST]
+            response = self.call(
+                self.notion.blocks.children.append,
+                block_id=parent_id,
+                children=[block for block, _ in chunk]
+            )
+            results = response.get("results", [])
+            created.extend(results)
+            for (block, extra_rows), result in zip(chunk, results):
+                if extra_rows:
+                    self.append_rows(result["id"], extra_rows)
+        return created
+
+    def append_rows(self, table_id, rows):
+        """向表格追加行，自动按100行一组分批，返回创建的行块列表"""
+        created = []
+        for i in range(0, len(rows), MAX_BLOCKS_PER_REQUEST):
+            response = self.call(
+                self.notion.blocks.children.append,
+                block_id=table_id,
+                children=rows[i:i + MAX_BLOCKS_PER_REQUEST]
+            )
+            created.extend(response.get("results", []))
+        logger.info(f"已向表格追加 {len(rows)} 行")
+        return created
+
+    def create_page(self, parent_page_id, title, blocks):
+        """创建页面，超出单次请求限制的内容自动分批追加
+
+        页面创建请求携带尽可能多的内容块；遇到需要续传行的大表格时，
+        该表格及其后的块改为在页面创建后追加（追加接口会返回表格ID）。
+        """
+        prepared = self._prepare_blocks(blocks)
+        inline_count = 0
+        for block, extra_rows in prepared[:MAX_BLOCKS_PER_REQUEST]:
+            if extra_rows:
+                break
+            inline_count += 1
+
+        page = self.call(
+            self.notion.pages.create,
+            parent={"page_id": parent_page_id},
+            properties={
+                "title": {
+                    "title": [
+                        {
+                            "text": {
+                                "content": title
+                            }
+                        }
+                    ]
+                }
+            },
+            children=[block for block, _ in prepared[:inline_count]]
+        )
+
+        if inline_count < len(prepared):
+            self._append_prepared(page["id"], prepared[inline_count:])
+        return page
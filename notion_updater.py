@@ -1,20 +1,58 @@
 import logging
 import json
 import time
+import hashlib
 from datetime import datetime, timedelta
-from notion_client import Client
-from openai import OpenAI
 from config import (
     NOTION_API_KEY,
     NOTION_PARENT_PAGE_ID,
-    DEEPSEEK_API_KEY
+    DEEPSEEK_MODEL,
+    DAILY_PAGE_UPSERT,
+    NOTION_INDEX_PATH,
+    EVENT_STORE_ENABLED,
+    EVENT_STORE_PATH,
+    SUMMARY_COMPACT_PROMPT,
+    SUMMARY_FIELD_MAX_CHARS,
+    SUMMARY_EVENTS_TOKEN_BUDGET,
+    SUMMARY_MAP_REDUCE,
+    SUMMARY_MAP_REDUCE_THRESHOLD,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_PARTIAL_MAX_CHARS,
+    SUMMARY_MAX_WORKERS
 )
+from http_pool import get_deepseek_client, get_notion_client
+from response_cache import cached_chat_completion
+from notion_client import APIResponseError
+from notion_publisher import NotionPublisher
+from notion_index import NotionIndex
+from summary_prompt import (
+    DAILY_SUMMARY_COLUMNS,
+    EARNINGS_SUMMARY_COLUMNS,
+    MIN_FIELD_CHARS,
+    project_events,
+    estimate_tokens,
+    estimate_table_tokens,
+    chunk_events,
+    chunk_by_tokens
+)
+from fingerprint import event_fingerprint, normalize_time
+from event_model import Event, EarningsEvent, event_from_dict, events_to_json
+from analysis_parser import merge_sentiments
+from event_store import EventStore
+from metrics import get_metrics
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 每日事件表格前几列对应的事件字段，顺序与表头一致（最后一列信息来源带链接，不还原）
+DAILY_ROW_FIELDS = [
+    "time", "description", "type", "market_phase",
+    "market_impact", "industry_impact", "related_stocks", "sentiment"
+]
+
 class NotionError(Exception):
     """Notion API相关错误"""
     pass
@@ -23,19 +61,28 @@ class NotionUpdater:
     def __init__(self):
         self.notion_api_key = NOTION_API_KEY
         self.parent_page_id = NOTION_PARENT_PAGE_ID
-        self.notion = Client(auth=self.notion_api_key)
-        self.client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url="https://api.deepseek.com"
-        )
+        # Notion和DeepSeek客户端均复用共享连接池
+        self.notion = get_notion_client()
+        self.client = get_deepseek_client()
+        # 所有Notion写入经过发布层：限流、Retry-After 处理和自动分块
+        self.publisher = NotionPublisher(self.notion)
+        self.daily_upsert = DAILY_PAGE_UPSERT  # 当天页面已存在时增量更新
+        self.compact_summary_prompt = SUMMARY_COMPACT_PROMPT  # 总结提示词使用紧凑事件表格
+        self.map_reduce_summary = SUMMARY_MAP_REDUCE  # 事件较多时分组概括后再汇总
+        # 报告日期 → 页面ID、事件指纹 → 行块ID 的本地索引，写入前无需查询Notion
+        self.index = NotionIndex(NOTION_INDEX_PATH)
+        # 历史事件库（由收集流程写入），用于查询以往发布过的事件
+        self.store = EventStore(EVENT_STORE_PATH) if EVENT_STORE_ENABLED else None
         self.max_retries = 3
+        self.metrics = get_metrics()
         self.retry_delay = 2
         
     def _retry_with_exponential_backoff(self, func, *args, **kwargs):
         """使用指数退避的重试机制"""
         for attempt in range(self.max_retries):
             try:
-                return func(*args, **kwargs)
+                with self.metrics.attempt(attempt):
+                    return func(*args, **kwargs)
             except Exception as e:
                 if attempt == self.max_retries - 1:
                     raise e
@@ -109,7 +156,98 @@ class NotionUpdater:
         # 如果只有来源名称
         return [{"type": "text", "text": {"content": source_name}}]
     
-    def _generate_daily_summary(self, events):
+    def _format_summary_events(self, events, columns):
+        """生成总结提示词中的事件列表：默认为只含所需字段的紧凑表格，并记录节省的token数"""
+        if not self.compact_summary_prompt:
+            return f"事件列表：\n{events_to_json(events, indent=2)}"
+        
+        table, stats = project_events(events, columns, SUMMARY_FIELD_MAX_CHARS, SUMMARY_EVENTS_TOKEN_BUDGET)
+        saved_ratio = stats["saved_tokens"] / stats["baseline_tokens"] if stats["baseline_tokens"] else 0
+        logger.info(
+            f"总结提示词事件列表约 {stats['tokens']} tokens（完整JSON约 {stats['baseline_tokens']}），"
+            f"节省 {stats['saved_tokens']} tokens（{saved_ratio:.0%}），长文本截断到 {stats['field_max_chars']} 字"
+        )
+        return f"事件列表（每行一个事件，字段以|分隔，首行为列名）：\n{table}"
+
+    def _complete_summary(self, prompt, max_tokens):
+        """发送一次总结类请求（分组概括、要点合并），失败时按指数退避重试"""
+        def _request():
+            return cached_chat_completion(
+                self.client,
+                "summary",
+                model=DEEPSEEK_MODEL,
+                messages=[
+                    {"role": "system", "content": "你是一个专业的金融分析师，擅长提炼市场事件的要点。请只输出要点，简明扼要，严格控制字数。"},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=max_tokens
+            )
+        return self._retry_with_exponential_backoff(_request)
+
+    def _summarize_chunk(self, index, chunk, total, columns, subject):
+        """概括一组事件的要点（map），失败时退回到该组的高度压缩表格"""
+        prompt = f"""作为专业的金融分析师，请概括以下{subject}（第{index}/{total}组）的要点，供之后汇总为完整报告。
+
+{self._format_summary_events(chunk, columns)}
+
+请在{SUMMARY_PARTIAL_MAX_CHARS}字以内列出：主要事件及时间、重要数据或财报、市场情绪倾向、值得关注的个股和潜在风险。只输出要点，不要开场白。"""
+        try:
+            return self._complete_summary(prompt, SUMMARY_PARTIAL_MAX_CHARS * 2)
+        except Exception as e:
+            logger.warning(f"第 {index}/{total} 组事件概括失败，改用压缩后的事件表格: {str(e)}")
+            return project_events(chunk, columns, MIN_FIELD_CHARS, None)[0]
+
+    def _merge_partials(self, partials, subject):
+        """将相邻几组要点合并为一组（分层reduce的中间层）"""
+        joined = "\n\n".join(f"【第{i}组】\n{partial}" for i, partial in enumerate(partials, 1))
+        prompt = f"""请将以下{subject}的{len(partials)}组要点合并为一份要点摘要，保留最重要的事件、数据、情绪判断、个股和风险。
+
+{joined}
+
+请控制在{SUMMARY_PARTIAL_MAX_CHARS}字以内，只输出要点，不要开场白。"""
+        try:
+            return self._complete_summary(prompt, SUMMARY_PARTIAL_MAX_CHARS * 2)
+        except Exception as e:
+            logger.warning(f"合并要点失败，保留原要点: {str(e)}")
+            return joined
+
+    def _reduce_partials(self, partials, subject):
+        """各组要点合计仍超过阈值时，逐层合并相邻的组，直到能放入一次总结请求"""
+        while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > SUMMARY_MAP_REDUCE_THRESHOLD:
+            groups = chunk_by_tokens(partials, [estimate_tokens(p) for p in partials], SUMMARY_CHUNK_TOKENS)
+            if len(groups) == len(partials):
+                # 单组要点已接近分组上限时两两合并，保证每层都在缩减
+                groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+            logger.info(f"{len(partials)} 组要点仍超过阈值，合并为 {len(groups)} 组")
+            with ThreadPoolExecutor(max_workers=min(SUMMARY_MAX_WORKERS, len(groups))) as executor:
+                partials = list(executor.map(lambda group: self._merge_partials(group, subject), groups))
+        return partials
+
+    def _summary_events_text(self, events, columns, subject):
+        """总结提示词中的事件部分
+
+        事件表格估算token数超过阈值时，按原有顺序分组并行概括要点（map），
+        必要时逐层合并要点，最终报告基于各组要点生成（reduce）。
+        """
+        if not self.map_reduce_summary or len(events) < 2:
+            return self._format_summary_events(events, columns)
+        table_tokens = estimate_table_tokens(events, columns, SUMMARY_FIELD_MAX_CHARS)
+        if table_tokens <= SUMMARY_MAP_REDUCE_THRESHOLD:
+            return self._format_summary_events(events, columns)
+        
+        chunks = chunk_events(events, columns, SUMMARY_FIELD_MAX_CHARS, SUMMARY_CHUNK_TOKENS)
+        logger.info(f"{subject}的事件表格约 {table_tokens} tokens，超过阈值，分为 {len(chunks)} 组并行概括")
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_MAX_WORKERS, len(chunks))) as executor:
+            partials = list(executor.map(
+                lambda item: self._summarize_chunk(item[0], item[1], len(chunks), columns, subject),
+                enumerate(chunks, 1)
+            ))
+        partials = self._reduce_partials(partials, subject)
+        joined = "\n\n".join(f"【第{i}组】\n{partial}" for i, partial in enumerate(partials, 1))
+        return f"事件较多，以下是按顺序分组概括的要点（共 {len(partials)} 组，覆盖 {len(events)} 个事件）：\n\n{joined}"
+
+    def generate_daily_summary(self, events):
         """生成每日市场事件的总结分析"""
         try:
             if not events:
@@ -119,8 +257,7 @@ class NotionUpdater:
             summary_prompt = f"""作为专业的金融分析师，请对以下今日美股市场事件进行全面分析和总结。
 注意：总结内容必须控制在1500字以内。
 
-事件列表：
-{json.dumps(events, ensure_ascii=False, indent=2)}
+{self._summary_events_text(events, DAILY_SUMMARY_COLUMNS, '今日美股市场事件')}
 
 请提供以下分析：
 1. 当日市场主要事件概述（300字以内）
@@ -135,8 +272,10 @@ class NotionUpdater:
 
             # 调用 DeepSeek API 生成分析
             def _generate_summary():
-                response = self.client.chat.completions.create(
-                    model="deepseek-chat",
+                return cached_chat_completion(
+                    self.client,
+                    "summary",
+                    model=DEEPSEEK_MODEL,
                     messages=[
                         {"role": "system", "content": "你是一个专业的金融分析师，擅长总结和分析市场事件。请提供准确、专业、有见地的分析。注意控制输出长度，确保总字数不超过1500字。"},
                         {"role": "user", "content": summary_prompt}
@@ -144,7 +283,6 @@ class NotionUpdater:
                     temperature=0.3,
                     max_tokens=2000
                 )
-                return response.choices[0].message.content
             
             summary = self._retry_with_exponential_backoff(_generate_summary)
             
@@ -157,8 +295,286 @@ class NotionUpdater:
             logger.error(f"生成每日总结时出错: {str(e)}")
             return "生成每日总结时发生错误。"
 
-    def _create_daily_page(self, events):
-        """创建每日市场事件页面，包含总结和详细信息"""
+    def _daily_page_title(self, date_str):
+        """每日页面标题"""
+        return f"美股市场重点事件日报 {date_str}"
+
+    def _build_daily_header_row(self):
+        """每日事件表格的表头行"""
+        return {
+            "type": "table_row",
+            "table_row": {
+                "cells": [
+                    [{"type": "text", "text": {"content": "时间"}}],
+                    [{"type": "text", "text": {"content": "事件描述"}}],
+                    [{"type": "text", "text": {"content": "事件类型"}}],
+                    [{"type": "text", "text": {"content": "市场阶段"}}],
+                    [{"type": "text", "text": {"content": "市场影响"}}],
+                    [{"type": "text", "text": {"content": "行业影响"}}],
+                    [{"type": "text", "text": {"content": "相关个股"}}],
+                    [{"type": "text", "text": {"content": "市场情绪"}}],
+                    [{"type": "text", "text": {"content": "信息来源"}}]
+                ]
+            }
+        }
+
+    def _build_daily_row(self, event):
+        """构建单个事件的表格行，出错时返回None"""
+        try:
+            # 处理市场情绪显示
+            sentiment = event.get("sentiment", "neutral")
+            if isinstance(sentiment, list):
+                sentiment_text = merge_sentiments(sentiment)
+            else:
+                sentiment_text = sentiment
+            
+            # 创建单元格内容
+            cells = [
+                self._format_table_cell(event.get("time", "未指定时间")),
+                self._format_table_cell(event.get("description", "无描述")),
+                self._format_table_cell(event.get("type", "其他")),
+                self._format_table_cell(event.get("market_phase", "其他")),
+                self._format_table_cell(event.get("market_impact", "影响不确定")),
+                self._format_table_cell(event.get("industry_impact", "暂无行业影响分析")),
+                self._format_table_cell(event.get("related_stocks", "无相关个股")),
+                self._format_table_cell(sentiment_text),
+                self._format_source_cell(event)  # 使用专门的方法处理来源
+            ]
+            
+            return {
+                "type": "table_row",
+                "table_row": {"cells": cells}
+            }
+        except Exception as e:
+            logger.error(f"处理事件行时出错: {str(e)}")
+            return None
+
+    def _cell_signature(self, cells):
+        """提取单元格的文本和链接，用于比较行内容是否变化"""
+        signature = []
+        for cell in cells:
+            items = []
+            for item in cell:
+                text = item.get("text") or {}
+                content = text.get("content", item.get("plain_text", ""))
+                link = (text.get("link") or {}).get("url")
+                if content or link:
+                    items.append((content, link))
+            signature.append(tuple(items))
+        return tuple(signature)
+
+    def _signature_hash(self, cells):
+        """行内容签名的哈希，存入本地索引用于比较"""
+        payload = json.dumps(self._cell_signature(cells), ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _cell_text(self, cell):
+        """单元格纯文本"""
+        return "".join((item.get("text") or {}).get("content", item.get("plain_text", "")) for item in cell)
+
+    def _find_daily_page(self, date_str):
+        """在父页面下查找指定日期的每日页面，返回页面ID"""
+        title = self._daily_page_title(date_str)
+        for block in self.publisher.list_children(self.parent_page_id):
+            if block.get("type") == "child_page" and block["child_page"].get("title") == title:
+                return block["id"]
+        return None
+
+    def _load_daily_page_state(self, page_id, date_str):
+        """读取已有每日页面的总结块、表格和各事件行"""
+        state = {"summary_block_id": None, "table_id": None, "rows": {}}
+        previous_heading = None
+        for block in self.publisher.list_children(page_id):
+            block_type = block.get("type")
+            if block_type == "heading_1":
+                previous_heading = self._cell_text(block["heading_1"].get("rich_text", []))
+            elif block_type == "paragraph" and previous_heading == "市场总结" and not state["summary_block_id"]:
+                state["summary_block_id"] = block["id"]
+            elif block_type == "table" and not state["table_id"]:
+                state["table_id"] = block["id"]
+        
+        if state["table_id"]:
+            rows = list(self.publisher.list_children(state["table_id"]))
+            for row in rows[1:]:  # 跳过表头
+                cells = row.get("table_row", {}).get("cells", [])
+                if len(cells) < 2:
+                    continue
+                fingerprint = event_fingerprint(
+                    {"time": self._cell_text(cells[0]), "description": self._cell_text(cells[1])},
+                    date_str
+                )
+                state["rows"][fingerprint] = {
+                    "block_id": row["id"],
+                    "signature": self._signature_hash(cells)
+                }
+        return state
+
+    def _get_daily_page_state(self, date_str, refresh=False):
+        """获取每日页面状态：优先读取本地索引，索引缺失或要求刷新时从Notion同步
+
+        Returns:
+            dict: 包含page_id、summary_block_id、table_id和rows，页面不存在时返回None
+        """
+        entry = None if refresh else self.index.get_page(date_str, "daily")
+        if entry and entry["table_id"]:
+            return dict(entry, rows=self.index.get_rows(entry["page_id"]))
+        
+        # 刚创建的页面只记录了页面ID，无需再搜索父页面
+        page_id = entry["page_id"] if entry else self._find_daily_page(date_str)
+        if not page_id:
+            return None
+        
+        logger.info(f"从Notion同步每日页面索引: {date_str}")
+        state = self._load_daily_page_state(page_id, date_str)
+        state["page_id"] = page_id
+        self.index.replace_page(
+            date_str, "daily", page_id, state["table_id"], state["summary_block_id"], state["rows"]
+        )
+        return state
+
+    def _is_index_drift(self, error):
+        """判断Notion错误是否说明本地索引已过期（块被删除或归档）"""
+        if not isinstance(error, APIResponseError):
+            return False
+        status = getattr(error, "status", None)
+        code = getattr(error, "code", None)
+        return status == 404 or code == "object_not_found" or (status == 400 and "archived" in str(error))
+
+    def _upsert_daily_page(self, events, summary=None, rows=None):
+        """增量更新当天的每日页面：只追加新事件行、只修改内容变化的行
+        
+        当天页面不存在时创建新页面；页面上已有但本次未收集到的事件保持不变。
+        summary 和 rows 为预先生成的总结和表格行，未提供时在此生成。
+        """
+        try:
+            date_str = datetime.now().strftime("%Y-%m-%d")
+            try:
+                return self._apply_daily_upsert(events, date_str, False, summary, rows)
+            except APIResponseError as e:
+                if not self._is_index_drift(e):
+                    raise
+                # 页面或行在Notion中被删除/归档，丢弃本地索引后从Notion重新同步
+                logger.warning(f"本地索引与Notion不一致，重新同步后重试: {str(e)}")
+                self.index.delete_page(date_str, "daily")
+                return self._apply_daily_upsert(events, date_str, True, summary, rows)
+            
+        except Exception as e:
+            logger.error(f"增量更新每日页面时出错: {str(e)}")
+            raise NotionError(f"更新Notion页面失败: {str(e)}")
+
+    def _apply_daily_upsert(self, events, date_str, refresh, summary=None, rows=None):
+        """按页面状态执行一次增量更新，每次成功写入后同步更新本地索引"""
+        if rows is None:
+            rows = self.render_daily_rows(events)
+        state = self._get_daily_page_state(date_str, refresh=refresh)
+        if state is None or not state["table_id"]:
+            if state is not None:
+                logger.warning(f"每日页面缺少事件表格，重新创建: {date_str}")
+            page = self._create_daily_page(events, summary, rows)
+            # 行块ID在下次更新时从Notion同步
+            self.index.save_page(date_str, "daily", page["id"])
+            return page
+        
+        page_id = state["page_id"]
+        
+        # 按指纹去重，同一事件以最后一次为准
+        rows_by_fingerprint = {}
+        for event, row in rows:
+            rows_by_fingerprint[event_fingerprint(event, date_str)] = row
+        
+        new_fingerprints = []
+        changed = 0
+        for fingerprint, row in rows_by_fingerprint.items():
+            existing = state["rows"].get(fingerprint)
+            signature = self._signature_hash(row["table_row"]["cells"])
+            if existing is None:
+                new_fingerprints.append(fingerprint)
+            elif existing["signature"] != signature:
+                self.publisher.call(
+                    self.notion.blocks.update,
+                    block_id=existing["block_id"],
+                    table_row=row["table_row"]
+                )
+                self.index.save_rows(page_id, {fingerprint: {"block_id": existing["block_id"], "signature": signature}})
+                changed += 1
+        
+        if new_fingerprints:
+            created = self.publisher.append_rows(
+                state["table_id"], [rows_by_fingerprint[fingerprint] for fingerprint in new_fingerprints]
+            )
+            # 追加接口按顺序返回新建的行块
+            self.index.save_rows(page_id, {
+                fingerprint: {
+                    "block_id": block["id"],
+                    "signature": self._signature_hash(rows_by_fingerprint[fingerprint]["table_row"]["cells"])
+                }
+                for fingerprint, block in zip(new_fingerprints, created)
+            })
+        
+        # 有新增或变化的事件时刷新总结；页面上还有之前收集的事件时，
+        # 预先生成的总结只覆盖本次事件，需要按当天全部事件重新生成
+        if (new_fingerprints or changed) and state["summary_block_id"]:
+            earlier = [fingerprint for fingerprint in state["rows"] if fingerprint not in rows_by_fingerprint]
+            if earlier:
+                day_events = self._earlier_page_events(state, earlier, date_str) + [event for event, _ in rows]
+                day_events.sort(key=lambda event: normalize_time(event.get("time", "")))
+                logger.info(f"页面上已有 {len(earlier)} 个之前收集的事件，按当天全部 {len(day_events)} 个事件生成总结")
+                daily_summary = self.generate_daily_summary(day_events)
+            else:
+                daily_summary = summary if summary is not None else self.generate_daily_summary(events)
+            self.publisher.call(
+                self.notion.blocks.update,
+                block_id=state["summary_block_id"],
+                paragraph={"rich_text": [{"type": "text", "text": {"content": daily_summary}}]}
+            )
+        
+        unchanged = len(rows_by_fingerprint) - len(new_fingerprints) - changed
+        logger.info(
+            f"每日页面增量更新完成: {date_str}，新增 {len(new_fingerprints)} 行，"
+            f"修改 {changed} 行，未变化 {unchanged} 行"
+        )
+        return {"id": page_id}
+
+    def _earlier_page_events(self, state, fingerprints, date_str):
+        """读取页面上之前收集的事件，用于生成当天的完整总结
+
+        优先从历史事件库按指纹读取；库中没有的事件从Notion表格行还原（行中包含总结所需的全部列）。
+        """
+        events = []
+        missing = set()
+        for fingerprint in fingerprints:
+            event = self.store.get(fingerprint) if self.store is not None else None
+            if event is None:
+                missing.add(fingerprint)
+            else:
+                events.append(event)
+        if not missing:
+            return events
+
+        rows = list(self.publisher.list_children(state["table_id"]))
+        for row in rows[1:]:  # 跳过表头
+            cells = row.get("table_row", {}).get("cells", [])
+            if len(cells) < len(DAILY_ROW_FIELDS):
+                continue
+            event = Event(**{field: self._cell_text(cell) for field, cell in zip(DAILY_ROW_FIELDS, cells)})
+            if event_fingerprint(event, date_str) in missing:
+                events.append(event)
+        return events
+
+    def render_daily_rows(self, events):
+        """渲染每日事件表格行（不含表头），返回 [(事件, 行块)]，无法渲染的事件被跳过"""
+        rows = []
+        for event in events:
+            row = self._build_daily_row(event)
+            if row:
+                rows.append((event, row))
+        return rows
+
+    def _create_daily_page(self, events, summary=None, rows=None):
+        """创建每日市场事件页面，包含总结和详细信息
+        
+        summary 和 rows（render_daily_rows 的结果）为预先生成的总结和表格行，未提供时在此生成。
+        """
         try:
             # 获取当前日期
             today = datetime.now()
@@ -168,113 +584,56 @@ class NotionUpdater:
             logger.info(f"事件数量: {len(events)}")
             
             # 生成每日总结
-            logger.info("开始生成每日总结...")
-            daily_summary = self._generate_daily_summary(events)
-            logger.info("每日总结生成完成")
+            daily_summary = summary
+            if daily_summary is None:
+                logger.info("开始生成每日总结...")
+                daily_summary = self.generate_daily_summary(events)
+                logger.info("每日总结生成完成")
             
             # 准备表格行
-            table_rows = [
-                {
-                    "type": "table_row",
-                    "table_row": {
-                        "cells": [
-                            [{"type": "text", "text": {"content": "时间"}}],
-                            [{"type": "text", "text": {"content": "事件描述"}}],
-                            [{"type": "text", "text": {"content": "事件类型"}}],
-                            [{"type": "text", "text": {"content": "市场阶段"}}],
-                            [{"type": "text", "text": {"content": "市场影响"}}],
-                            [{"type": "text", "text": {"content": "行业影响"}}],
-                            [{"type": "text", "text": {"content": "相关个股"}}],
-                            [{"type": "text", "text": {"content": "市场情绪"}}],
-                            [{"type": "text", "text": {"content": "信息来源"}}]
-                        ]
-                    }
-                }
-            ]
-            
-            # 添加事件行
-            for event in events:
-                try:
-                    # 处理市场情绪显示
-                    sentiment = event.get("sentiment", "neutral")
-                    if isinstance(sentiment, list):
-                        sentiment_text = " | ".join(sentiment)
-                    else:
-                        sentiment_text = sentiment
-                    
-                    # 创建单元格内容
-                    cells = [
-                        self._format_table_cell(event.get("time", "未指定时间")),
-                        self._format_table_cell(event.get("description", "无描述")),
-                        self._format_table_cell(event.get("type", "其他")),
-                        self._format_table_cell(event.get("market_phase", "其他")),
-                        self._format_table_cell(event.get("market_impact", "影响不确定")),
-                        self._format_table_cell(event.get("industry_impact", "暂无行业影响分析")),
-                        self._format_table_cell(event.get("related_stocks", "无相关个股")),
-                        self._format_table_cell(sentiment_text),
-                        self._format_source_cell(event)  # 使用专门的方法处理来源
-                    ]
-                    
-                    table_rows.append({
-                        "type": "table_row",
-                        "table_row": {"cells": cells}
-                    })
-                except Exception as e:
-                    logger.error(f"处理事件行时出错: {str(e)}")
-                    continue
+            if rows is None:
+                rows = self.render_daily_rows(events)
+            table_rows = [self._build_daily_header_row()] + [row for _, row in rows]
             
             # 创建新的页面
             logger.info("开始创建 Notion 页面...")
-            def _create_page():
-                return self.notion.pages.create(
-                    parent={"page_id": self.parent_page_id},
-                    properties={
-                        "title": {
-                            "title": [
-                                {
-                                    "text": {
-                                        "content": f"美股市场重点事件日报 {date_str}"
-                                    }
-                                }
-                            ]
+            new_page = self.publisher.create_page(
+                self.parent_page_id,
+                self._daily_page_title(date_str),
+                [
+                    {
+                        "object": "block",
+                        "type": "heading_1",
+                        "heading_1": {
+                            "rich_text": [{"type": "text", "text": {"content": "市场总结"}}]
                         }
                     },
-                    children=[
-                        {
-                            "object": "block",
-                            "type": "heading_1",
-                            "heading_1": {
-                                "rich_text": [{"type": "text", "text": {"content": "市场总结"}}]
-                            }
-                        },
-                        {
-                            "object": "block",
-                            "type": "paragraph",
-                            "paragraph": {
-                                "rich_text": [{"type": "text", "text": {"content": daily_summary}}]
-                            }
-                        },
-                        {
-                            "object": "block",
-                            "type": "heading_1",
-                            "heading_1": {
-                                "rich_text": [{"type": "text", "text": {"content": "详细事件"}}]
-                            }
-                        },
-                        {
-                            "object": "block",
-                            "type": "table",
-                            "table": {
-                                "table_width": 9,
-                                "has_column_header": True,
-                                "has_row_header": False,
-                                "children": table_rows
-                            }
+                    {
+                        "object": "block",
+                        "type": "paragraph",
+                        "paragraph": {
+                            "rich_text": [{"type": "text", "text": {"content": daily_summary}}]
                         }
-                    ]
-                )
-            
-            new_page = self._retry_with_exponential_backoff(_create_page)
+                    },
+                    {
+                        "object": "block",
+                        "type": "heading_1",
+                        "heading_1": {
+                            "rich_text": [{"type": "text", "text": {"content": "详细事件"}}]
+                        }
+                    },
+                    {
+                        "object": "block",
+                        "type": "table",
+                        "table": {
+                            "table_width": 9,
+                            "has_column_header": True,
+                            "has_row_header": False,
+                            "children": table_rows
+                        }
+                    }
+                ]
+            )
             
             logger.info(f"每日页面创建完成: {date_str}")
             logger.info(f"成功创建每日页面，包含 {len(events)} 个事件")
@@ -284,6 +643,22 @@ class NotionUpdater:
             logger.error(f"创建每日页面时出错: {str(e)}")
             raise NotionError(f"创建Notion页面失败: {str(e)}")
 
+    def publish_daily_page(self, events, summary=None, rows=None):
+        """发布每日页面（按配置增量更新或新建），可传入预先生成的总结和表格行"""
+        if self.daily_upsert:
+            return self._upsert_daily_page(events, summary, rows)
+        return self._create_daily_page(events, summary, rows)
+
+    def publish_earnings_page(self, events, summary=None, rows=None):
+        """发布财报页面，可传入预先生成的总结和表格行"""
+        return self._create_earnings_page(events, summary, rows)
+
+    def query_history(self, **filters):
+        """查询历史事件库，参数见 EventStore.query；未启用历史事件库时返回空列表"""
+        if self.store is None:
+            return []
+        return self.store.query(**filters)
+
     def update_notion_with_events(self, events):
         """更新Notion，创建每日报告和财报报告"""
         try:
@@ -291,25 +666,32 @@ class NotionUpdater:
                 logger.info("没有事件需要更新")
                 return 0
             
-            # 分离每日事件和财报事件
-            daily_events = [e for e in events if not e.get("is_earnings", False)]
-            earnings_events = [e for e in events if e.get("is_earnings", False)]
+            # 统一为事件对象（字段名规范化），并分离每日事件和财报事件
+            events = [event_from_dict(e) for e in events]
+            daily_events = [e for e in events if not isinstance(e, EarningsEvent)]
+            earnings_events = [e for e in events if isinstance(e, EarningsEvent)]
             
-            total_count = 0
-            
-            # 创建每日事件页面
+            # 每日页面和财报页面互不依赖，并行发布
+            jobs = []
             if daily_events:
                 logger.info(f"创建每日事件页面，包含 {len(daily_events)} 个事件")
-                daily_page = self._create_daily_page(daily_events)
-                if daily_page:
-                    total_count += len(daily_events)
-            
-            # 创建财报事件页面
+                jobs.append((self.publish_daily_page, daily_events))
             if earnings_events:
                 logger.info(f"创建财报事件页面，包含 {len(earnings_events)} 个事件")
-                earnings_page = self._create_earnings_page(earnings_events)
-                if earnings_page:
-                    total_count += len(earnings_events)
+                jobs.append((self.publish_earnings_page, earnings_events))
+            
+            total_count = 0
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                futures = [(executor.submit(func, page_events), page_events) for func, page_events in jobs]
+                for future, page_events in futures:
+                    try:
+                        if future.result():
+                            total_count += len(page_events)
+                    except NotionError as e:
+                        logger.error(f"更新 Notion 时出错: {str(e)}")
+                    except Exception as e:
+                        # 一个页面失败不影响另一个页面已完成的发布计数
+                        logger.error(f"发布页面时出现未预期的错误: {str(e)}")
             
             logger.info(f"成功创建页面，总共包含 {total_count} 个事件")
             return total_count
@@ -321,8 +703,62 @@ class NotionUpdater:
             logger.error(f"未预期的错误: {str(e)}")
             return 0
             
-    def _create_earnings_page(self, events):
-        """创建财报事件页面"""
+    def _build_earnings_header_row(self):
+        """财报事件表格的表头行"""
+        return {
+            "type": "table_row",
+            "table_row": {
+                "cells": [
+                    [{"type": "text", "text": {"content": "发布日期"}}],
+                    [{"type": "text", "text": {"content": "发布时间"}}],
+                    [{"type": "text", "text": {"content": "公司名称"}}],
+                    [{"type": "text", "text": {"content": "股票代码"}}],
+                    [{"type": "text", "text": {"content": "EPS预期"}}],
+                    [{"type": "text", "text": {"content": "营收预期"}}],
+                    [{"type": "text", "text": {"content": "上季表现"}}],
+                    [{"type": "text", "text": {"content": "关注重点"}}],
+                    [{"type": "text", "text": {"content": "市场影响"}}]
+                ]
+            }
+        }
+
+    def render_earnings_rows(self, events):
+        """渲染财报事件表格行（不含表头），按发布日期和时间排序"""
+        rows = []
+        # 添加事件行
+        for event in sorted(events, key=lambda x: (x.get("report_date", ""), x.get("time", ""))):
+            try:
+                # 提取公司信息
+                description = event.get("description", "")
+                company_info = self._extract_company_info(event)
+
+                # 创建单元格内容
+                cells = [
+                    self._format_table_cell(event.get("report_date", "未指定日期")),
+                    self._format_table_cell(event.get("earnings_time", "未指定时间")),
+                    self._format_table_cell(company_info.get("company_name", "未知公司")),
+                    self._format_table_cell(company_info.get("stock_code", "未知代码")),
+                    self._format_table_cell(event.get("eps_forecast", "未知")),
+                    self._format_table_cell(event.get("revenue_forecast", "未知")),
+                    self._format_table_cell(event.get("last_quarter", "未知")),
+                    self._format_table_cell(event.get("focus_points", "无")),
+                    self._format_table_cell(event.get("market_impact", "影响不确定"))
+                ]
+
+                rows.append({
+                    "type": "table_row",
+                    "table_row": {"cells": cells}
+                })
+            except Exception as e:
+                logger.error(f"处理财报事件行时出错: {str(e)}")
+                continue
+        return rows
+
+    def _create_earnings_page(self, events, summary=None, rows=None):
+        """创建财报事件页面
+        
+        summary 和 rows（render_earnings_rows 的结果）为预先生成的总结和表格行，未提供时在此生成。
+        """
         try:
             # 获取日期范围
             dates = sorted(set(event.get("report_date") for event in events if event.get("report_date")))
@@ -340,110 +776,56 @@ class NotionUpdater:
             logger.info(f"事件数量: {len(events)}")
             
             # 生成财报总结
-            logger.info("开始生成财报总结...")
-            earnings_summary = self._generate_earnings_summary(events)
-            logger.info("财报总结生成完成")
+            earnings_summary = summary
+            if earnings_summary is None:
+                logger.info("开始生成财报总结...")
+                earnings_summary = self.generate_earnings_summary(events)
+                logger.info("财报总结生成完成")
             
             # 准备表格行
-            table_rows = [
-                {
-                    "type": "table_row",
-                    "table_row": {
-                        "cells": [
-                            [{"type": "text", "text": {"content": "发布日期"}}],
-                            [{"type": "text", "text": {"content": "发布时间"}}],
-                            [{"type": "text", "text": {"content": "公司名称"}}],
-                            [{"type": "text", "text": {"content": "股票代码"}}],
-                            [{"type": "text", "text": {"content": "EPS预期"}}],
-                            [{"type": "text", "text": {"content": "营收预期"}}],
-                            [{"type": "text", "text": {"content": "上季表现"}}],
-                            [{"type": "text", "text": {"content": "关注重点"}}],
-                            [{"type": "text", "text": {"content": "市场影响"}}]
-                        ]
-                    }
-                }
-            ]
-            
-            # 添加事件行
-            for event in sorted(events, key=lambda x: (x.get("report_date", ""), x.get("time", ""))):
-                try:
-                    # 提取公司信息
-                    description = event.get("description", "")
-                    company_info = self._extract_company_info(event)
-                    
-                    # 创建单元格内容
-                    cells = [
-                        self._format_table_cell(event.get("report_date", "未指定日期")),
-                        self._format_table_cell(event.get("earnings_time", "未指定时间")),
-                        self._format_table_cell(company_info.get("company_name", "未知公司")),
-                        self._format_table_cell(company_info.get("stock_code", "未知代码")),
-                        self._format_table_cell(event.get("eps_forecast", "未知")),
-                        self._format_table_cell(event.get("revenue_forecast", "未知")),
-                        self._format_table_cell(event.get("last_quarter", "未知")),
-                        self._format_table_cell(event.get("focus_points", "无")),
-                        self._format_table_cell(event.get("market_impact", "影响不确定"))
-                    ]
-                    
-                    table_rows.append({
-                        "type": "table_row",
-                        "table_row": {"cells": cells}
-                    })
-                except Exception as e:
-                    logger.error(f"处理财报事件行时出错: {str(e)}")
-                    continue
+            if rows is None:
+                rows = self.render_earnings_rows(events)
+            table_rows = [self._build_earnings_header_row()] + rows
             
             # 创建新的页面
             logger.info("开始创建 Notion 页面...")
-            def _create_page():
-                return self.notion.pages.create(
-                    parent={"page_id": self.parent_page_id},
-                    properties={
-                        "title": {
-                            "title": [
-                                {
-                                    "text": {
-                                        "content": f"美股重点财报时间 {date_range}"
-                                    }
-                                }
-                            ]
+            new_page = self.publisher.create_page(
+                self.parent_page_id,
+                f"美股重点财报时间 {date_range}",
+                [
+                    {
+                        "object": "block",
+                        "type": "heading_1",
+                        "heading_1": {
+                            "rich_text": [{"type": "text", "text": {"content": "财报概览"}}]
                         }
                     },
-                    children=[
-                        {
-                            "object": "block",
-                            "type": "heading_1",
-                            "heading_1": {
-                                "rich_text": [{"type": "text", "text": {"content": "财报概览"}}]
-                            }
-                        },
-                        {
-                            "object": "block",
-                            "type": "paragraph",
-                            "paragraph": {
-                                "rich_text": [{"type": "text", "text": {"content": earnings_summary}}]
-                            }
-                        },
-                        {
-                            "object": "block",
-                            "type": "heading_1",
-                            "heading_1": {
-                                "rich_text": [{"type": "text", "text": {"content": "详细财报信息"}}]
-                            }
-                        },
-                        {
-                            "object": "block",
-                            "type": "table",
-                            "table": {
-                                "table_width": 9,
-                                "has_column_header": True,
-                                "has_row_header": False,
-                                "children": table_rows
-                            }
+                    {
+                        "object": "block",
+                        "type": "paragraph",
+                        "paragraph": {
+                            "rich_text": [{"type": "text", "text": {"content": earnings_summary}}]
                         }
-                    ]
-                )
-            
-            new_page = self._retry_with_exponential_backoff(_create_page)
+                    },
+                    {
+                        "object": "block",
+                        "type": "heading_1",
+                        "heading_1": {
+                            "rich_text": [{"type": "text", "text": {"content": "详细财报信息"}}]
+                        }
+                    },
+                    {
+                        "object": "block",
+                        "type": "table",
+                        "table": {
+                            "table_width": 9,
+                            "has_column_header": True,
+                            "has_row_header": False,
+                            "children": table_rows
+                        }
+                    }
+                ]
+            )
             
             logger.info(f"财报页面创建完成: {date_range}")
             logger.info(f"成功创建财报页面，包含 {len(events)} 个事件")
@@ -453,7 +835,7 @@ class NotionUpdater:
             logger.error(f"创建财报页面时出错: {str(e)}")
             raise NotionError(f"创建Notion财报页面失败: {str(e)}")
             
-    def _generate_earnings_summary(self, events):
+    def generate_earnings_summary(self, events):
         """生成财报事件的总结分析"""
         try:
             if not events:
@@ -463,8 +845,7 @@ class NotionUpdater:
             summary_prompt = f"""作为专业的金融分析师，请对以下财报事件进行全面分析和总结。
 注意：总结内容必须控制在1500字以内。
 
-事件列表：
-{json.dumps(events, ensure_ascii=False, indent=2)}
+{self._summary_events_text(events, EARNINGS_SUMMARY_COLUMNS, '财报事件')}
 
 请提供以下分析：
 1. 本期财报概览（300字以内）
@@ -478,8 +859,10 @@ class NotionUpdater:
 
             # 调用 DeepSeek API 生成分析
             def _generate_summary():
-                response = self.client.chat.completions.create(
-                    model="deepseek-chat",
+                return cached_chat_completion(
+                    self.client,
+                    "summary",
+                    model=DEEPSEEK_MODEL,
                     messages=[
                         {"role": "system", "content": "你是一个专业的金融分析师，擅长分析财报事件。请提供准确、专业、有见地的分析。注意控制输出长度，确保总字数不超过1500字。"},
                         {"role": "user", "content": summary_prompt}
@@ -487,7 +870,6 @@ class NotionUpdater:
                     temperature=0.3,
                     max_tokens=2000
                 )
-                return response.choices[0].message.content
             
             summary = self._retry_with_exponential_backoff(_generate_summary)
             
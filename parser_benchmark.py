@@ -0,0 +1,267 @@
+import re
+import time
+import random
+import argparse
+import statistics
+from analysis_parser import parse_batch_analysis, parse_sections, normalize_confidence, normalize_sentiment, infer_sentiment, first_line
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+IMPACTS = [
+    "短期内可能带动相关板块波动，整体影响有限",
+    "数据好于预期，利好风险资产，指数可能上涨",
+    "政策收紧预期升温，利空成长股，科技板块或承压下跌",
+    "市场已充分定价，预计影响中性"
+]
+SOURCES = [
+    "Reuters https://www.reuters.com/markets/us/",
+    "Bloomberg [https://www.bloomberg.com/markets]",
+    "美国劳工统计局（https://www.bls.gov/cpi/）",
+    "CNBC"
+]
+
+def build_batch_response(count, seed=1):
+    """生成包含count个事件的批量分析响应，混合模型常见的格式变体"""
+    rng = random.Random(seed)
+    parts = []
+    for index in range(1, count + 1):
+        bold = rng.random() < 0.3
+        header = f"**事件{index}分析：**" if bold else f"事件{index}分析:"
+        label = (lambda name: f"**{name}**：") if bold else (lambda name: f"{name}: ")
+        parts.append(
+            f"{header}\n"
+            f"1. {label('市场影响')}{rng.choice(IMPACTS)}\n"
+            f"2. {label('行业影响')}相关行业龙头公司可能出现较大波动，"
+            f"其中半导体和软件板块弹性最大\n"
+            f"3. {label('相关个股')}AAPL, MSFT, NVDA\n"
+            f"4. {label('确信度')}{rng.choice(['high', 'medium', 'low', '中等', '较高'])}\n"
+            f"5. {label('市场情绪')}{rng.choice(['bullish', 'bearish', 'neutral', '利好', '利空'])}\n"
+            f"6. {label('信息来源')}{rng.choice(SOURCES)}\n"
+        )
+    return "\n".join(parts)
+
+def build_event_analysis(seed=1):
+    """生成单个事件的深度分析响应"""
+    rng = random.Random(seed)
+    return (
+        f"1. 整体美股市场影响：{rng.choice(IMPACTS)}\n"
+        f"2. 行业板块影响：半导体和软件板块弹性最大\n"
+        f"3. 相关个股影响：**AAPL**, \"MSFT\", NVDA\n"
+        f"4. 分析确信度：{rng.choice(['high', 'medium', 'low'])}\n"
+        f"5. 市场情绪：{rng.choice(['利好/bullish', '利空/bearish', '中性/neutral'])}\n"
+    )
+
+def legacy_parse_batch(analysis_text, count):
+    """原 _batch_enhance_events 的解析逻辑，从引入 analysis_parser 之前的 data_collector.py 原样复制
+
+    只把对 batch 的遍历换成 count 个空事件，返回各事件被写入的字段（未找到该事件的分析时为空字典）。
+    原实现只识别半角冒号的 "事件N分析:" 标题，不解析 "6. 信息来源"。
+    """
+    results = []
+    # 解析批量分析结果
+    import re
+    for idx in range(count):
+        event = {}
+        event_pattern = rf"事件{idx+1}分析:(.*?)(?=事件{idx+2}分析:|$)"
+        event_analysis = re.search(event_pattern, analysis_text, re.DOTALL)
+        
+        if event_analysis:
+            analysis = event_analysis.group(1).strip()
+            
+            # 提取各部分分析
+            market_impact = re.search(r'1\.\s*市场影响:?(.*?)(?=\n2\.\s*|$)', analysis, re.DOTALL)
+            sector_impact = re.search(r'2\.\s*行业影响:?(.*?)(?=\n3\.\s*|$)', analysis, re.DOTALL)
+            stocks_affected = re.search(r'3\.\s*相关个股:?(.*?)(?=\n4\.\s*|$)', analysis, re.DOTALL)
+            confidence = re.search(r'4\.\s*确信度:?(.*?)(?=\n5\.\s*|$)', analysis, re.DOTALL)
+            sentiment = re.search(r'5\.\s*市场情绪:?(.*?)(?=\n|$)', analysis, re.DOTALL)
+            
+            # 更新事件信息
+            if market_impact:
+                event["market_impact"] = market_impact.group(1).strip()
+            if sector_impact:
+                event["sector_impact"] = sector_impact.group(1).strip()
+            if stocks_affected:
+                event["stocks_affected"] = stocks_affected.group(1).strip()
+            if confidence:
+                conf_text = confidence.group(1).strip().lower()
+                if "high" in conf_text or "高" in conf_text:
+                    event["confidence_level"] = "high"
+                elif "medium" in conf_text or "中" in conf_text:
+                    event["confidence_level"] = "medium"
+                else:
+                    event["confidence_level"] = "low"
+            else:
+                event["confidence_level"] = "medium"
+                
+            # 添加市场情绪判断
+            if sentiment:
+                sentiment_text = sentiment.group(1).strip().lower()
+                if "bullish" in sentiment_text or "利好" in sentiment_text or "正面" in sentiment_text:
+                    event["sentiment"] = "bullish"
+                elif "bearish" in sentiment_text or "利空" in sentiment_text or "负面" in sentiment_text:
+                    event["sentiment"] = "bearish"
+                elif "neutral" in sentiment_text or "中性" in sentiment_text:
+                    event["sentiment"] = "neutral"
+                else:
+                    event["sentiment"] = "unknown"
+            else:
+                event["sentiment"] = "unknown"
+        
+        results.append(event)
+
+    return results
+
+def legacy_fields(result):
+    """将新解析器的批量结果换成原实现写入的字段名，用于比较两者共同解析的事件"""
+    if not result:
+        return {}
+    fields = {
+        "market_impact": result["market_impact"],
+        "confidence_level": result["confidence_level"],
+        "sentiment": result["sentiment"]
+    }
+    if "industry_impact" in result:
+        fields["sector_impact"] = result["industry_impact"]
+    if "related_stocks" in result:
+        fields["stocks_affected"] = result["related_stocks"]
+    return fields
+
+def legacy_parse_event_analysis(analysis_text):
+    """原 _enhance_event_analysis 的解析逻辑，从改用 analysis_parser 之前的 data_collector.py 原样复制"""
+    event = {}
+    # 提取各部分分析，使用更精确的正则表达式
+    import re
+    market_impact = re.search(r'1\.\s*(?:整体美股市场.*?影响|.*?市场影响)[：:](.*?)(?=\n\s*2\.\s*|$)', analysis_text, re.DOTALL)
+    sector_impact = re.search(r'2\.\s*(?:行业板块.*?影响|.*?行业影响)[：:](.*?)(?=\n\s*3\.\s*|$)', analysis_text, re.DOTALL)
+    stocks_affected = re.search(r'3\.\s*(?:相关个股.*?影响|.*?个股影响)[：:](.*?)(?=\n\s*4\.\s*|$)', analysis_text, re.DOTALL)
+    confidence = re.search(r'4\.\s*(?:确信度|.*?确信度)[：:](.*?)(?=\n\s*5\.\s*|$)', analysis_text, re.DOTALL)
+    sentiment = re.search(r'5\.\s*(?:市场情绪|.*?情绪)[：:](.*?)(?=\n|$)', analysis_text, re.DOTALL)
+
+    # 更新事件信息
+    if market_impact:
+        event["market_impact"] = market_impact.group(1).strip()
+    if sector_impact:
+        event["sector_impact"] = sector_impact.group(1).strip()
+    if stocks_affected:
+        # 确保stocks_affected是字符串格式
+        stocks_text = stocks_affected.group(1).strip()
+        # 清理格式，确保是简单的文本列表
+        stocks_text = re.sub(r'\*\*|\{|\}|"', '', stocks_text)
+        event["stocks_affected"] = stocks_text
+    if confidence:
+        conf_text = confidence.group(1).strip().lower()
+        if "high" in conf_text or "高" in conf_text:
+            event["confidence_level"] = "high"
+        elif "medium" in conf_text or "中" in conf_text:
+            event["confidence_level"] = "medium"
+        else:
+            event["confidence_level"] = "low"
+    else:
+        event["confidence_level"] = "medium"
+
+    # 添加市场情绪判断
+    if sentiment:
+        sentiment_text = sentiment.group(1).strip().lower()
+        if "bullish" in sentiment_text or "利好" in sentiment_text or "正面" in sentiment_text:
+            event["sentiment"] = "bullish"
+        elif "bearish" in sentiment_text or "利空" in sentiment_text or "负面" in sentiment_text:
+            event["sentiment"] = "bearish"
+        elif "neutral" in sentiment_text or "中性" in sentiment_text:
+            event["sentiment"] = "neutral"
+        else:
+            event["sentiment"] = "unknown"
+    else:
+        # 如果没有明确的情绪判断，尝试从市场影响分析中推断
+        if market_impact:
+            impact_text = market_impact.group(1).strip().lower()
+            if "利好" in impact_text or "正面" in impact_text or "积极" in impact_text or "上涨" in impact_text:
+                event["sentiment"] = "bullish"
+            elif "利空" in impact_text or "负面" in impact_text or "消极" in impact_text or "下跌" in impact_text:
+                event["sentiment"] = "bearish"
+            elif "中性" in impact_text or "有限" in impact_text or "轻微" in impact_text:
+                event["sentiment"] = "neutral"
+            else:
+                event["sentiment"] = "unknown"
+        else:
+            event["sentiment"] = "unknown"
+
+    return event
+
+def parse_event_analysis(analysis_text):
+    """新解析器下 _enhance_event_analysis 的字段映射"""
+    event = {}
+    sections = parse_sections(analysis_text)
+    if 1 in sections:
+        event["market_impact"] = sections[1]
+    if 2 in sections:
+        event["sector_impact"] = sections[2]
+    if 3 in sections:
+        event["stocks_affected"] = re.sub(r'\*\*|\{|\}|"', '', sections[3])
+    event["confidence_level"] = normalize_confidence(sections[4]) if 4 in sections else "medium"
+    if 5 in sections:
+        event["sentiment"] = normalize_sentiment(first_line(sections[5]))
+    elif 1 in sections:
+        event["sentiment"] = infer_sentiment(sections[1])
+    else:
+        event["sentiment"] = "unknown"
+    return event
+
+def measure(func, repeat, min_seconds=0.2):
+    """多轮计时，每轮至少运行min_seconds，返回单次调用耗时的中位数（秒）"""
+    loops, elapsed = 1, 0.0
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        loops *= 2
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return statistics.median(samples)
+
+def compare(label, legacy, current, repeat):
+    legacy_seconds = measure(legacy, repeat)
+    current_seconds = measure(current, repeat)
+    print(
+        f"{label:<28} 原实现 {legacy_seconds * 1000:9.3f}ms  新实现 {current_seconds * 1000:9.3f}ms  "
+        f"加速 {legacy_seconds / current_seconds:6.1f}x"
+    )
+    return legacy(), current()
+
+def main():
+    parser = argparse.ArgumentParser(description='编号分析解析器与原正则实现的微基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='批量分析响应中的事件数')
+    parser.add_argument('--repeat', type=int, default=5, help='计时轮数')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        text = build_batch_response(size, args.seed)
+        legacy_result, current_result = compare(
+            f"批量分析 {size} 个事件（{len(text)} 字符）",
+            lambda: legacy_parse_batch(text, size),
+            lambda: parse_batch_analysis(text, size),
+            args.repeat
+        )
+        # 原实现能解析的事件，两者结果应完全相同；原实现不支持全角冒号的标题，这部分只有新实现能解析
+        agreement = all(old == legacy_fields(new) for old, new in zip(legacy_result, current_result) if old)
+        print(
+            f"{'':<28} 解析成功: 原实现 {sum(1 for item in legacy_result if item)}/{size}，"
+            f"新实现 {sum(1 for item in current_result if item)}/{size}，"
+            f"共同解析的结果{'一致' if agreement else '不一致'}"
+        )
+
+    text = build_event_analysis(args.seed)
+    legacy_result, current_result = compare(
+        "单事件深度分析", lambda: legacy_parse_event_analysis(text), lambda: parse_event_analysis(text), args.repeat
+    )
+    print(f"{'':<28} 结果{'一致' if legacy_result == current_result else '不一致'}")
+
+if __name__ == "__main__":
+    main()
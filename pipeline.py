@@ -0,0 +1,130 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class Stage:
+    """流水线中的一个阶段"""
+
+    def __init__(self, name, func, deps):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.status = "pending"  # pending/running/done/failed/skipped
+        self.result = None
+        self.error = None
+        self.started_at = None  # 相对流水线开始的秒数
+        self.finished_at = None
+
+    @property
+    def duration(self):
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+class Pipeline:
+    """按依赖关系并发执行的阶段图（DAG）
+
+    每个阶段的函数以其依赖阶段的结果（按声明顺序）作为参数；依赖全部完成的阶段立即提交执行，
+    互不依赖的阶段并发运行。某个阶段失败时，依赖它的阶段被跳过，其余分支继续执行。
+    运行结束后给出关键路径：从最后完成的阶段出发，沿着最晚完成的依赖回溯得到的阶段链，
+    它决定了整次运行的耗时。
+    """
+
+    def __init__(self, name, max_workers=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.stages = {}
+        self.wall_seconds = 0.0
+
+    def add(self, name, func, deps=()):
+        """添加阶段，依赖必须是已添加的阶段（保证无环）"""
+        if name in self.stages:
+            raise ValueError(f"阶段已存在: {name}")
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"阶段 {name} 的依赖不存在: {', '.join(missing)}")
+        self.stages[name] = Stage(name, func, deps)
+        return self
+
+    def _run_stage(self, stage, start):
+        stage.started_at = time.perf_counter() - start
+        try:
+            return stage.func(*(self.stages[dep].result for dep in stage.deps))
+        finally:
+            stage.finished_at = time.perf_counter() - start
+
+    def _skip_dependents(self, failed):
+        for stage in self.stages.values():
+            if stage.status == "pending" and failed in stage.deps:
+                stage.status = "skipped"
+                logger.warning(f"阶段 {stage.name} 因依赖 {failed} 失败而跳过")
+                self._skip_dependents(stage.name)
+
+    def run(self):
+        """执行全部阶段，返回 {阶段名: 结果}（失败或跳过的阶段结果为None）"""
+        start = time.perf_counter()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(len(self.stages), 1)) as executor:
+            while True:
+                for stage in self.stages.values():
+                    if stage.status == "pending" and all(self.stages[dep].status == "done" for dep in stage.deps):
+                        stage.status = "running"
+                        running[executor.submit(self._run_stage, stage, start)] = stage
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        stage.result = future.result()
+                        stage.status = "done"
+                    except Exception as e:
+                        stage.error = e
+                        stage.status = "failed"
+                        logger.error(f"阶段 {stage.name} 失败: {str(e)}")
+                        self._skip_dependents(stage.name)
+        self.wall_seconds = time.perf_counter() - start
+        return {name: stage.result for name, stage in self.stages.items()}
+
+    def critical_path(self):
+        """返回关键路径上的阶段列表（按执行顺序）"""
+        finished = [stage for stage in self.stages.values() if stage.finished_at is not None]
+        if not finished:
+            return []
+        stage = max(finished, key=lambda item: item.finished_at)
+        path = [stage]
+        while stage.deps:
+            stage = max((self.stages[dep] for dep in stage.deps), key=lambda item: item.finished_at or 0)
+            path.append(stage)
+        return list(reversed(path))
+
+    def report(self):
+        """记录各阶段耗时和关键路径，并返回报告"""
+        path = self.critical_path()
+        busy_seconds = sum(stage.duration for stage in self.stages.values())
+        report = {
+            "pipeline": self.name,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "stage_seconds": round(busy_seconds, 3),
+            "stages": {
+                name: {
+                    "status": stage.status,
+                    "started_at": round(stage.started_at or 0, 3),
+                    "seconds": round(stage.duration, 3)
+                }
+                for name, stage in self.stages.items()
+            },
+            "critical_path": [stage.name for stage in path]
+        }
+
+        logger.info(f"流水线 {self.name} 完成，总耗时 {self.wall_seconds:.2f}s，各阶段耗时合计 {busy_seconds:.2f}s")
+        for name, stage in self.stages.items():
+            logger.info(f"  {name}: {stage.status}，开始于 {stage.started_at or 0:.2f}s，耗时 {stage.duration:.2f}s")
+        if path:
+            chain = " → ".join(f"{stage.name}({stage.duration:.2f}s)" for stage in path)
+            logger.info(f"  关键路径: {chain}，共 {path[-1].finished_at:.2f}s")
+        return report
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+import config
+from metrics import get_metrics
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """DeepSeek响应的磁盘缓存
+
+    以模型、消息、温度和max_tokens的哈希作为键，按调用类型设置过期时间，
+    总大小超过上限时按最近访问时间淘汰（LRU）。
+    """
+
+    def __init__(self, path, max_bytes, ttl):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                call_type TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens):
+        """根据请求参数生成内容寻址的缓存键"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            },
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _ttl_for(self, call_type):
+        """获取指定调用类型的过期时间（秒）"""
+        return self.ttl.get(call_type, self.ttl.get("default", 86400))
+
+    def get(self, call_type, key):
+        """读取缓存，未命中或已过期返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses[call_type] += 1
+                return None
+
+            content, created_at = row
+            if now - created_at > self._ttl_for(call_type):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses[call_type] += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits[call_type] += 1
+            return content
+
+    def set(self, call_type, key, content, replace=True):
+        """写入缓存并在超出大小上限时淘汰最久未访问的条目
+
+        replace 为False时保留已有条目及其写入时间，避免命中缓存后再次写入延长过期时间
+        """
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            self._conn.execute(
+                f"{verb} INTO responses (key, call_type, content, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, call_type, content, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        """删除一个条目（例如缓存的响应无法解析时）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self):
+        """按LRU淘汰条目，直到总大小回落到上限的90%以内"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"缓存超出大小上限，已淘汰 {evicted} 条记录")
+
+    def purge_expired(self):
+        """删除所有已过期的条目，返回删除的条目数"""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for call_type, in self._conn.execute("SELECT DISTINCT call_type FROM responses").fetchall():
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE call_type = ? AND created_at < ?",
+                    (call_type, now - self._ttl_for(call_type))
+                )
+                removed += cursor.rowcount
+            self._conn.commit()
+        return removed
+
+    def stats(self):
+        """返回按调用类型统计的命中/未命中次数"""
+        call_types = sorted(set(self.hits) | set(self.misses))
+        return {
+            call_type: {"hits": self.hits[call_type], "misses": self.misses[call_type]}
+            for call_type in call_types
+        }
+
+    def log_stats(self):
+        """输出缓存命中统计"""
+        stats = self.stats()
+        if not stats:
+            return
+        total_hits = sum(s["hits"] for s in stats.values())
+        total = total_hits + sum(s["misses"] for s in stats.values())
+        logger.info(f"响应缓存命中率: {total_hits}/{total}，明细: {json.dumps(stats, ensure_ascii=False)}")
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+# 进程内共享的缓存实例
+_cache = None
+_enabled = config.CACHE_ENABLED
+_cache_lock = threading.Lock()
+
+def disable_cache():
+    """禁用响应缓存（对应命令行的 --no-cache）"""
+    global _enabled
+    _enabled = False
+    logger.info("响应缓存已禁用")
+
+def get_response_cache():
+    """获取共享的响应缓存，禁用时返回None"""
+    global _cache
+    if not _enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(config.CACHE_PATH, config.CACHE_MAX_BYTES, config.CACHE_TTL)
+        return _cache
+
+def _record_usage(usage, response_usage):
+    """从响应的usage中读取token数"""
+    if response_usage is None:
+        return
+    usage["prompt_tokens"] = getattr(response_usage, "prompt_tokens", 0) or 0
+    usage["completion_tokens"] = getattr(response_usage, "completion_tokens", 0) or 0
+
+def cached_chat_completion(client, call_type, messages, model, temperature=0.3, max_tokens=1000, parse=None):
+    """调用DeepSeek对话接口并返回文本内容，相同请求优先从缓存读取
+
+    Args:
+        client: OpenAI兼容客户端
+        call_type (str): 调用类型（search/parse/source/analyze/summary等），决定缓存过期时间
+        messages (list): 对话消息
+        model (str): 模型名称
+        temperature (float): 采样温度
+        max_tokens (int): 最大输出token数
+        parse (callable): 响应文本的解析函数。给出时返回解析结果，且只有解析成功（未抛出异常且结果非空）
+            的响应才写入缓存，错误或被截断的响应不会在重试时被重放；缓存中的响应解析失败时删除并重新请求
+    """
+    metrics = get_metrics()
+    cache = get_response_cache()
+    key = None
+    if cache is not None:
+        key = ResponseCache.make_key(model, messages, temperature, max_tokens)
+        content = cache.get(call_type, key)
+        if content is not None and parse is None:
+            logger.info(f"命中响应缓存: {call_type}")
+            metrics.record(call_type, 0.0, outcome="cached")
+            return content
+        if content is not None:
+            try:
+                result = parse(content)
+            except Exception as e:
+                result = None
+                logger.warning(f"解析缓存的响应失败: {call_type}: {str(e)}")
+            if result:
+                logger.info(f"命中响应缓存: {call_type}")
+                metrics.record(call_type, 0.0, outcome="cached")
+                return result
+            logger.warning(f"删除无法使用的缓存响应并重新请求: {call_type}")
+            cache.delete(key)
+
+    with metrics.timed(call_type) as usage:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        _record_usage(usage, getattr(response, "usage", None))
+    content = response.choices[0].message.content
+
+    if parse is None:
+        if cache is not None and content:
+            cache.set(call_type, key, content)
+        return content
+
+    # 解析失败时异常直接抛出，响应不写入缓存
+    result = parse(content)
+    if cache is not None and content and result:
+        cache.set(call_type, key, content)
+    return result
+
+def store_response(call_type, messages, model, temperature=0.3, max_tokens=1000, content=None):
+    """将调用方确认可用（解析成功）的响应写入缓存，配合 stream_chat_completion(defer_cache=True) 使用
+
+    响应本身来自缓存时保留原条目，不延长其过期时间。
+    """
+    cache = get_response_cache()
+    if cache is not None and content:
+        key = ResponseCache.make_key(model, messages, temperature, max_tokens)
+        cache.set(call_type, key, content, replace=False)
+
+def discard_response(call_type, messages, model, temperature=0.3, max_tokens=1000):
+    """删除无法使用的缓存响应，下次请求时重新调用接口"""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.delete(ResponseCache.make_key(model, messages, temperature, max_tokens))
+
+def stream_chat_completion(client, call_type, messages, model, temperature=0.3, max_tokens=1000, defer_cache=False):
+    """以流式方式调用DeepSeek对话接口，逐段产出文本
+
+    命中缓存时一次性产出完整内容；流式响应完整结束后写入缓存，
+    与 cached_chat_completion 共用同一缓存键。
+    defer_cache 为True时不自动写入，由调用方在解析成功后调用 store_response 写入。
+    """
+    metrics = get_metrics()
+    cache = get_response_cache()
+    key = None
+    if cache is not None:
+        key = ResponseCache.make_key(model, messages, temperature, max_tokens)
+        content = cache.get(call_type, key)
+        if content is not None:
+            logger.info(f"命中响应缓存: {call_type}")
+            metrics.record(call_type, 0.0, outcome="cached")
+            yield content
+            return
+
+    parts = []
+    with metrics.timed(call_type) as usage:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}  # 最后一个数据块携带token用量
+        )
+        for chunk in stream:
+            _record_usage(usage, getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+
+    content = "".join(parts)
+    if cache is not None and content and not defer_cache:
+        cache.set(call_type, key, content)
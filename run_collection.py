@@ -1,5 +1,10 @@
 from data_collector import DataCollector
 from notion_updater import NotionUpdater
+from http_pool import close_pools, use_cassette
+from cassette import Cassette
+from response_cache import disable_cache, get_response_cache
+from metrics import get_metrics
+from pipeline import Pipeline
 import logging
 import argparse
 
@@ -7,14 +12,80 @@ import argparse
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _collect_stage(name, collect):
+    """收集阶段：记录收集到的事件数"""
+    def stage():
+        logger.info(f"收集{name}...")
+        events = collect()
+        logger.info(f"收集到 {len(events)} 个{name}")
+        return events
+    return stage
+
+def _events_stage(func):
+    """总结/渲染阶段：没有事件时跳过"""
+    def stage(events):
+        return func(events) if events else None
+    return stage
+
+def _publish_stage(publish):
+    """发布阶段：使用并行生成的总结和表格行发布页面，返回发布的事件数"""
+    def stage(events, summary, rows):
+        if not events:
+            return 0
+        return len(events) if publish(events, summary, rows) else 0
+    return stage
+
+def build_pipeline(collector, updater, daily=True, earnings=False, force=False):
+    """构建 收集 → 总结/表格渲染 → 发布 的阶段图
+    
+    每日和财报两条分支互不依赖，同时收集；分支内总结生成与表格渲染并行，
+    二者都完成后发布页面。搜索、解析和来源/影响分析在收集阶段内按事件流式重叠执行，
+    各自的耗时见调用统计。
+    """
+    pipeline = Pipeline("collection")
+    branches = []
+    if daily:
+        branches.append((
+            "daily", "每日事件", collector.collect_daily_events,
+            updater.generate_daily_summary, updater.render_daily_rows, updater.publish_daily_page
+        ))
+    if earnings:
+        branches.append((
+            "earnings", "财报事件", lambda: collector.collect_earnings_events(force=force),
+            updater.generate_earnings_summary, updater.render_earnings_rows, updater.publish_earnings_page
+        ))
+    
+    for name, label, collect, summarize, render, publish in branches:
+        pipeline.add(f"collect_{name}", _collect_stage(label, collect))
+        pipeline.add(f"summarize_{name}", _events_stage(summarize), [f"collect_{name}"])
+        pipeline.add(f"render_{name}", _events_stage(render), [f"collect_{name}"])
+        pipeline.add(
+            f"publish_{name}",
+            _publish_stage(publish),
+            [f"collect_{name}", f"summarize_{name}", f"render_{name}"]
+        )
+    return pipeline
+
 def main():
     # 创建命令行参数解析器
     parser = argparse.ArgumentParser(description='收集市场事件并更新到Notion')
     parser.add_argument('--daily', action='store_true', help='收集每日事件')
     parser.add_argument('--earnings', action='store_true', help='收集财报事件')
     parser.add_argument('--force', action='store_true', help='强制收集财报事件（即使不是周日）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用DeepSeek响应缓存')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='PATH', help='将DeepSeek和Notion的请求/响应录制到磁带文件（不使用缓存）')
+    cassette_group.add_argument('--replay', metavar='PATH', help='从磁带文件回放响应，不访问网络（不使用缓存）')
+    parser.add_argument('--replay-timing', action='store_true', help='回放时按录制时的耗时等待')
     args = parser.parse_args()
     
+    # 录制和回放都需要每次调用真实经过传输层，因此同时禁用缓存
+    if args.record or args.replay:
+        mode = 'record' if args.record else 'replay'
+        use_cassette(Cassette(args.record or args.replay, mode, emulate_timing=args.replay_timing))
+    if args.no_cache or args.record or args.replay:
+        disable_cache()
+    
     # 如果没有指定任何参数，默认收集每日事件
     if not args.daily and not args.earnings:
         args.daily = True
@@ -26,33 +97,23 @@ def main():
         collector = DataCollector()
         updater = NotionUpdater()
         
-        daily_events = []
-        earnings_events = []
-        
-        # 收集每日事件
-        if args.daily:
-            logger.info("收集每日事件...")
-            daily_events = collector.collect_daily_events()
-            logger.info(f"收集到 {len(daily_events)} 个每日事件")
-        
-        # 收集财报事件
-        if args.earnings:
-            logger.info("收集财报事件...")
-            earnings_events = collector.collect_earnings_events(force=args.force)
-            logger.info(f"收集到 {len(earnings_events)} 个财报事件")
-        
-        # 合并事件并更新Notion
-        if daily_events or earnings_events:
-            all_events = daily_events + earnings_events
-            logger.info(f"开始更新 Notion，共 {len(all_events)} 个事件...")
-            updated_count = updater.update_notion_with_events(all_events)
+        with get_metrics().run("collection"):
+            pipeline = build_pipeline(collector, updater, args.daily, args.earnings, args.force)
+            results = pipeline.run()
+            pipeline.report()
+            
+            updated_count = sum(results.get(f"publish_{name}") or 0 for name in ("daily", "earnings"))
             logger.info(f"成功更新 {updated_count} 个事件到 Notion")
-        else:
-            logger.info("没有新事件需要更新")
+        
+        cache = get_response_cache()
+        if cache:
+            cache.log_stats()
             
     except Exception as e:
         logger.error(f"运行过程中出错: {str(e)}")
         raise
+    finally:
+        close_pools()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,41 +1,81 @@
-import time
+import asyncio
 import logging
-import schedule
+import threading
 from datetime import datetime
-from config import PRE_MARKET_TIME, POST_MARKET_TIME
+from config import (
+    PRE_MARKET_TIME,
+    POST_MARKET_TIME,
+    WEEKLY_SCHEDULE_DAY,
+    WEEKLY_SCHEDULE_TIME,
+    SCHEDULER_STATE_PATH,
+    SCHEDULER_CATCHUP_WINDOW
+)
 from data_collector import DataCollector
 from notion_updater import NotionUpdater
+from http_pool import close_pools
+from state_store import JsonStateStore
+from metrics import get_metrics
+from async_scheduler import AsyncScheduler, DailyTrigger, AdaptiveIntervalTrigger
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
 class EventScheduler:
     def __init__(self):
+        # 采集器和更新器共享同一组长连接池，定时任务之间复用已建立的连接
         self.collector = DataCollector()
         self.updater = NotionUpdater()
+        # 任务并发执行，上次计划时间持久化以便重启后补跑
+        self.state = JsonStateStore(SCHEDULER_STATE_PATH)
+        self.engine = AsyncScheduler(self.state, SCHEDULER_CATCHUP_WINDOW)
+        self.metrics = get_metrics()
+        # 盘前和盘后是两个任务，重启后同时补跑时只执行一次每日收集
+        self._daily_lock = threading.Lock()
     
     def collect_and_update_daily(self):
         """收集当天事件并更新到Notion"""
+        if not self._daily_lock.acquire(blocking=False):
+            logger.warning("上一次当日事件收集尚未结束，跳过本次运行")
+            return
+        try:
+            self._collect_and_update_daily()
+        finally:
+            self._daily_lock.release()
+    
+    def _collect_and_update_daily(self):
         logger.info("开始收集当日事件")
         
-        # 收集事件
-        events = self.collector.collect_daily_events()
-        
-        # 更新Notion
-        created_count = self.updater.update_notion_with_events(events)
+        with self.metrics.run("daily"):
+            # 收集事件
+            events = self.collector.collect_daily_events()
+            
+            # 更新Notion
+            created_count = self.updater.update_notion_with_events(events)
         
         logger.info(f"当日任务完成，创建了 {created_count} 个事件")
     
+    def collect_weekly(self):
+        """收集下周事件并写入历史事件库，供之后每天的每日收集复用（不更新Notion）"""
+        logger.info("开始收集下周事件")
+        
+        with self.metrics.run("weekly"):
+            events = self.collector.collect_weekly_events()
+        
+        logger.info(f"下周事件收集完成，共 {len(events)} 个事件")
+    
     def collect_and_update_breaking_news(self):
         """收集突发新闻并更新到Notion"""
         logger.info("开始收集突发新闻")
         
-        # 收集事件
-        events = self.collector.collect_breaking_news()
-        
-        # 更新Notion
-        created_count = self.updater.update_notion_with_events(events)
+        with self.metrics.run("breaking"):
+            # 收集事件
+            events = self.collector.collect_breaking_news()
+            
+            # 更新Notion
+            created_count = self.updater.update_notion_with_events(events)
         
         logger.info(f"突发新闻收集完成，创建了 {created_count} 个事件")
     
@@ -43,11 +83,12 @@ class EventScheduler:
         """收集财报事件并更新到Notion"""
         logger.info("开始收集财报事件")
         
-        # 收集事件
-        events = self.collector.collect_earnings_events()
-        
-        # 更新Notion
-        created_count = self.updater.update_notion_with_events(events)
+        with self.metrics.run("earnings"):
+            # 收集事件
+            events = self.collector.collect_earnings_events()
+            
+            # 更新Notion
+            created_count = self.updater.update_notion_with_events(events)
         
         logger.info(f"财报事件收集完成，创建了 {created_count} 个事件")
     
@@ -56,40 +97,48 @@ class EventScheduler:
         logger.info("设置定时任务")
         
         # 每个交易日盘前收集当天事件
-        schedule.every().monday.at(PRE_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().tuesday.at(PRE_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().wednesday.at(PRE_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().thursday.at(PRE_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().friday.at(PRE_MARKET_TIME).do(self.collect_and_update_daily)
+        self.engine.add_job(
+            "pre_market", self.collect_and_update_daily, DailyTrigger(PRE_MARKET_TIME, weekdays=range(5))
+        )
         logger.info(f"已设置盘前任务，时间: {PRE_MARKET_TIME}")
         
         # 每个交易日盘后收集当天事件
-        schedule.every().monday.at(POST_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().tuesday.at(POST_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().wednesday.at(POST_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().thursday.at(POST_MARKET_TIME).do(self.collect_and_update_daily)
-        schedule.every().friday.at(POST_MARKET_TIME).do(self.collect_and_update_daily)
+        self.engine.add_job(
+            "post_market", self.collect_and_update_daily, DailyTrigger(POST_MARKET_TIME, weekdays=range(5))
+        )
         logger.info(f"已设置盘后任务，时间: {POST_MARKET_TIME}")
         
-        # 每2小时收集一次突发新闻
-        schedule.every(2).hours.do(self.collect_and_update_breaking_news)
-        logger.info("已设置突发新闻收集任务，每2小时执行一次")
+        # 每周收集一次下周事件，作为之后每天盘前收集的已知事件
+        self.engine.add_job(
+            "weekly",
+            self.collect_weekly,
+            DailyTrigger(WEEKLY_SCHEDULE_TIME, weekdays=[WEEKDAY_NAMES.index(WEEKLY_SCHEDULE_DAY)])
+        )
+        logger.info(f"已设置周度收集任务，每{WEEKLY_SCHEDULE_DAY} {WEEKLY_SCHEDULE_TIME}执行")
+        
+        # 收集突发新闻，间隔随新闻量在30分钟到4小时之间自适应（初始2小时）
+        self.engine.add_job(
+            "breaking_news",
+            self.collect_and_update_breaking_news,
+            AdaptiveIntervalTrigger(self.collector.breaking_news_interval)
+        )
+        logger.info(f"已设置突发新闻收集任务，当前每 {self.collector.breaking_news_interval() // 60} 分钟执行一次")
         
         # 每天收集一次财报事件
-        schedule.every().day.at("07:00").do(self.collect_and_update_earnings)
+        self.engine.add_job("earnings", self.collect_and_update_earnings, DailyTrigger("07:00"))
         logger.info("已设置财报事件收集任务，每天07:00执行")
     
     def run(self):
         """运行调度器"""
         self.schedule_tasks()
         
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(60)
-            except Exception as e:
-                logger.error(f"调度器运行出错: {str(e)}")
-                time.sleep(300)  # 出错后等待5分钟再继续
+        try:
+            asyncio.run(self.engine.run())
+        except KeyboardInterrupt:
+            logger.info("调度器已停止")
+        finally:
+            logger.info(f"任务运行统计: {self.engine.stats()}")
+            close_pools()
 
 # 测试代码
 if __name__ == "__main__":
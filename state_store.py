@@ -0,0 +1,50 @@
+import os
+import json
+import logging
+import threading
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class JsonStateStore:
+    """跨进程重启保留的小型运行状态（JSON文件）
+
+    每次写入先写临时文件再原子替换，进程中途退出不会留下损坏的状态文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"读取状态文件失败，将重新开始记录: {self.path}, {str(e)}")
+            return {}
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key, default=None):
+        """读取状态值"""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key, value):
+        """写入状态值并立即落盘"""
+        with self._lock:
+            self._data[key] = value
+            self._save()
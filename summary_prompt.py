@@ -0,0 +1,108 @@
+import re
+import json
+from event_model import project, json_default
+
+# 总结提示词中每日事件和财报事件的列：(字段, 列名, 是否为长文本字段)
+# 只保留总结需要的字段，来源名称/链接、确信度等不参与总结
+DAILY_SUMMARY_COLUMNS = [
+    ("time", "时间", False),
+    ("type", "类型", False),
+    ("description", "事件", True),
+    ("sentiment", "情绪", False),
+    ("related_stocks", "相关个股", False),
+    ("market_impact", "市场影响", True)
+]
+EARNINGS_SUMMARY_COLUMNS = [
+    ("report_date", "日期", False),
+    ("earnings_time", "时段", False),
+    ("company_name", "公司", False),
+    ("stock_code", "代码", False),
+    ("eps_forecast", "EPS预期", False),
+    ("revenue_forecast", "营收预期", False),
+    ("focus_points", "关注点", True),
+    ("market_impact", "市场影响", True)
+]
+
+# 长文本字段压缩的下限（字符），超出总预算时逐步减半直到该值
+MIN_FIELD_CHARS = 20
+
+# 视为空值的内容，在表格中统一写作"-"
+EMPTY_VALUES = (None, "", [], "未知", "未指定", "unknown")
+
+_CJK_PATTERN = re.compile(r'[　-〿一-鿿＀-￯]')
+
+def estimate_tokens(text):
+    """估算文本的token数：中文字符约0.6个token，其他字符约0.3个token"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+
+def _cell(value, limit=None):
+    """将字段值转为单行表格单元格，长文本截断到limit个字符"""
+    if value in EMPTY_VALUES:
+        return "-"
+    if isinstance(value, (list, tuple)):
+        value = "/".join(str(item) for item in value)
+    text = re.sub(r'\s+', ' ', str(value)).replace("|", "/").strip()
+    if limit and len(text) > limit:
+        text = text[:limit - 1] + "…"
+    return text or "-"
+
+def _render_row(event, columns, field_max_chars):
+    values = project(event, [field for field, _, _ in columns])
+    return "|".join(
+        _cell(value, field_max_chars if is_long else None)
+        for value, (_, _, is_long) in zip(values, columns)
+    )
+
+def render_events_table(events, columns, field_max_chars):
+    """按列渲染为"|"分隔的紧凑表格，首行为列名"""
+    lines = ["|".join(title for _, title, _ in columns)]
+    lines.extend(_render_row(event, columns, field_max_chars) for event in events)
+    return "\n".join(lines)
+
+def estimate_table_tokens(events, columns, field_max_chars):
+    """估算长文本字段截断到 field_max_chars 后的事件表格token数"""
+    return estimate_tokens(render_events_table(events, columns, field_max_chars))
+
+def chunk_by_tokens(items, item_tokens, chunk_tokens):
+    """按顺序将元素切分为若干组，每组估算token数不超过chunk_tokens（单个元素超出时单独成组）"""
+    chunks, current, current_tokens = [], [], 0
+    for item, tokens in zip(items, item_tokens):
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def chunk_events(events, columns, field_max_chars, chunk_tokens):
+    """按原有顺序将事件切分为表格大小不超过chunk_tokens的若干组"""
+    row_tokens = [estimate_tokens(_render_row(event, columns, field_max_chars)) for event in events]
+    return chunk_by_tokens(events, row_tokens, chunk_tokens)
+
+def project_events(events, columns, field_max_chars, token_budget):
+    """将事件投影为总结提示词中的紧凑表格
+
+    只保留指定列，长文本字段截断到 field_max_chars 个字符；表格超出 token_budget 时
+    逐步减半长文本字段的长度（不低于 MIN_FIELD_CHARS）。
+
+    Returns:
+        tuple: (表格文本, 统计信息)，统计信息包含紧凑表格和原JSON格式（indent=2）的估算token数
+    """
+    limit = field_max_chars
+    text = render_events_table(events, columns, limit)
+    tokens = estimate_tokens(text)
+    while token_budget and tokens > token_budget and limit > MIN_FIELD_CHARS:
+        limit = max(limit // 2, MIN_FIELD_CHARS)
+        text = render_events_table(events, columns, limit)
+        tokens = estimate_tokens(text)
+
+    baseline_tokens = estimate_tokens(json.dumps(events, ensure_ascii=False, indent=2, default=json_default))
+    return text, {
+        "tokens": tokens,
+        "baseline_tokens": baseline_tokens,
+        "saved_tokens": baseline_tokens - tokens,
+        "field_max_chars": limit
+    }
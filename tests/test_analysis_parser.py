@@ -0,0 +1,88 @@
+from analysis_parser import (
+    parse_sections,
+    parse_batch_sections,
+    parse_batch_analysis,
+    normalize_confidence,
+    normalize_sentiment,
+    infer_sentiment,
+    first_line
+)
+
+
+def batch_text(*bodies):
+    return "\n".join(f"事件{index}分析:\n{body}" for index, body in enumerate(bodies, start=1))
+
+
+FULL_BODY = (
+    "1. 市场影响: 指数可能上涨\n"
+    "2. 行业影响: 半导体走强\n"
+    "3. 相关个股: NVDA, AMD\n"
+    "4. 确信度: high\n"
+    "5. 市场情绪: bullish\n"
+    "6. 信息来源: Reuters https://www.reuters.com/markets/\n"
+)
+
+
+def test_parse_sections_strips_known_labels():
+    text = (
+        "1. **整体美股市场的影响**：可能上涨\n"
+        "2. 对相关行业板块的影响分析: 芯片板块\n"
+        "3. 对主要相关个股的影响：AAPL\n"
+        "4. 分析的确信度：high\n"
+        "5. 市场情绪判断：利好\n"
+    )
+    assert parse_sections(text) == {1: "可能上涨", 2: "芯片板块", 3: "AAPL", 4: "high", 5: "利好"}
+
+
+def test_parse_sections_keeps_unlabeled_text_before_colon():
+    sections = parse_sections("1. 美联储表示：利率将维持不变\n2. 行业影响：银行股受益")
+    assert sections == {1: "美联储表示：利率将维持不变", 2: "银行股受益"}
+
+
+def test_parse_sections_handles_empty_text():
+    assert parse_sections("") == {}
+    assert parse_sections(None) == {}
+
+
+def test_parse_batch_analysis_maps_all_fields():
+    result = parse_batch_analysis(batch_text(FULL_BODY), 1)[0]
+    assert result == {
+        "market_impact": "指数可能上涨",
+        "industry_impact": "半导体走强",
+        "related_stocks": "NVDA, AMD",
+        "confidence_level": "high",
+        "sentiment": "bullish",
+        "source_url": "https://www.reuters.com/markets/",
+        "source_name": "Reuters"
+    }
+
+
+def test_parse_batch_analysis_accepts_bold_labels_and_full_width_colons():
+    body = "1. **市场影响**：下跌\n5. **市场情绪**：利空\n"
+    result = parse_batch_analysis("**事件1分析：**\n" + body, 1)[0]
+    assert result["market_impact"] == "下跌"
+    assert result["sentiment"] == "bearish"
+
+
+def test_parse_batch_analysis_marks_missing_events_as_failed():
+    # 事件2缺少市场影响，事件3整段缺失
+    text = batch_text(FULL_BODY, "2. 行业影响: 无\n")
+    assert [result is not None for result in parse_batch_analysis(text, 3)] == [True, False, False]
+
+
+def test_parse_batch_sections_ignores_out_of_range_and_repeated_headers():
+    text = batch_text(FULL_BODY) + "\n事件1分析:\n1. 市场影响: 重复\n事件5分析:\n1. 市场影响: 越界\n"
+    sections = parse_batch_sections(text, 2)
+    assert sections[0][1] == "指数可能上涨"
+    assert sections[1] is None
+
+
+def test_normalizers():
+    assert normalize_confidence("较高") == "high"
+    assert normalize_confidence("中等") == "medium"
+    assert normalize_confidence("不确定") == "low"
+    assert normalize_sentiment("利好/bullish") == "bullish"
+    assert normalize_sentiment("中性") == "neutral"
+    assert normalize_sentiment("未知") == "unknown"
+    assert infer_sentiment("政策收紧，科技股或承压下跌") == "bearish"
+    assert first_line("bullish\n补充说明") == "bullish"
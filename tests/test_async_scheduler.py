@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from async_scheduler import AsyncScheduler, DailyTrigger, AdaptiveIntervalTrigger
+from state_store import JsonStateStore
+
+# 2025-04-10 是周四
+THURSDAY = datetime(2025, 4, 10, 12, 0)
+
+
+def test_daily_trigger_returns_next_time_strictly_after_moment():
+    trigger = DailyTrigger(["16:30", "08:00"])
+    assert trigger.next_after(datetime(2025, 4, 10, 7, 59)) == datetime(2025, 4, 10, 8, 0)
+    assert trigger.next_after(datetime(2025, 4, 10, 8, 0)) == datetime(2025, 4, 10, 16, 30)
+    assert trigger.next_after(datetime(2025, 4, 10, 17, 0)) == datetime(2025, 4, 11, 8, 0)
+
+
+def test_daily_trigger_skips_excluded_weekdays():
+    trigger = DailyTrigger("08:00", weekdays=range(5))
+    # 周五盘前之后的下一次是下周一
+    assert trigger.next_after(datetime(2025, 4, 11, 9, 0)) == datetime(2025, 4, 14, 8, 0)
+
+
+def test_daily_trigger_without_weekdays_raises():
+    with pytest.raises(ValueError):
+        DailyTrigger("08:00", weekdays=[]).next_after(THURSDAY)
+
+
+def test_adaptive_trigger_reads_interval_on_every_call():
+    interval = [600]
+    trigger = AdaptiveIntervalTrigger(lambda: interval[0])
+    assert trigger.next_after(THURSDAY) == datetime(2025, 4, 10, 12, 10)
+    interval[0] = 60
+    assert trigger.next_after(THURSDAY) == datetime(2025, 4, 10, 12, 1)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return AsyncScheduler(JsonStateStore(str(tmp_path / "state.json")), catchup_window=6 * 3600)
+
+
+def test_first_run_without_state_waits_for_next_trigger(scheduler):
+    job = scheduler.add_job("pre_market", lambda: None, DailyTrigger("08:00"))
+    scheduler._plan_first_run(job, THURSDAY)
+    assert job.next_run == datetime(2025, 4, 11, 8, 0)
+
+
+def test_first_run_catches_up_latest_missed_occurrence(scheduler):
+    job = scheduler.add_job("pre_market", lambda: None, DailyTrigger("08:00"))
+    scheduler.state.set("job:pre_market", {"last_run": datetime(2025, 4, 7, 8, 0).isoformat()})
+    scheduler._plan_first_run(job, THURSDAY)
+    # 周二、周三的运行合并到周四08:00这一次
+    assert job.next_run == datetime(2025, 4, 10, 8, 0)
+    assert job.stats["collapsed"] == 2
+
+
+def test_missed_run_outside_catchup_window_is_skipped(scheduler):
+    job = scheduler.add_job("pre_market", lambda: None, DailyTrigger("05:00"))
+    job.next_run = datetime(2025, 4, 9, 5, 0)
+    scheduler._dispatch_due_jobs(THURSDAY)
+    assert job.stats["skipped_stale"] == 1
+    assert job.stats["collapsed"] == 1
+    assert job.next_run == datetime(2025, 4, 11, 5, 0)
+
+
+def test_overlapping_run_is_skipped(scheduler):
+    job = scheduler.add_job("pre_market", lambda: None, DailyTrigger("11:00"))
+    job.next_run = datetime(2025, 4, 10, 11, 0)
+    job.running = True
+    scheduler._dispatch_due_jobs(THURSDAY)
+    assert job.stats["skipped_overlap"] == 1
+
+
+def test_execute_records_run_in_state(scheduler):
+    calls = []
+    job = scheduler.add_job("pre_market", lambda: calls.append(1), DailyTrigger("11:00"))
+    scheduled = datetime(2025, 4, 10, 11, 0)
+    asyncio.run(scheduler._execute(job, scheduled))
+    assert calls == [1]
+    assert job.stats["runs"] == 1
+    assert scheduler.state.get("job:pre_market")["last_run"] == scheduled.isoformat()
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+from notion_updater import NotionUpdater
+from notion_index import NotionIndex
+from event_store import EventStore
+from event_model import Event
+
+DATE = "2025-04-10"
+
+
+class FakePublisher:
+    """内存中的Notion发布层：保存表格行，记录块更新"""
+
+    def __init__(self):
+        self.rows = {}
+        self.updates = []
+
+    def call(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def list_children(self, block_id):
+        return [{"id": "header", "table_row": {"cells": []}}] + list(self.rows.values())
+
+    def append_rows(self, table_id, rows):
+        created = []
+        for row in rows:
+            block = {"id": f"row-{len(self.rows)}", **row}
+            self.rows[block["id"]] = block
+            created.append(block)
+        return created
+
+
+@pytest.fixture
+def updater(tmp_path):
+    updater = NotionUpdater.__new__(NotionUpdater)
+    updater.publisher = FakePublisher()
+    updater.notion = SimpleNamespace(blocks=SimpleNamespace(
+        update=lambda **kwargs: updater.publisher.updates.append(kwargs)
+    ))
+    updater.index = NotionIndex(str(tmp_path / "index.sqlite3"))
+    updater.index.save_page(DATE, "daily", "page", "table", "summary")
+    updater.store = None
+    updater.summarized = []
+    updater.generate_daily_summary = lambda events: updater.summarized.append(list(events)) or "总结"
+    yield updater
+    updater.index.close()
+
+
+def event(time, description):
+    return Event(time=time, description=description, type="经济数据", market_impact="影响有限", sentiment="neutral")
+
+
+def test_summary_covers_rows_from_earlier_runs(updater):
+    updater._apply_daily_upsert([event("08:30", "美国3月CPI公布")], DATE, False, summary="只含本次事件的总结")
+    updater.summarized.clear()
+
+    updater._apply_daily_upsert([event("10:00", "美国3月新屋销售公布")], DATE, False, summary="只含本次事件的总结")
+
+    assert [e["description"] for e in updater.summarized[-1]] == ["美国3月CPI公布", "美国3月新屋销售公布"]
+    assert updater.publisher.updates[-1]["paragraph"]["rich_text"][0]["text"]["content"] == "总结"
+
+
+def test_earlier_events_are_read_from_the_store_first(updater, tmp_path):
+    updater.store = EventStore(str(tmp_path / "events.sqlite3"))
+    earlier = event("08:30", "美国3月CPI公布")
+    earlier["date"] = DATE
+    earlier["market_impact"] = "库中保存的完整分析"
+    updater.store.put_many([earlier], "daily")
+    updater._apply_daily_upsert([event("08:30", "美国3月CPI公布")], DATE, False)
+
+    updater._apply_daily_upsert([event("10:00", "美国3月新屋销售公布")], DATE, False)
+
+    assert updater.summarized[-1][0]["market_impact"] == "库中保存的完整分析"
+    updater.store.close()
+
+
+def test_pre_generated_summary_is_used_when_page_has_no_other_rows(updater):
+    updater._apply_daily_upsert([event("08:30", "美国3月CPI公布")], DATE, False, summary="预先生成的总结")
+    assert updater.summarized == []
+    assert updater.publisher.updates[-1]["paragraph"]["rich_text"][0]["text"]["content"] == "预先生成的总结"
@@ -0,0 +1,44 @@
+import pytest
+
+import event_ledger
+from event_ledger import EventLedger
+
+ENRICHMENT = {"source_name": "Reuters", "market_impact": "影响有限"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(event_ledger.time, "time", lambda: now[0])
+    return now
+
+
+def test_get_returns_stored_enrichment(tmp_path, clock):
+    ledger = EventLedger(str(tmp_path / "ledger.sqlite3"), ttl=100)
+    ledger.put_many([("fp", "2025-04-10", ENRICHMENT)])
+    assert ledger.get("fp") == ENRICHMENT
+    assert ledger.get("missing") is None
+    ledger.close()
+
+
+def test_expired_enrichment_is_not_reused(tmp_path, clock):
+    ledger = EventLedger(str(tmp_path / "ledger.sqlite3"), ttl=100)
+    ledger.put_many([("fp", "2025-04-10", ENRICHMENT)])
+    clock[0] += 101
+    assert ledger.get("fp") is None
+    ledger.close()
+
+
+def test_expired_records_are_purged_when_the_ledger_opens(tmp_path, clock):
+    path = str(tmp_path / "ledger.sqlite3")
+    ledger = EventLedger(path, ttl=100)
+    ledger.put_many([("old", "2025-04-09", ENRICHMENT)])
+    clock[0] += 50
+    ledger.put_many([("new", "2025-04-10", ENRICHMENT)])
+    ledger.close()
+
+    clock[0] += 60
+    ledger = EventLedger(path, ttl=100)
+    fingerprints = [row[0] for row in ledger._conn.execute("SELECT fingerprint FROM events")]
+    assert fingerprints == ["new"]
+    ledger.close()
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from event_model import Event, EarningsEvent, event_from_dict, events_to_json, project
+
+
+def test_aliases_write_canonical_fields():
+    event = Event({"description": "美国3月CPI公布", "sector_impact": "银行股", "stocks_affected": "JPM"})
+    assert event["industry_impact"] == "银行股"
+    assert event.get("sector_impact") == "银行股"
+    assert event.to_dict() == {"description": "美国3月CPI公布", "industry_impact": "银行股", "related_stocks": "JPM"}
+
+
+def test_unknown_keys_round_trip_through_extra():
+    event = Event(description="美国3月CPI公布", custom="x")
+    assert event["custom"] == "x"
+    assert "custom" in event and "time" not in event
+    del event["custom"]
+    with pytest.raises(KeyError):
+        event["custom"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    (["bullish if 数据好于预期", "bearish if 数据差于预期"], "unknown"),
+    (["利好科技股", "bullish if 降息"], "bullish"),
+    (["neutral"], "neutral"),
+    ([], "unknown"),
+    ("bearish", "bearish"),
+])
+def test_sentiment_is_a_single_value(value, expected):
+    event = Event(sentiment=value)
+    assert event["sentiment"] == expected
+    event.update({"sentiment": value})
+    assert event["sentiment"] == expected
+
+
+def test_copy_is_independent():
+    event = Event(description="a", custom="x")
+    copied = event.copy()
+    copied["description"] = "b"
+    copied["custom"] = "y"
+    assert event.to_dict() == {"description": "a", "custom": "x"}
+
+
+def test_event_from_dict_builds_earnings_events():
+    earnings = event_from_dict({"is_earnings": True, "company_name": "Apple", "stock_code": "AAPL"})
+    assert isinstance(earnings, EarningsEvent)
+    assert earnings["stock_code"] == "AAPL"
+    event = Event(description="a")
+    assert event_from_dict(event) is event
+
+
+def test_events_serialize_like_dicts():
+    events = [Event(time="20:30", description="美国3月CPI公布"), {"time": "22:00", "description": "b"}]
+    assert json.loads(events_to_json(events)) == [
+        {"time": "20:30", "description": "美国3月CPI公布"}, {"time": "22:00", "description": "b"}
+    ]
+    assert project(events[0], ["time", "type"], "-") == ("20:30", "-")
+    assert project(events[1], ["time", "type"], "-") == ("22:00", "-")
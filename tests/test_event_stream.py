@@ -0,0 +1,56 @@
+from event_stream import IncrementalEventParser
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalEventParser()
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items, parser.finish()
+
+
+def test_json_objects_are_emitted_as_soon_as_they_close():
+    parser = IncrementalEventParser()
+    assert parser.feed('[{"time": "08:30", "description": "CPI"}') == [{"time": "08:30", "description": "CPI"}]
+    assert parser.feed(', {"time": "10:00", "desc') == []
+    assert parser.feed('ription": "PMI"}]') == [{"time": "10:00", "description": "PMI"}]
+    assert parser.finish() == []
+
+
+def test_json_split_into_single_characters():
+    text = '```json\n[{"a": "x}y", "b": [1, {"c": 2}]}, {"a": "\\"q\\""}]\n```'
+    items, rest = feed_in_chunks(text, 1)
+    assert items == [{"a": "x}y", "b": [1, {"c": 2}]}, {"a": '"q"'}]
+    assert rest == []
+
+
+def test_truncated_json_keeps_complete_objects():
+    items, rest = feed_in_chunks('[{"a": 1}, {"a": 2}, {"a": ', 4)
+    assert items == [{"a": 1}, {"a": 2}]
+    assert rest == []
+
+
+def test_invalid_object_is_skipped():
+    items, _ = feed_in_chunks('[{"a": 1,}, {"a": 2}]', 3)
+    assert items == [{"a": 2}]
+
+
+def test_lines_are_emitted_when_complete():
+    parser = IncrementalEventParser()
+    assert parser.feed("08:30 美国CPI\n10:0") == ["08:30 美国CPI"]
+    assert parser.feed("0 美国PMI\n\n") == ["10:00 美国PMI"]
+    assert parser.feed("16:00 财报") == []
+    assert parser.finish() == ["16:00 财报"]
+
+
+def test_switches_to_json_after_leading_text():
+    items, rest = feed_in_chunks('以下是今天的事件：\n[\n  {"a": 1}\n]\n说明文字', 5)
+    assert items == ["以下是今天的事件：", {"a": 1}]
+    assert rest == []
+
+
+def test_empty_response():
+    parser = IncrementalEventParser()
+    assert parser.feed("") == []
+    assert parser.finish() == []
+    assert parser.feed("08:30 CPI\n") == []
@@ -0,0 +1,34 @@
+import pytest
+
+from fingerprint import normalize_time, normalize_description, event_fingerprint
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("8:30", "08:30"),
+    (" 16:00 ", "16:00"),
+    ("盘前", "09:00"),
+    ("美股盘后", "16:00"),
+    ("开盘", "09:30"),
+    ("待定", "待定"),
+    (None, "")
+])
+def test_normalize_time(value, expected):
+    assert normalize_time(value) == expected
+
+
+def test_normalize_description_ignores_width_case_spaces_and_punctuation():
+    assert normalize_description("美国 ３月CPI，同比上涨！") == normalize_description("美国3月cpi同比上涨")
+
+
+def test_fingerprint_is_stable_across_formatting():
+    left = {"time": "8:30", "description": "美国3月CPI公布。"}
+    right = {"time": "08:30", "description": " 美国 3月 CPI 公布"}
+    assert event_fingerprint(left, "2025-04-10") == event_fingerprint(right, "2025-04-10")
+
+
+def test_fingerprint_depends_on_date_time_and_description():
+    event = {"time": "08:30", "description": "美国3月CPI公布"}
+    fingerprint = event_fingerprint(event, "2025-04-10")
+    assert fingerprint != event_fingerprint(event, "2025-04-11")
+    assert fingerprint != event_fingerprint(dict(event, time="10:00"), "2025-04-10")
+    assert fingerprint != event_fingerprint(dict(event, description="美国3月PPI公布"), "2025-04-10")
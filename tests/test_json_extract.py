@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from json_extract import extract_json_array, extract_json_object
+
+
+def test_array_inside_code_block_and_prose():
+    text = '结果如下：\n```json\n[{"a": "x]\\"y"}, {"b": 2}]\n```\n以上。'
+    assert extract_json_array(text) == ([{"a": 'x]"y'}, {"b": 2}], False)
+
+
+def test_empty_array_before_real_array_is_skipped():
+    assert extract_json_array('here: [] and then [{"a":1}]') == ([{"a": 1}], False)
+
+
+def test_empty_array_is_returned_when_nothing_else_matches():
+    assert extract_json_array("今天没有重大事件：[]") == ([], False)
+
+
+def test_prose_brackets_before_array_are_skipped():
+    assert extract_json_array('[分析] 注意[见下文: [{"a":1}]') == ([{"a": 1}], False)
+    assert extract_json_array('见(附录} [{"a":1}]') == ([{"a": 1}], False)
+
+
+def test_array_nested_in_object():
+    assert extract_json_array('{"events": [{"a": 1}]}') == ([{"a": 1}], False)
+
+
+def test_truncated_array_returns_complete_objects():
+    assert extract_json_array('[{"a":1},{"b":[2]},{"c":') == ([{"a": 1}, {"b": [2]}], True)
+
+
+def test_invalid_array_returns_valid_objects():
+    assert extract_json_array('[{"a":1}, {"b":2},]') == ([{"a": 1}, {"b": 2}], True)
+
+
+def test_many_unclosed_prose_brackets():
+    body = json.dumps([{"a": i} for i in range(100)])
+    text = "".join(f"注[{i} " for i in range(100)) + body
+    assert extract_json_array(text) == ([{"a": i} for i in range(100)], False)
+
+
+@pytest.mark.parametrize("text, message", [
+    ('[{"a":', "被截断"),
+    ("没有JSON", "未找到"),
+    ("[1, 2]", "未找到"),
+    ("", "为空"),
+])
+def test_array_errors(text, message):
+    with pytest.raises(json.JSONDecodeError, match=message):
+        extract_json_array(text)
+
+
+def test_object_skips_brackets_in_strings_and_prose():
+    assert extract_json_object('分析[1] 结果: {"x": "[}"} 完') == {"x": "[}"}
+    assert extract_json_object('{} 然后 {"a": {"b": 1}}') == {"a": {"b": 1}}
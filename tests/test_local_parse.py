@@ -0,0 +1,61 @@
+import pytest
+
+from data_collector import DataCollector
+
+
+@pytest.fixture
+def collector():
+    # 行解析和日期规范化不依赖客户端和本地存储，跳过 __init__
+    return DataCollector.__new__(DataCollector)
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("08:30 美国劳工部公布3月CPI数据", {"time": "08:30", "description": "美国劳工部公布3月CPI数据"}),
+    ("1. 9:45 美国3月标普全球制造业PMI终值", {"time": "09:45", "description": "美国3月标普全球制造业PMI终值"}),
+    ("- 14:00：美联储公布FOMC会议纪要", {"time": "14:00", "description": "美联储公布FOMC会议纪要"}),
+    ("**10:00** | 美国3月新屋销售数据", {"time": "10:00", "description": "美国3月新屋销售数据"}),
+    ("美东时间 16:00 ET 特斯拉公布第一季度财报", {"time": "16:00", "description": "特斯拉公布第一季度财报"}),
+    ("盘前 摩根大通公布第一季度财报", {"time": "盘前", "description": "摩根大通公布第一季度财报"}),
+    ("12:00 PM 苹果公司召开股东大会", {"time": "12:00", "description": "苹果公司召开股东大会"}),
+    ("2:30 pm 美国财政部公布国债拍卖结果", {"time": "14:30", "description": "美国财政部公布国债拍卖结果"}),
+    ("12:15 AM 日本央行公布利率决议", {"time": "00:15", "description": "日本央行公布利率决议"}),
+    ("9:00 a.m. 美国3月零售销售数据公布", {"time": "09:00", "description": "美国3月零售销售数据公布"}),
+    ("下午2:00 美联储主席鲍威尔发表讲话", {"time": "14:00", "description": "美联储主席鲍威尔发表讲话"}),
+])
+def test_parse_event_line_formats(collector, line, expected):
+    event = collector._parse_event_line(line, "2025-04-10")
+    assert {key: event[key] for key in expected} == expected
+
+
+@pytest.mark.parametrize("line, date", [
+    ("2025-04-10 08:30 美国劳工部公布3月CPI数据", "2025-04-10"),
+    ("2025/4/10 08:30 美国劳工部公布3月CPI数据", "2025-04-10"),
+    ("2025年4月10日 08:30 美国劳工部公布3月CPI数据", "2025-04-10"),
+    ("4月10日（周四） 08:30 美国劳工部公布3月CPI数据", "2025-04-10"),
+])
+def test_parse_event_line_dates(collector, line, date):
+    event = collector._parse_event_line(line, "2025-04-07")
+    assert event["date"] == date
+    assert event["time"] == "08:30"
+    assert event["description"] == "美国劳工部公布3月CPI数据"
+
+
+def test_parse_event_line_rejects_lines_without_time(collector):
+    assert collector._parse_event_line("以下是今天的重要事件：", "2025-04-10") is None
+    assert collector._parse_event_line("", "2025-04-10") is None
+
+
+def test_parse_event_line_infers_type(collector):
+    assert collector._parse_event_line("16:05 英伟达公布季度财报", "2025-04-10")["type"] == "财报事件"
+
+
+@pytest.mark.parametrize("text, report_date, expected", [
+    ("1月2日", "2025-12-29", "2026-01-02"),
+    ("12月30日", "2026-01-02", "2025-12-30"),
+    ("4月10日", "2025-04-07", "2025-04-10"),
+    ("2025年4月10日", "2030-01-01", "2025-04-10"),
+    ("2月30日", "2025-02-01", None),
+    ("下周四", "2025-04-07", None),
+])
+def test_normalize_event_date_uses_report_date_year(collector, text, report_date, expected):
+    assert collector._normalize_event_date(text, report_date) == expected
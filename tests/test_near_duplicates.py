@@ -0,0 +1,73 @@
+import pytest
+
+from config import (
+    NEAR_DUP_JACCARD_THRESHOLD, NEAR_DUP_CONTAINMENT_THRESHOLD, NEAR_DUP_DISTINGUISHING_TERMS
+)
+from near_duplicates import NearDuplicateDetector, DuplicateCollapser, features, similarity
+
+REPORT_DATE = "2025-04-10"
+
+
+@pytest.fixture
+def detector():
+    detector = NearDuplicateDetector(
+        NEAR_DUP_JACCARD_THRESHOLD,
+        NEAR_DUP_CONTAINMENT_THRESHOLD,
+        distinguishing_terms=NEAR_DUP_DISTINGUISHING_TERMS
+    )
+    yield detector
+    detector.close()
+
+
+def register(detector, event):
+    key, signature, feature = detector.match(event, REPORT_DATE)
+    assert key is None
+    return detector.add(event, REPORT_DATE, signature, feature)
+
+
+def test_reworded_event_is_fully_contained():
+    jaccard, containment = similarity(features("美国3月CPI公布"), features("美国劳工部公布3月CPI数据"))
+    assert jaccard < NEAR_DUP_JACCARD_THRESHOLD
+    assert containment == 1.0
+
+
+def test_reworded_event_matches_known_event(detector):
+    key = register(detector, {"time": "20:30", "description": "美国3月CPI公布"})
+    match, _, _ = detector.match({"time": "20:30", "description": "美国劳工部公布3月CPI数据"}, REPORT_DATE)
+    assert match == key
+
+
+@pytest.mark.parametrize("known, reported", [
+    ("美国3月CPI公布", "美国3月核心CPI公布"),
+    ("美国3月CPI公布", "美国3月PPI公布"),
+    ("美国3月CPI公布", "美国4月CPI公布"),
+])
+def test_different_releases_do_not_match(detector, known, reported):
+    register(detector, {"time": "20:30", "description": known})
+    match, _, _ = detector.match({"time": "20:30", "description": reported}, REPORT_DATE)
+    assert match is None
+
+
+def test_same_description_at_another_time_does_not_match(detector):
+    register(detector, {"time": "20:30", "description": "美国3月CPI公布"})
+    match, _, _ = detector.match({"time": "22:00", "description": "美国劳工部公布3月CPI数据"}, REPORT_DATE)
+    assert match is None
+
+
+def test_collapser_merges_duplicate_fields_only_when_applied(detector):
+    collapser = DuplicateCollapser(detector)
+    kept = {"date": REPORT_DATE, "time": "20:30", "description": "美国3月CPI公布"}
+    duplicate = {
+        "date": REPORT_DATE, "time": "20:30", "description": "美国劳工部公布3月CPI数据", "type": "经济数据"
+    }
+    assert collapser.add(kept) is kept
+    assert collapser.add(duplicate) is None
+    assert "type" not in kept
+    assert collapser.merged == 1
+
+    kept["market_impact"] = "影响有限"
+    collapser.apply_merges()
+    assert kept["type"] == "经济数据"
+    assert kept["description"] == "美国3月CPI公布"
+    assert kept["market_impact"] == "影响有限"
+    assert collapser.pending_merges == []
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from pipeline import Pipeline
+
+
+def test_stages_receive_dependency_results_in_declared_order():
+    pipeline = Pipeline("test")
+    pipeline.add("a", lambda: 2)
+    pipeline.add("b", lambda: 3)
+    pipeline.add("c", lambda b, a: b - a, deps=["b", "a"])
+    assert pipeline.run() == {"a": 2, "b": 3, "c": 1}
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline("test")
+    pipeline.add("left", barrier.wait)
+    pipeline.add("right", barrier.wait)
+    pipeline.run()
+    assert all(stage.status == "done" for stage in pipeline.stages.values())
+
+
+def test_failure_skips_dependents_but_not_other_branches():
+    def fail():
+        raise RuntimeError("boom")
+
+    pipeline = Pipeline("test")
+    pipeline.add("fetch", fail)
+    pipeline.add("parse", lambda value: value, deps=["fetch"])
+    pipeline.add("publish", lambda value: value, deps=["parse"])
+    pipeline.add("other", lambda: "ok")
+    results = pipeline.run()
+
+    statuses = {name: stage.status for name, stage in pipeline.stages.items()}
+    assert statuses == {"fetch": "failed", "parse": "skipped", "publish": "skipped", "other": "done"}
+    assert results == {"fetch": None, "parse": None, "publish": None, "other": "ok"}
+    assert str(pipeline.stages["fetch"].error) == "boom"
+
+
+def test_add_rejects_duplicate_and_unknown_stages():
+    pipeline = Pipeline("test").add("a", lambda: None)
+    with pytest.raises(ValueError):
+        pipeline.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        pipeline.add("b", lambda value: value, deps=["missing"])
+
+
+def test_critical_path_follows_latest_finishing_dependency():
+    pipeline = Pipeline("test")
+    for name, deps in [("a", []), ("b", []), ("c", ["a", "b"])]:
+        pipeline.add(name, lambda *args: None, deps=deps)
+    pipeline.run()
+    stages = pipeline.stages
+    stages["a"].started_at, stages["a"].finished_at = 0.0, 1.0
+    stages["b"].started_at, stages["b"].finished_at = 0.0, 3.0
+    stages["c"].started_at, stages["c"].finished_at = 3.0, 4.0
+
+    assert [stage.name for stage in pipeline.critical_path()] == ["b", "c"]
+    report = pipeline.report()
+    assert report["critical_path"] == ["b", "c"]
+    assert report["stages"]["c"] == {"status": "done", "started_at": 3.0, "seconds": 1.0}
@@ -0,0 +1,106 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cached_chat_completion, store_response
+from json_extract import extract_json_object
+
+TTL = {"search": 100, "default": 1000}
+MESSAGES = [{"role": "user", "content": "x"}]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), 10 * 1024, TTL)
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    monkeypatch.setattr(response_cache, "_enabled", True)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+class FakeClient:
+    """按顺序返回预设回复的OpenAI兼容客户端"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        content = self.replies[self.calls]
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def test_get_returns_stored_content(cache):
+    cache.set("search", "k", "内容")
+    assert cache.get("search", "k") == "内容"
+    assert cache.get("search", "missing") is None
+
+
+def test_entries_expire_per_call_type(cache, clock):
+    cache.set("search", "a", "1")
+    cache.set("analyze", "b", "2")
+    clock[0] += 200
+    assert cache.get("search", "a") is None
+    assert cache.get("analyze", "b") == "2"
+
+
+def test_purge_expired_removes_only_expired_rows(cache, clock):
+    cache.set("search", "a", "1")
+    cache.set("analyze", "b", "2")
+    clock[0] += 200
+    assert cache.purge_expired() == 1
+    count = cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert count == 1
+
+
+def test_eviction_drops_least_recently_used(cache, clock):
+    cache.set("default", "old", "x" * 4000)
+    clock[0] += 1
+    cache.set("default", "new", "y" * 4000)
+    clock[0] += 1
+    cache.get("default", "old")
+    clock[0] += 1
+    cache.set("default", "third", "z" * 4000)
+    assert cache.get("default", "new") is None
+    assert cache.get("default", "old") is not None
+
+
+def test_make_key_depends_on_request():
+    key = ResponseCache.make_key("m", MESSAGES, 0.3, 100)
+    assert key == ResponseCache.make_key("m", MESSAGES, 0.3, 100)
+    assert key != ResponseCache.make_key("m", MESSAGES, 0.3, 200)
+
+
+def test_unparseable_response_is_not_cached(cache):
+    client = FakeClient(['{"a": 1', '{"a": 2}'])
+    with pytest.raises(json.JSONDecodeError):
+        cached_chat_completion(client, "analyze", MESSAGES, "m", parse=extract_json_object)
+    assert cached_chat_completion(client, "analyze", MESSAGES, "m", parse=extract_json_object) == {"a": 2}
+    # 第二次请求的结果已缓存，不再调用接口
+    assert cached_chat_completion(client, "analyze", MESSAGES, "m", parse=extract_json_object) == {"a": 2}
+    assert client.calls == 2
+
+
+def test_cached_entry_that_fails_to_parse_is_replaced(cache):
+    cache.set("analyze", ResponseCache.make_key("m", MESSAGES, 0.3, 1000), "garbage")
+    client = FakeClient(['{"a": 3}'])
+    assert cached_chat_completion(client, "analyze", MESSAGES, "m", parse=extract_json_object) == {"a": 3}
+    assert client.calls == 1
+
+
+def test_store_response_keeps_existing_entry(cache):
+    key = ResponseCache.make_key("m", MESSAGES, 0.3, 1000)
+    cache.set("search", key, "first")
+    store_response("search", MESSAGES, "m", content="second")
+    assert cache.get("search", key) == "first"
@@ -0,0 +1,58 @@
+from summary_prompt import (
+    DAILY_SUMMARY_COLUMNS, MIN_FIELD_CHARS, chunk_by_tokens, chunk_events, estimate_tokens, project_events,
+    render_events_table
+)
+
+EVENT = {
+    "time": "20:30",
+    "type": "经济数据",
+    "description": "美国劳工部公布3月CPI数据",
+    "sentiment": "bearish",
+    "related_stocks": ["AAPL", "MSFT"],
+    "market_impact": "通胀高于预期 | 压制降息预期\n科技股承压",
+    "source_url": "https://example.com/cpi",
+    "confidence": "高"
+}
+
+
+def test_table_keeps_only_summary_columns():
+    lines = render_events_table([EVENT], DAILY_SUMMARY_COLUMNS, 200).split("\n")
+    assert lines[0] == "时间|类型|事件|情绪|相关个股|市场影响"
+    assert lines[1] == "20:30|经济数据|美国劳工部公布3月CPI数据|bearish|AAPL/MSFT|通胀高于预期 / 压制降息预期 科技股承压"
+    assert "example.com" not in lines[1]
+
+
+def test_empty_values_render_as_dash():
+    event = {"time": "", "type": "未知", "description": "美联储主席讲话", "related_stocks": []}
+    row = render_events_table([event], DAILY_SUMMARY_COLUMNS, 200).split("\n")[1]
+    assert row == "-|-|美联储主席讲话|-|-|-"
+
+
+def test_long_fields_are_truncated():
+    event = dict(EVENT, market_impact="影响" * 50)
+    row = render_events_table([event], DAILY_SUMMARY_COLUMNS, 10).split("\n")[1]
+    assert row.endswith("|" + "影响" * 4 + "影…")
+
+
+def test_projection_halves_long_fields_until_within_budget():
+    events = [dict(EVENT, market_impact="影响" * 200) for _ in range(5)]
+    text, stats = project_events(events, DAILY_SUMMARY_COLUMNS, 400, token_budget=300)
+    assert stats["field_max_chars"] < 400
+    assert stats["tokens"] == estimate_tokens(text)
+    assert stats["tokens"] <= 300 or stats["field_max_chars"] == MIN_FIELD_CHARS
+    assert stats["saved_tokens"] == stats["baseline_tokens"] - stats["tokens"]
+
+
+def test_projection_within_budget_keeps_field_length():
+    _, stats = project_events([EVENT], DAILY_SUMMARY_COLUMNS, 400, token_budget=10000)
+    assert stats["field_max_chars"] == 400
+
+
+def test_chunks_keep_order_and_respect_budget():
+    assert chunk_by_tokens("abcde", [3, 3, 3, 3, 3], 7) == [["a", "b"], ["c", "d"], ["e"]]
+    assert chunk_by_tokens("ab", [10, 1], 5) == [["a"], ["b"]]
+
+    events = [dict(EVENT, description=f"事件{i}") for i in range(6)]
+    chunks = chunk_events(events, DAILY_SUMMARY_COLUMNS, 200, chunk_tokens=60)
+    assert [event for chunk in chunks for event in chunk] == events
+    assert len(chunks) > 1